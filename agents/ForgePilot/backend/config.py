@@ -1,7 +1,7 @@
 import os
 from dataclasses import dataclass, field
 from dotenv import load_dotenv
-from typing import List
+from typing import Dict, List
 
 load_dotenv(override=True)
 
@@ -10,6 +10,11 @@ def _split_comma(s: str) -> List[str]:
     return [x.strip() for x in s.split(",") if x.strip()]
 
 
+def _parse_limits(s: str) -> Dict[str, int]:
+    # "code_execute=2,http_fetch=8" -> {"code_execute": 2, "http_fetch": 8}
+    return {k.strip(): int(v) for k, v in (x.split("=", 1) for x in _split_comma(s))}
+
+
 @dataclass
 class Config:
     env: str = os.getenv("ENV", "development")
@@ -21,6 +26,50 @@ class Config:
     data_dir: str = os.getenv("DATA_DIR", "./backend/data")
     sandbox_dir: str = os.getenv("SANDBOX_DIR", "./backend/sandbox")
 
+    # Memory cache
+    memory_cache_session_events: int = int(os.getenv("MEMORY_CACHE_SESSION_EVENTS", "200"))
+    memory_cache_max_events: int = int(os.getenv("MEMORY_CACHE_MAX_EVENTS", "20000"))
+
+    # Memory persistence (group commit)
+    memory_flush_max_events: int = int(os.getenv("MEMORY_FLUSH_MAX_EVENTS", "64"))
+    memory_flush_interval_ms: int = int(os.getenv("MEMORY_FLUSH_INTERVAL_MS", "20"))
+    memory_fsync: bool = os.getenv("MEMORY_FSYNC", "false").lower() == "true"
+
+    # Scaffold templates and plan rules (JSON); built-in definitions when unset
+    templates_path: str | None = os.getenv("TEMPLATES_PATH", None)
+
+    # Tool execution: per-call timeout, overall and per-tool concurrency caps
+    tool_timeout_s: float = float(os.getenv("TOOL_TIMEOUT_S", "30"))
+    tool_max_concurrency: int = int(os.getenv("TOOL_MAX_CONCURRENCY", "8"))
+    tool_limits: Dict[str, int] = field(default_factory=lambda: _parse_limits(os.getenv("TOOL_LIMITS", "code_execute=2")))
+
+    # Real http_fetch: shared client pool, body preview cap, conditional-GET cache
+    http_max_connections: int = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+    http_max_per_host: int = int(os.getenv("HTTP_MAX_PER_HOST", "10"))
+    http_timeout_s: float = float(os.getenv("HTTP_TIMEOUT_S", "10"))
+    http_preview_chars: int = int(os.getenv("HTTP_PREVIEW_CHARS", "500"))
+    http_cache_entries: int = int(os.getenv("HTTP_CACHE_ENTRIES", "256"))
+
+    # Real code_execute: concurrent runs (0 = CPU count), admission queue, per-run limits
+    exec_max_concurrency: int = int(os.getenv("EXEC_MAX_CONCURRENCY", "0"))
+    exec_max_queue: int = int(os.getenv("EXEC_MAX_QUEUE", "32"))
+    exec_cpu_seconds: int = int(os.getenv("EXEC_CPU_SECONDS", "10"))
+    exec_memory_mb: int = int(os.getenv("EXEC_MEMORY_MB", "512"))
+    exec_timeout_s: float = float(os.getenv("EXEC_TIMEOUT_S", "10"))
+    exec_max_output_bytes: int = int(os.getenv("EXEC_MAX_OUTPUT_BYTES", "65536"))
+    # Warm interpreters forking each run (0 disables), recycled after this many runs
+    exec_warm_pool_size: int = int(os.getenv("EXEC_WARM_POOL_SIZE", "2"))
+    exec_warm_max_runs: int = int(os.getenv("EXEC_WARM_MAX_RUNS", "100"))
+    exec_warm_preload: List[str] = field(default_factory=lambda: _split_comma(os.getenv("EXEC_WARM_PRELOAD", "argparse,json")))
+
+    # Per-session sandboxes under sandbox_dir, files cloned from shared blobs, LRU GC under a quota.
+    # SANDBOX_LINK: reflink (falls back to copies), copy, or hardlink (only if nothing writes files in place)
+    sandbox_per_session: bool = os.getenv("SANDBOX_PER_SESSION", "true").lower() == "true"
+    sandbox_quota_mb: int = int(os.getenv("SANDBOX_QUOTA_MB", "1024"))
+    sandbox_idle_ttl_s: float = float(os.getenv("SANDBOX_IDLE_TTL_S", "86400"))
+    sandbox_gc_interval_s: float = float(os.getenv("SANDBOX_GC_INTERVAL_S", "60"))
+    sandbox_link: str = os.getenv("SANDBOX_LINK", "reflink")
+
     # Safety
     allow_execute: bool = os.getenv("ALLOW_EXECUTE", "false").lower() == "true"
 
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from contextlib import nullcontext
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from .tools import ToolResult
+
+
+@dataclass
+class ToolStep:
+    """One tool call in a graph.
+
+    ``run`` receives the results of the steps finished so far and returns the
+    step's ToolResult. It starts once every step named in ``deps`` succeeded.
+    """
+    name: str
+    run: Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]
+    deps: Tuple[str, ...] = ()
+    timeout: Optional[float] = None
+
+
+class ToolGraph:
+    """Runs tool steps concurrently in dependency order.
+
+    ``max_concurrency`` caps running steps overall and ``limits`` caps them
+    per step name; both hold across every graph this executor runs. Steps
+    without their own timeout get ``timeout``.
+    """
+
+    def __init__(self, max_concurrency: int = 8, limits: Optional[Dict[str, int]] = None, timeout: Optional[float] = None):
+        self.timeout = timeout
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self._limits = {name: asyncio.Semaphore(n) for name, n in (limits or {}).items()}
+
+    @staticmethod
+    def _order(steps: List[ToolStep]) -> List[ToolStep]:
+        by_name = {s.name: s for s in steps}
+        if len(by_name) != len(steps):
+            raise ValueError("tool step names must be unique")
+        for step in steps:
+            for dep in step.deps:
+                if dep not in by_name:
+                    raise ValueError(f"step {step.name!r} depends on unknown step {dep!r}")
+        ordered: List[ToolStep] = []
+        done: set = set()
+        remaining = list(steps)
+        while remaining:
+            ready = [s for s in remaining if all(d in done for d in s.deps)]
+            if not ready:
+                raise ValueError("tool steps contain a dependency cycle: " + ", ".join(s.name for s in remaining))
+            ordered.extend(ready)
+            done.update(s.name for s in ready)
+            remaining = [s for s in remaining if s.name not in done]
+        return ordered
+
+    async def run(self, steps: List[ToolStep]) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, Any]]:
+        """Run ``steps`` and return their results keyed by step name, plus timings.
+
+        Timings give the graph's total wall time and, per step, the start
+        offset and duration in milliseconds and the step's status.
+        """
+        ordered = self._order(steps)
+        results: Dict[str, Dict[str, Any]] = {}
+        timings: Dict[str, Dict[str, Any]] = {}
+        tasks: Dict[str, asyncio.Task] = {}
+        origin = time.perf_counter()
+
+        async def run_step(step: ToolStep) -> None:
+            if step.deps:
+                await asyncio.gather(*(tasks[d] for d in step.deps))
+                failed = [d for d in step.deps if not results[d].get("ok")]
+                if failed:
+                    results[step.name] = ToolResult(ok=False, type=step.name, skipped=True, error=f"dependency failed: {', '.join(failed)}", timestamp=time.time())
+                    timings[step.name] = {"start_ms": None, "duration_ms": 0.0, "status": "skipped"}
+                    return
+            timeout = step.timeout if step.timeout is not None else self.timeout
+            # Take the per-tool slot first so a capped tool never sits on a global one
+            async with self._limits.get(step.name, nullcontext()), self._slots:
+                start = time.perf_counter()
+                try:
+                    results[step.name] = await asyncio.wait_for(step.run(results), timeout)
+                    status = "ok" if results[step.name].get("ok") else "error"
+                except asyncio.TimeoutError:
+                    results[step.name] = ToolResult(ok=False, type=step.name, error=f"timed out after {timeout}s", timestamp=time.time())
+                    status = "timeout"
+                except Exception as e:
+                    results[step.name] = ToolResult(ok=False, type=step.name, error=str(e), timestamp=time.time())
+                    status = "error"
+            end = time.perf_counter()
+            timings[step.name] = {
+                "start_ms": round((start - origin) * 1000, 3),
+                "duration_ms": round((end - start) * 1000, 3),
+                "status": status,
+            }
+
+        for step in ordered:
+            tasks[step.name] = asyncio.create_task(run_step(step))
+        try:
+            await asyncio.gather(*tasks.values())
+        finally:
+            for task in tasks.values():
+                task.cancel()
+        return results, {"total_ms": round((time.perf_counter() - origin) * 1000, 3), "steps": timings}
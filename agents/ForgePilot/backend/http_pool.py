@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import asyncio
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+
+@dataclass
+class FetchResult:
+    status: int
+    preview: str
+    truncated: bool = False
+    cached: bool = False
+
+
+@dataclass
+class _CacheEntry:
+    status: int
+    preview: str
+    truncated: bool
+    etag: Optional[str]
+    last_modified: Optional[str]
+
+
+class HttpPool:
+    """Shared keep-alive client for real ``http_fetch`` calls.
+
+    One ``httpx.AsyncClient`` serves every request, so connections are
+    reused; ``max_per_host`` bounds requests in flight to any one host.
+    Bodies are streamed and reading stops at ``preview_chars``. With
+    ``cache_entries`` set, GET previews are kept and revalidated with
+    If-None-Match / If-Modified-Since, so unchanged resources cost a 304.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = 100,
+        max_keepalive: int = 20,
+        max_per_host: int = 10,
+        timeout: float = 10.0,
+        preview_chars: int = 500,
+        cache_entries: int = 256,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive)
+        self.max_per_host = max_per_host
+        self.timeout = timeout
+        self.preview_chars = preview_chars
+        self.cache_entries = cache_entries
+        self._transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._hosts: Dict[str, asyncio.Semaphore] = {}
+        self._cache: "OrderedDict[str, _CacheEntry]" = OrderedDict()
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # Opened on first use too, so tools work outside the app lifespan
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(timeout=self.timeout, limits=self.limits, transport=self._transport)
+        return self._client
+
+    async def start(self) -> None:
+        self.client
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _host_slot(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).netloc.lower()
+        slot = self._hosts.get(host)
+        if slot is None:
+            slot = self._hosts[host] = asyncio.Semaphore(self.max_per_host)
+        return slot
+
+    async def fetch(self, method: str, url: str, headers: Optional[Dict[str, str]] = None, body: Optional[Any] = None) -> FetchResult:
+        headers = dict(headers or {})
+        # Only plain GETs are cached; caller-supplied validators are passed through untouched
+        cacheable = (
+            self.cache_entries > 0
+            and method.upper() == "GET"
+            and body is None
+            and not any(k.lower() in ("if-none-match", "if-modified-since") for k in headers)
+        )
+        entry = self._cache.get(url) if cacheable else None
+        if entry is not None:
+            if entry.etag:
+                headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                headers["If-Modified-Since"] = entry.last_modified
+
+        async with self._host_slot(url):
+            async with self.client.stream(method, url, headers=headers, data=body) as resp:
+                if resp.status_code == 304 and entry is not None:
+                    self._cache.move_to_end(url)
+                    return FetchResult(status=entry.status, preview=entry.preview, truncated=entry.truncated, cached=True)
+                preview, truncated = await self._read_preview(resp)
+
+        if cacheable:
+            etag, last_modified = resp.headers.get("etag"), resp.headers.get("last-modified")
+            if resp.status_code == 200 and (etag or last_modified):
+                self._cache[url] = _CacheEntry(resp.status_code, preview, truncated, etag, last_modified)
+                self._cache.move_to_end(url)
+                while len(self._cache) > self.cache_entries:
+                    self._cache.popitem(last=False)
+            else:
+                self._cache.pop(url, None)
+        return FetchResult(status=resp.status_code, preview=preview, truncated=truncated)
+
+    async def _read_preview(self, resp: httpx.Response):
+        parts = []
+        size = 0
+        async for text in resp.aiter_text():
+            parts.append(text)
+            size += len(text)
+            if size > self.preview_chars:
+                # Leaving the stream early drops the rest of the body unread
+                return "".join(parts)[: self.preview_chars], True
+        return "".join(parts), False
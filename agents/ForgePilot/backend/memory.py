@@ -1,11 +1,17 @@
 from __future__ import annotations
 
+import asyncio
 import json
+import logging
 import os
+import struct
+import threading
 import time
 import uuid
+from collections import OrderedDict, deque
 from dataclasses import dataclass, asdict
-from typing import Any, Dict, List, Optional
+from itertools import islice
+from typing import Any, Deque, Dict, List, Optional, Tuple
 
 
 @dataclass
@@ -17,51 +23,385 @@ class MemoryEvent:
     content: Dict[str, Any]
 
 
+@dataclass
+class MemoryPage:
+    events: List[MemoryEvent]
+    start: int  # position of the first record in the session log
+    end: int  # position one past the last record
+    total: int  # records in the session log
+
+
+# Each index entry is the byte offset at which the matching log record ends.
+_OFFSET = struct.Struct(">Q")
+
+logger = logging.getLogger(__name__)
+
+
+def _page_bounds(total: int, limit: int, before: Optional[int], after: Optional[int]) -> Tuple[int, int]:
+    limit = max(0, limit)
+    if after is not None:
+        start = max(0, min(after, total))
+        return start, min(total, start + limit)
+    end = total if before is None else max(0, min(before, total))
+    return max(0, end - limit), end
+
+
+@dataclass
+class _CachedSession:
+    events: Deque[MemoryEvent]
+    total: int  # records in the session log, including ones still queued for writing
+
+
 class SessionMemory:
-    def __init__(self, max_events: int = 100):
+    """Read-through cache of the most recent events of each session.
+
+    Every cached session is a ring buffer of its last ``max_events`` events,
+    so any page inside that window is served without file I/O. Whole
+    sessions are evicted least recently used first once the cache holds more
+    than ``max_total_events`` events.
+    """
+
+    def __init__(self, max_events: int = 100, max_total_events: int = 10_000):
         self.max_events = max_events
-        self._buffer: List[MemoryEvent] = []
+        self.max_total_events = max_total_events
+        self._sessions: "OrderedDict[str, _CachedSession]" = OrderedDict()
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._sessions
+
+    def seed(self, session_id: str, total: int) -> None:
+        """Start caching a session whose log already holds ``total`` records."""
+        if session_id not in self._sessions:
+            self._sessions[session_id] = _CachedSession(events=deque(maxlen=self.max_events), total=total)
+            self._evict()
 
     def append(self, event: MemoryEvent) -> None:
-        self._buffer.append(event)
-        if len(self._buffer) > self.max_events:
-            self._buffer = self._buffer[-self.max_events :]
+        entry = self._sessions.get(event.session_id)
+        if entry is None:
+            return
+        if len(entry.events) < self.max_events:
+            self._size += 1
+        entry.events.append(event)
+        entry.total += 1
+        self._sessions.move_to_end(event.session_id)
+        self._evict()
+
+    def fill(self, session_id: str, page: MemoryPage) -> None:
+        """Cache a tail page read from disk if it widens the cached window."""
+        if page.end != page.total or page.total == 0 or len(page.events) != page.end - page.start:
+            return  # not a tail, nothing to cache, or the page skipped corrupt records
+        entry = self._sessions.get(session_id)
+        if entry is not None and (entry.total != page.total or len(entry.events) >= len(page.events)):
+            return
+        if entry is not None:
+            self._size -= len(entry.events)
+        events = deque(page.events[-self.max_events :], maxlen=self.max_events)
+        self._sessions[session_id] = _CachedSession(events=events, total=page.total)
+        self._sessions.move_to_end(session_id)
+        self._size += len(events)
+        self._evict()
+
+    def get(self, session_id: str, limit: int = 100, before: Optional[int] = None, after: Optional[int] = None) -> Optional[MemoryPage]:
+        entry = self._sessions.get(session_id)
+        if entry is not None:
+            start, end = _page_bounds(entry.total, limit, before, after)
+            lo = entry.total - len(entry.events)
+            if start >= lo or start >= end:
+                self.hits += 1
+                self._sessions.move_to_end(session_id)
+                events = list(islice(entry.events, start - lo, end - lo)) if start < end else []
+                return MemoryPage(events=events, start=start, end=max(start, end), total=entry.total)
+        self.misses += 1
+        return None
 
-    def recent(self, limit: int = 20) -> List[MemoryEvent]:
-        return self._buffer[-limit:]
+    def recent(self, session_id: str, limit: int = 20) -> List[MemoryEvent]:
+        entry = self._sessions.get(session_id)
+        return list(entry.events)[-limit:] if entry else []
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "sessions": len(self._sessions),
+            "events": self._size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+        }
+
+    def _evict(self) -> None:
+        # Sessions seeded but never written to hold no events; cap their number too
+        while (self._size > self.max_total_events or len(self._sessions) > self.max_total_events) and len(self._sessions) > 1:
+            _, entry = self._sessions.popitem(last=False)
+            self._size -= len(entry.events)
+            self.evictions += 1
 
 
 class PersistentMemory:
+    """JSONL session log with a sidecar ``<session_id>.idx`` offset index.
+
+    The index lets reads seek straight to the requested records instead of
+    decoding the whole history. It is rebuilt or caught up from the log
+    whenever the two disagree, so logs written by older versions still work.
+    """
+
     def __init__(self, data_dir: str):
         self.data_dir = data_dir
         os.makedirs(self.data_dir, exist_ok=True)
+        # Appends may come from the group-commit writer thread while reads run on the loop
+        self._lock = threading.RLock()
 
     def _path(self, session_id: str) -> str:
         return os.path.join(self.data_dir, f"{session_id}.jsonl")
 
+    def _index_path(self, session_id: str) -> str:
+        return os.path.join(self.data_dir, f"{session_id}.idx")
+
+    def _sync_index(self, session_id: str) -> int:
+        """Bring the offset index in line with the log and return the record count."""
+        try:
+            size = os.path.getsize(self._path(session_id))
+        except FileNotFoundError:
+            return 0
+        with open(self._index_path(session_id), "a+b") as idx:
+            idx_size = idx.seek(0, os.SEEK_END)
+            count = idx_size // _OFFSET.size
+            indexed = 0
+            if count:
+                idx.seek((count - 1) * _OFFSET.size)
+                indexed = _OFFSET.unpack(idx.read(_OFFSET.size))[0]
+            if indexed > size or idx_size % _OFFSET.size:
+                # Log was truncated or the index is torn: rebuild from scratch
+                idx.truncate(0)
+                count, indexed = 0, 0
+            if indexed == size:
+                return count
+            offsets: List[int] = []
+            with open(self._path(session_id), "rb") as f:
+                f.seek(indexed)
+                pos = indexed
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break  # partially written record
+                    pos += len(line)
+                    offsets.append(pos)
+            idx.write(b"".join(_OFFSET.pack(o) for o in offsets))
+            return count + len(offsets)
+
     def append(self, event: MemoryEvent) -> None:
-        with open(self._path(event.session_id), "a", encoding="utf-8") as f:
-            f.write(json.dumps(asdict(event), ensure_ascii=False) + "\n")
+        self.append_many(event.session_id, [event])
+
+    def append_many(self, session_id: str, events: List[MemoryEvent], fsync: bool = False) -> None:
+        lines = [(json.dumps(asdict(e), ensure_ascii=False) + "\n").encode("utf-8") for e in events]
+        with self._lock:
+            self._sync_index(session_id)
+            with open(self._path(session_id), "ab") as f:
+                end = f.tell()
+                f.write(b"".join(lines))
+                if fsync:
+                    f.flush()
+                    os.fsync(f.fileno())
+            offsets = []
+            for line in lines:
+                end += len(line)
+                offsets.append(_OFFSET.pack(end))
+            with open(self._index_path(session_id), "ab") as idx:
+                idx.write(b"".join(offsets))
+                if fsync:
+                    idx.flush()
+                    os.fsync(idx.fileno())
+
+    def count(self, session_id: str) -> int:
+        with self._lock:
+            return self._sync_index(session_id)
+
+    def read(self, session_id: str, limit: int = 100, before: Optional[int] = None, after: Optional[int] = None) -> MemoryPage:
+        """Read up to ``limit`` records by position.
+
+        Without cursors this is the tail of the log. ``before=N`` pages back
+        from position N, ``after=N`` pages forward from it; the returned
+        page's ``start``/``end`` are the cursors for the adjacent pages.
+        """
+        with self._lock:
+            return self._read(session_id, limit, before, after)
+
+    def _read(self, session_id: str, limit: int, before: Optional[int], after: Optional[int]) -> MemoryPage:
+        total = self._sync_index(session_id)
+        start, end = _page_bounds(total, limit, before, after)
+        if start >= end:
+            return MemoryPage(events=[], start=start, end=start, total=total)
+
+        with open(self._index_path(session_id), "rb") as idx:
+            lo = 0
+            if start:
+                idx.seek((start - 1) * _OFFSET.size)
+                lo = _OFFSET.unpack(idx.read(_OFFSET.size))[0]
+            idx.seek((end - 1) * _OFFSET.size)
+            hi = _OFFSET.unpack(idx.read(_OFFSET.size))[0]
+        with open(self._path(session_id), "rb") as f:
+            f.seek(lo)
+            blob = f.read(hi - lo)
 
-    def load(self, session_id: str, limit: int = 100) -> List[MemoryEvent]:
-        path = self._path(session_id)
-        if not os.path.exists(path):
-            return []
         events: List[MemoryEvent] = []
-        with open(path, "r", encoding="utf-8") as f:
-            for line in f:
+        for line in blob.splitlines():
+            try:
+                raw = json.loads(line)
+                events.append(MemoryEvent(**raw))
+            except Exception:
+                continue
+        return MemoryPage(events=events, start=start, end=end, total=total)
+
+    def load(self, session_id: str, limit: int = 100, before: Optional[int] = None, after: Optional[int] = None) -> List[MemoryEvent]:
+        return self.read(session_id, limit=limit, before=before, after=after).events
+
+
+class GroupCommitWriter:
+    """Persists queued events from a background task, off the event loop.
+
+    Events are collected until ``max_batch`` are pending or ``flush_interval``
+    seconds have passed since the first one, then written with a single
+    append per session file. ``fsync=True`` syncs every batch to disk.
+    """
+
+    def __init__(self, persistent: PersistentMemory, max_batch: int = 64, flush_interval: float = 0.02, fsync: bool = False):
+        self.persistent = persistent
+        self.max_batch = max(1, max_batch)
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self._queue: Optional[asyncio.Queue] = None
+        self._batch_full: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._pending: Dict[str, int] = {}
+        # Per session: [events still ahead of the waiter, future set once they are written]
+        self._waiters: Dict[str, List[list]] = {}
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._queue = asyncio.Queue()
+        self._batch_full = asyncio.Event()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def pending(self, session_id: str) -> int:
+        """Events of ``session_id`` queued or being written but not yet on disk."""
+        return self._pending.get(session_id, 0)
+
+    def submit(self, event: MemoryEvent) -> None:
+        self._pending[event.session_id] = self._pending.get(event.session_id, 0) + 1
+        self._queue.put_nowait(event)
+        if self._queue.qsize() >= self.max_batch:
+            self._batch_full.set()
+
+    async def flush(self) -> None:
+        if self._queue is not None:
+            await self._queue.join()
+
+    async def flush_session(self, session_id: str) -> None:
+        """Wait until the events of ``session_id`` queued so far are on disk.
+
+        Unlike ``flush`` this does not wait for other sessions, so it returns
+        at once for an idle session however busy the writer is.
+        """
+        ahead = self.pending(session_id)
+        if not ahead:
+            return
+        waiter = [ahead, asyncio.get_running_loop().create_future()]
+        self._waiters.setdefault(session_id, []).append(waiter)
+        await waiter[1]
+
+    async def close(self) -> None:
+        """Write everything still queued, then stop the background task."""
+        if not self.running:
+            return
+        task, self._task = self._task, None
+        self._queue.put_nowait(None)
+        self._batch_full.set()
+        await task
+        self._queue = None
+        self._batch_full = None
+
+    async def _run(self) -> None:
+        queue = self._queue
+        stopping = False
+        while not stopping:
+            batch = [await queue.get()]
+            if batch[0] is not None and queue.qsize() + 1 < self.max_batch and self.flush_interval > 0:
+                self._batch_full.clear()
                 try:
-                    raw = json.loads(line)
-                    events.append(MemoryEvent(**raw))
-                except Exception:
-                    continue
-        return events[-limit:]
+                    await asyncio.wait_for(self._batch_full.wait(), self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+            while len(batch) < self.max_batch and not queue.empty():
+                batch.append(queue.get_nowait())
+            events = [e for e in batch if e is not None]
+            stopping = len(events) < len(batch)
+            try:
+                if events:
+                    await asyncio.to_thread(self._write, events)
+            except Exception:
+                logger.exception("Failed to persist %d memory events", len(events))
+            finally:
+                for event in events:
+                    left = self._pending[event.session_id] - 1
+                    if left:
+                        self._pending[event.session_id] = left
+                    else:
+                        del self._pending[event.session_id]
+                    self._written(event.session_id)
+                for _ in batch:
+                    queue.task_done()
+
+    def _written(self, session_id: str) -> None:
+        waiters = self._waiters.get(session_id)
+        if not waiters:
+            return
+        for waiter in waiters:
+            waiter[0] -= 1
+            if waiter[0] <= 0 and not waiter[1].done():
+                waiter[1].set_result(None)
+        waiters[:] = [w for w in waiters if w[0] > 0 and not w[1].done()]
+        if not waiters:
+            del self._waiters[session_id]
+
+    def _write(self, events: List[MemoryEvent]) -> None:
+        by_session: Dict[str, List[MemoryEvent]] = {}
+        for event in events:
+            by_session.setdefault(event.session_id, []).append(event)
+        for session_id, session_events in by_session.items():
+            self.persistent.append_many(session_id, session_events, fsync=self.fsync)
 
 
 class MemoryBus:
-    def __init__(self, data_dir: str, max_events: int = 100):
-        self.in_memory = SessionMemory(max_events=max_events)
+    def __init__(
+        self,
+        data_dir: str,
+        max_events: int = 100,
+        max_cached_events: int = 10_000,
+        flush_max_events: int = 64,
+        flush_interval: float = 0.02,
+        fsync: bool = False,
+    ):
+        self.in_memory = SessionMemory(max_events=max_events, max_total_events=max_cached_events)
         self.persistent = PersistentMemory(data_dir=data_dir)
+        self.writer = GroupCommitWriter(self.persistent, max_batch=flush_max_events, flush_interval=flush_interval, fsync=fsync)
+
+    def start(self) -> None:
+        """Route persistence through the background writer (needs a running loop)."""
+        self.writer.start()
+
+    async def flush(self) -> None:
+        await self.writer.flush()
+
+    async def close(self) -> None:
+        await self.writer.close()
 
     def add(self, session_id: str, role: str, type_: str, content: Dict[str, Any]) -> MemoryEvent:
         event = MemoryEvent(
@@ -71,14 +411,41 @@ class MemoryBus:
             type=type_,
             content=content,
         )
+        # Only sessions already cached are kept current here; any other is cached
+        # by its first read, so adding an event never touches the disk on the loop
         self.in_memory.append(event)
-        self.persistent.append(event)
+        if self.writer.running:
+            self.writer.submit(event)
+        else:
+            self.persistent.append(event)
         return event
 
-    def get_session(self, session_id: str, limit: int = 100) -> List[MemoryEvent]:
+    def get_session(self, session_id: str, limit: int = 100, before: Optional[int] = None, after: Optional[int] = None) -> List[MemoryEvent]:
+        return self.get_page(session_id, limit=limit, before=before, after=after).events
+
+    def get_page(self, session_id: str, limit: int = 100, before: Optional[int] = None, after: Optional[int] = None) -> MemoryPage:
+        page = self.in_memory.get(session_id, limit=limit, before=before, after=after)
+        if page is not None:
+            return page
+        return self._load_page(session_id, limit, before, after)
+
+    async def read_page(self, session_id: str, limit: int = 100, before: Optional[int] = None, after: Optional[int] = None) -> MemoryPage:
+        """Like ``get_page``, but waits for the session's queued writes before falling back to disk."""
+        page = self.in_memory.get(session_id, limit=limit, before=before, after=after)
+        if page is not None:
+            return page
+        await self.writer.flush_session(session_id)
+        return self._load_page(session_id, limit, before, after)
+
+    def _load_page(self, session_id: str, limit: int, before: Optional[int], after: Optional[int]) -> MemoryPage:
         # Favor persisted history to survive restarts
-        return self.persistent.load(session_id, limit=limit)
+        page = self.persistent.read(session_id, limit=limit, before=before, after=after)
+        if not self.writer.pending(session_id):
+            self.in_memory.fill(session_id, page)
+        return page
 
-    @staticmethod
-    def new_session_id() -> str:
-        return str(uuid.uuid4())
\ No newline at end of file
+    def new_session_id(self) -> str:
+        session_id = str(uuid.uuid4())
+        # A fresh id has no log yet, so its events can be cached from the start
+        self.in_memory.seed(session_id, total=0)
+        return session_id
\ No newline at end of file
@@ -0,0 +1,220 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set
+
+try:
+    import fcntl
+except ImportError:  # no reflinks off POSIX
+    fcntl = None
+
+FICLONE = 0x40049409  # Linux ioctl cloning a file's extents (btrfs, xfs, ...)
+
+
+@dataclass
+class CommitResult:
+    commit: str
+    tree: str
+    parent: Optional[str]
+    written: List[str] = field(default_factory=list)
+    unchanged: List[str] = field(default_factory=list)
+    empty: bool = False
+
+
+def _object_id(kind: str, data: bytes) -> str:
+    # Same framing as git, so blob ids match `git hash-object`
+    return hashlib.sha1(f"{kind} {len(data)}\0".encode() + data).hexdigest()
+
+
+class ObjectStore:
+    """Content-addressed commits of a sandbox, kept under ``<root>/.forgepilot``.
+
+    Blobs, trees and commits are stored by id in ``objects/``; ``HEAD`` names
+    the last commit and ``index.json`` records, per working file, the blob it
+    holds plus the size and mtime it had when written. Committing hashes every
+    file but only writes files whose blob changed or whose working copy was
+    touched since, and a commit whose tree matches HEAD writes nothing at all.
+    Commit ids depend only on tree, parent and message, so they are
+    reproducible.
+
+    ``objects_dir`` lets several sandboxes share one object directory. With
+    ``link="reflink"``, working files are cloned from their blob where the
+    filesystem supports it (btrfs, xfs, ...), so identical files across
+    sandboxes share disk space yet stay copy-on-write; elsewhere each gets
+    a private copy. ``link="hardlink"`` shares the blob's inode itself:
+    only for sandboxes whose files are never written in place, since such a
+    write changes every sandbox linking it. Blobs are then made read-only
+    and hashed before each link, and a damaged one is rewritten first.
+
+    Blocking; call ``commit`` from a worker thread.
+    """
+
+    def __init__(self, root: str, objects_dir: Optional[str] = None, link: str = "copy"):
+        self.root = root
+        self.dir = os.path.join(root, ".forgepilot")
+        self.objects = objects_dir or os.path.join(self.dir, "objects")
+        self.link = link
+        self._lock = threading.Lock()
+
+    def _path(self, oid: str) -> str:
+        return os.path.join(self.objects, oid[:2], oid[2:])
+
+    def _put(self, oid: str, data: bytes) -> None:
+        path = self._path(oid)
+        try:
+            # Refresh an existing object's ctime so the GC grace period covers
+            # this commit too until HEAD makes it reachable. Not its mtime:
+            # hardlinked sandbox files share it and their index compares it.
+            os.chmod(path, os.stat(path).st_mode & 0o7777)
+            return
+        except FileNotFoundError:
+            pass
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        write_atomic(path, data)
+        if self.link == "hardlink":
+            os.chmod(path, 0o444)
+
+    def _checkout(self, oid: str, path: str, data: bytes) -> None:
+        blob = self._path(oid)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        if self.link == "reflink" and _reflink(blob, tmp):
+            os.replace(tmp, path)
+            return
+        if self.link == "hardlink":
+            try:
+                with open(blob, "rb") as f:
+                    intact = _object_id("blob", f.read()) == oid
+                if not intact:
+                    # Written in place through some sandbox's link; new inode
+                    write_atomic(blob, data)
+                    os.chmod(blob, 0o444)
+                os.link(blob, tmp)
+                os.replace(tmp, path)
+                return
+            except OSError:
+                pass  # e.g. objects on another filesystem
+        write_atomic(path, data)
+
+    def get(self, oid: str) -> bytes:
+        with open(self._path(oid), "rb") as f:
+            return f.read()
+
+    def head(self) -> Optional[str]:
+        try:
+            with open(os.path.join(self.dir, "HEAD"), "r", encoding="utf-8") as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def tree_id(self, commit: str) -> str:
+        return self.get(commit).split(b"\n", 1)[0].split(b" ", 1)[1].decode()
+
+    def tree(self, commit: Optional[str]) -> Dict[str, str]:
+        """Map of path -> blob id for ``commit`` (empty for None)."""
+        if commit is None:
+            return {}
+        entries: Dict[str, str] = {}
+        for line in self.get(self.tree_id(commit)).decode("utf-8").splitlines():
+            blob, path = line.split(" ", 1)
+            entries[path] = blob
+        return entries
+
+    def reachable(self) -> Set[str]:
+        """Ids of every object reachable from HEAD."""
+        seen: Set[str] = set()
+        commit = self.head()
+        while commit and commit not in seen:
+            seen.add(commit)
+            header = self.get(commit).decode("utf-8").split("\n\n", 1)[0].splitlines()
+            fields = dict(line.split(" ", 1) for line in header)
+            seen.add(fields["tree"])
+            seen.update(self.tree(commit).values())
+            commit = fields.get("parent")
+        return seen
+
+    def _load_index(self) -> Dict[str, Dict[str, int]]:
+        try:
+            with open(os.path.join(self.dir, "index.json"), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _is_current(self, path: str, entry: Optional[Dict], blob: str) -> bool:
+        if entry is None or entry.get("blob") != blob:
+            return False
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return False
+        return st.st_size == entry["size"] and st.st_mtime_ns == entry["mtime_ns"]
+
+    def commit(self, message: str, changes: Dict[str, str]) -> CommitResult:
+        """Apply ``changes`` (path -> text) on top of HEAD and commit the result."""
+        blobs = {}
+        for rel, content in changes.items():
+            data = content.encode("utf-8")
+            blobs[rel] = (_object_id("blob", data), data)
+
+        with self._lock:
+            parent = self.head()
+            files = self.tree(parent)
+            files.update({rel: oid for rel, (oid, _) in blobs.items()})
+            tree_data = "".join(f"{oid} {rel}\n" for rel, oid in sorted(files.items())).encode("utf-8")
+            tree_id = _object_id("tree", tree_data)
+
+            index = self._load_index()
+            written, unchanged = [], []
+            for rel, (oid, data) in blobs.items():
+                path = os.path.join(self.root, rel)
+                if self._is_current(path, index.get(rel), oid):
+                    unchanged.append(rel)
+                    continue
+                self._put(oid, data)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                self._checkout(oid, path, data)
+                st = os.stat(path)
+                index[rel] = {"blob": oid, "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+                written.append(rel)
+
+            if parent is not None and self.tree_id(parent) == tree_id:
+                if written:
+                    self._save_index(index)
+                return CommitResult(commit=parent, tree=tree_id, parent=parent, written=written, unchanged=unchanged, empty=True)
+
+            commit_data = f"tree {tree_id}\n" + (f"parent {parent}\n" if parent else "") + f"\n{message}\n"
+            commit_id = _object_id("commit", commit_data.encode("utf-8"))
+            self._put(tree_id, tree_data)
+            self._put(commit_id, commit_data.encode("utf-8"))
+            self._save_index(index)
+            write_atomic(os.path.join(self.dir, "HEAD"), commit_id.encode())
+            return CommitResult(commit=commit_id, tree=tree_id, parent=parent, written=written, unchanged=unchanged)
+
+    def _save_index(self, index: Dict[str, Dict[str, int]]) -> None:
+        os.makedirs(self.dir, exist_ok=True)
+        write_atomic(os.path.join(self.dir, "index.json"), json.dumps(index, sort_keys=True).encode("utf-8"))
+
+
+def write_atomic(path: str, data: bytes) -> None:
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def _reflink(src: str, dst: str) -> bool:
+    if fcntl is None:
+        return False
+    try:
+        with open(src, "rb") as s, open(dst, "wb") as d:
+            fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+        return True
+    except OSError:
+        try:
+            os.remove(dst)
+        except OSError:
+            pass
+        return False
@@ -0,0 +1,250 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import signal
+import sys
+import time
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+
+try:
+    import resource
+except ImportError:  # not available on Windows; runs there are bounded by wall clock only
+    resource = None
+
+from .warm_pool import WarmPool
+
+OutputCallback = Callable[[str, bytes], None]
+
+
+class RunnerBusy(Exception):
+    """Raised when the execution queue is full."""
+
+
+@dataclass
+class RunResult:
+    returncode: Optional[int]
+    stdout: str
+    stderr: str
+    timed_out: bool = False
+    truncated: bool = False
+    queued_ms: float = 0.0
+    duration_ms: float = 0.0
+
+
+class CodeRunner:
+    """Runs snippets as asyncio subprocesses without blocking the event loop.
+
+    At most ``max_concurrent`` run at once; up to ``max_queue`` more wait for
+    a slot and anything beyond that is refused with RunnerBusy. Each child
+    gets CPU-time, address-space and file-size rlimits, is killed (with its
+    process group) after ``timeout`` seconds, and has its stdout and stderr
+    read as they arrive, keeping at most ``max_output_bytes`` of each.
+    With a WarmPool, Python scripts run in children forked from a warm
+    interpreter instead of a freshly started one.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: Optional[int] = None,
+        max_queue: int = 32,
+        cpu_seconds: int = 10,
+        memory_mb: int = 512,
+        timeout: float = 10.0,
+        max_output_bytes: int = 64 * 1024,
+        python: str = sys.executable,
+        pool: Optional[WarmPool] = None,
+    ):
+        self.max_concurrent = max_concurrent or os.cpu_count() or 1
+        self.max_queue = max_queue
+        self.cpu_seconds = cpu_seconds
+        self.memory_mb = memory_mb
+        self.timeout = timeout
+        self.max_output_bytes = max_output_bytes
+        self.python = python
+        self.pool = pool
+        self._slots = asyncio.Semaphore(self.max_concurrent)
+        self._waiting = 0
+        self.running = 0
+
+    def stats(self) -> dict:
+        stats = {"running": self.running, "waiting": self._waiting, "max_concurrent": self.max_concurrent, "max_queue": self.max_queue}
+        if self.pool is not None:
+            stats["warm_pool"] = self.pool.stats()
+        return stats
+
+    def _limit_child(self) -> None:
+        # Runs in the child between fork and exec
+        if resource is None:
+            return
+        resource.setrlimit(resource.RLIMIT_CPU, (self.cpu_seconds, self.cpu_seconds + 1))
+        if self.memory_mb:
+            limit = self.memory_mb * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+        limit = self._fsize_limit()
+        resource.setrlimit(resource.RLIMIT_FSIZE, (limit, limit))
+
+    async def _admit(self) -> float:
+        if self._waiting >= self.max_queue and self._slots.locked():
+            raise RunnerBusy(f"execution queue is full ({self.max_queue} waiting)")
+        queued = time.perf_counter()
+        self._waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self._waiting -= 1
+        return (time.perf_counter() - queued) * 1000
+
+    async def run_python(self, path: str, cwd: Optional[str] = None, on_output: Optional[OutputCallback] = None) -> RunResult:
+        return await self.run([self.python, path], cwd=cwd, on_output=on_output)
+
+    async def run(self, argv: List[str], cwd: Optional[str] = None, on_output: Optional[OutputCallback] = None) -> RunResult:
+        """Run ``argv`` under the limits; ``on_output(stream, chunk)`` sees output as it arrives."""
+        queued_ms = await self._admit()
+        self.running += 1
+        try:
+            return await self._run(argv, cwd, on_output, queued_ms)
+        finally:
+            self.running -= 1
+            self._slots.release()
+
+    async def _run(self, argv: List[str], cwd: Optional[str], on_output: Optional[OutputCallback], queued_ms: float) -> RunResult:
+        started = time.perf_counter()
+        if self.pool is not None and len(argv) == 2 and argv[0] == self.python:
+            returncode, out, timed_out = await self._run_warm(argv[1], cwd, on_output)
+        else:
+            out = _Output(self.max_output_bytes)
+            proc = await asyncio.create_subprocess_exec(
+                *argv,
+                cwd=cwd,
+                stdin=asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                preexec_fn=self._limit_child if resource is not None else None,
+                start_new_session=True,
+            )
+            timed_out = await self._collect(proc.stdout, proc.stderr, proc.wait, lambda: self._kill(proc.pid), on_output, out)
+            returncode = proc.returncode
+        return RunResult(
+            returncode=returncode,
+            stdout=out.stdout.decode("utf-8", errors="ignore"),
+            stderr=out.stderr.decode("utf-8", errors="ignore"),
+            timed_out=timed_out,
+            truncated=out.truncated,
+            queued_ms=round(queued_ms, 3),
+            duration_ms=round((time.perf_counter() - started) * 1000, 3),
+        )
+
+    async def _run_warm(self, path: str, cwd: Optional[str], on_output: Optional[OutputCallback]):
+        """Run a script in a child forked from a warm interpreter (see warm_pool)."""
+        zygote = await self.pool.acquire()
+        out = _Output(self.max_output_bytes)
+        # Only a broken protocol or transport retires the zygote; a failing
+        # or timed-out child runs in its own process and leaves it intact
+        healthy = False
+        transports = []
+        read_fds: List[int] = []  # read ends not yet owned by a transport
+        try:
+            out_r, out_w = os.pipe()
+            read_fds.append(out_r)
+            err_r, err_w = os.pipe()
+            read_fds.append(err_r)
+            try:
+                zygote.send({
+                    "path": path,
+                    "cwd": cwd,
+                    "cpu_seconds": self.cpu_seconds,
+                    "memory_mb": self.memory_mb,
+                    "fsize": self._fsize_limit(),
+                }, [out_w, err_w])
+            finally:
+                os.close(out_w)
+                os.close(err_w)
+            readers = []
+            for fd in (out_r, err_r):
+                transport, reader = await _pipe_reader(fd)
+                read_fds.remove(fd)
+                transports.append(transport)
+                readers.append(reader)
+            pid = (await zygote.recv())["pid"]
+            returncode: List[Optional[int]] = [None]
+
+            async def wait() -> None:
+                returncode[0] = (await zygote.recv())["returncode"]
+
+            timed_out = await self._collect(readers[0], readers[1], wait, lambda: self._kill(pid), on_output, out)
+            healthy = returncode[0] is not None
+            return returncode[0], out, timed_out
+        finally:
+            for fd in read_fds:
+                os.close(fd)
+            for transport in transports:
+                transport.close()
+            await self.pool.release(zygote, healthy)
+
+    async def _collect(self, stdout: asyncio.StreamReader, stderr: asyncio.StreamReader, wait, kill, on_output: Optional[OutputCallback], out: "_Output") -> bool:
+        """Pump both streams until the child exits; returns whether it hit the wall-clock limit."""
+        waiter = asyncio.ensure_future(wait())
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(out.pump(stdout, "stdout", on_output), out.pump(stderr, "stderr", on_output), asyncio.shield(waiter)),
+                self.timeout,
+            )
+            return False
+        except asyncio.TimeoutError:
+            kill()
+            await waiter
+            return True
+        except BaseException:
+            # Cancelled or failed: never leave the child running
+            kill()
+            waiter.cancel()
+            raise
+
+    def _fsize_limit(self) -> int:
+        return max(self.max_output_bytes, 1024 * 1024) * 16
+
+    @staticmethod
+    def _kill(pid: int) -> None:
+        # Children run in their own session, so the group id is the child's pid
+        try:
+            os.killpg(pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError, AttributeError):
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+
+
+class _Output:
+    """stdout/stderr of one run, each capped at ``limit`` bytes."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.stdout = bytearray()
+        self.stderr = bytearray()
+        self.truncated = False
+
+    async def pump(self, stream: asyncio.StreamReader, name: str, on_output: Optional[OutputCallback]) -> None:
+        buf = self.stdout if name == "stdout" else self.stderr
+        while True:
+            chunk = await stream.read(4096)
+            if not chunk:
+                return
+            room = self.limit - len(buf)
+            if room < len(chunk):
+                # Keep draining past the cap so the child never blocks on a full pipe
+                self.truncated = True
+                chunk = chunk[:max(room, 0)]
+            if chunk:
+                buf.extend(chunk)
+                if on_output is not None:
+                    on_output(name, chunk)
+
+
+async def _pipe_reader(fd: int):
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader()
+    transport, _ = await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), os.fdopen(fd, "rb", 0))
+    return transport, reader
@@ -0,0 +1,221 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Set
+
+from .objects import ObjectStore
+
+logger = logging.getLogger(__name__)
+
+_SAFE_ID = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+class SandboxManager:
+    """One sandbox directory per session under ``<root>/sessions``.
+
+    Scaffold files are checked out from a shared object store
+    (``<root>/.objects``) by reflink where the filesystem supports it, so
+    identical files across sessions take disk space once (see
+    ``ObjectStore`` for the ``link`` modes). A background GC evicts idle sandboxes,
+    least recently used first, while usage exceeds ``quota_bytes`` (and any
+    idle for over ``idle_ttl`` seconds), then deletes objects no remaining
+    sandbox can reach. Sandboxes leased by a running request are never
+    evicted.
+    """
+
+    def __init__(
+        self,
+        root: str,
+        quota_bytes: int = 1024 * 1024 * 1024,
+        idle_ttl: Optional[float] = 24 * 3600,
+        gc_interval: float = 60.0,
+        link: str = "reflink",
+        object_grace: float = 300.0,
+    ):
+        self.root = root
+        self.sessions_dir = os.path.join(root, "sessions")
+        self.objects_dir = os.path.join(root, ".objects")
+        self.trash_dir = os.path.join(root, ".trash")
+        self.quota_bytes = quota_bytes
+        self.idle_ttl = idle_ttl
+        self.gc_interval = gc_interval
+        self.link = link
+        # Unreferenced objects created or reused (ctime) more recently than this
+        # may belong to a commit in progress
+        self.object_grace = object_grace
+        self._lock = threading.Lock()
+        self._active: Dict[str, int] = {}
+        self._stores: Dict[str, ObjectStore] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.evicted = 0
+        self.objects_pruned = 0
+        self.last_usage: Optional[int] = None
+        for d in (self.sessions_dir, self.objects_dir, self.trash_dir):
+            os.makedirs(d, exist_ok=True)
+
+    @staticmethod
+    def _name(session_id: str) -> str:
+        # Client-supplied ids never become paths as-is
+        if _SAFE_ID.match(session_id):
+            return session_id
+        return hashlib.sha256(session_id.encode("utf-8")).hexdigest()[:32]
+
+    def path(self, session_id: str) -> str:
+        return os.path.join(self.sessions_dir, self._name(session_id))
+
+    def store(self, session_id: str) -> ObjectStore:
+        name = self._name(session_id)
+        with self._lock:
+            store = self._stores.get(name)
+            if store is None:
+                store = self._stores[name] = ObjectStore(self.path(session_id), objects_dir=self.objects_dir, link=self.link)
+            return store
+
+    @contextmanager
+    def lease(self, session_id: str) -> Iterator[str]:
+        """Keep a session's sandbox from being evicted while in use; yields its path."""
+        name = self._name(session_id)
+        path = self.path(session_id)
+        with self._lock:
+            self._active[name] = self._active.get(name, 0) + 1
+            os.makedirs(path, exist_ok=True)
+        try:
+            os.utime(path)  # the directory mtime is the LRU clock
+            yield path
+        finally:
+            with self._lock:
+                self._active[name] -= 1
+                if not self._active[name]:
+                    del self._active[name]
+            try:
+                os.utime(path)
+            except FileNotFoundError:
+                pass
+
+    def usage(self) -> int:
+        """Bytes used under the root, counting each hardlinked inode once."""
+        seen: Set[tuple] = set()
+        total = 0
+        for dirpath, _, files in os.walk(self.root):
+            for fn in files:
+                try:
+                    st = os.lstat(os.path.join(dirpath, fn))
+                except FileNotFoundError:
+                    continue
+                key = (st.st_dev, st.st_ino)
+                if key not in seen:
+                    seen.add(key)
+                    total += st.st_size
+        return total
+
+    def gc(self) -> Dict[str, Any]:
+        """Evict idle sandboxes and unreachable objects; blocking, run in a thread."""
+        now = time.time()
+        usage = self.usage()
+        sessions = []
+        for entry in os.scandir(self.sessions_dir):
+            if entry.is_dir(follow_symlinks=False):
+                sessions.append((entry.stat().st_mtime, entry.name, entry.path))
+        sessions.sort()
+
+        evicted = []
+        for mtime, name, path in sessions:
+            expired = bool(self.idle_ttl) and now - mtime > self.idle_ttl
+            if usage <= self.quota_bytes and not expired:
+                continue
+            trash = os.path.join(self.trash_dir, f"{name}.{uuid.uuid4().hex}")
+            with self._lock:
+                if self._active.get(name):
+                    continue
+                # Renamed under the lock, so a new lease starts from a fresh directory
+                os.rename(path, trash)
+                self._stores.pop(name, None)
+            usage -= _private_bytes(trash)
+            shutil.rmtree(trash, ignore_errors=True)
+            evicted.append(name)
+
+        pruned = self._prune_objects(now) if evicted else 0
+        self.evicted += len(evicted)
+        self.objects_pruned += pruned
+        self.last_usage = self.usage() if evicted else usage
+        return {"evicted": evicted, "objects_pruned": pruned, "usage": self.last_usage}
+
+    def _prune_objects(self, now: float) -> int:
+        reachable: Set[str] = set()
+        for entry in os.scandir(self.sessions_dir):
+            if entry.is_dir(follow_symlinks=False):
+                try:
+                    reachable |= ObjectStore(entry.path, objects_dir=self.objects_dir).reachable()
+                except (OSError, ValueError, KeyError) as e:
+                    # Can't tell what this sandbox needs; keep everything this round
+                    logger.warning(f"Skipping object prune, unreadable sandbox {entry.name}: {e}")
+                    return 0
+        pruned = 0
+        for fan in os.scandir(self.objects_dir):
+            if not fan.is_dir():
+                continue
+            for obj in os.scandir(fan.path):
+                if fan.name + obj.name in reachable or now - obj.stat().st_ctime < self.object_grace:
+                    continue
+                try:
+                    os.remove(obj.path)
+                    pruned += 1
+                except OSError:
+                    pass
+        return pruned
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            active = len(self._active)
+        return {
+            "active": active,
+            "quota_bytes": self.quota_bytes,
+            "usage_bytes": self.last_usage,
+            "evicted": self.evicted,
+            "objects_pruned": self.objects_pruned,
+        }
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                res = await asyncio.to_thread(self.gc)
+                if res["evicted"]:
+                    logger.info(f"Sandbox GC evicted {len(res['evicted'])} sandboxes, pruned {res['objects_pruned']} objects")
+            except Exception as e:
+                logger.error(f"Sandbox GC failed: {e}")
+            await asyncio.sleep(self.gc_interval)
+
+
+def _private_bytes(path: str) -> int:
+    # Files not linked from anywhere else are freed with the directory
+    total = 0
+    for dirpath, _, files in os.walk(path):
+        for fn in files:
+            try:
+                st = os.lstat(os.path.join(dirpath, fn))
+            except FileNotFoundError:
+                continue
+            if st.st_nlink == 1:
+                total += st.st_size
+    return total
@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+from contextlib import asynccontextmanager
+
 import uvicorn
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
@@ -9,16 +11,80 @@ from typing import Optional
 from .config import Config
 from .memory import MemoryBus
 from .tools import SimulatedTools
+from .http_pool import HttpPool
+from .runner import CodeRunner
+from .sandboxes import SandboxManager
+from .warm_pool import WarmPool
 from .orchestrator import ForgePilotAgent
 
 cfg = Config()
 cfg.ensure_dirs()
 
-memory = MemoryBus(data_dir=cfg.data_dir, max_events=200)
-tools = SimulatedTools(allow_execute=cfg.allow_execute, sandbox_dir=cfg.sandbox_dir)
+memory = MemoryBus(
+    data_dir=cfg.data_dir,
+    max_events=cfg.memory_cache_session_events,
+    max_cached_events=cfg.memory_cache_max_events,
+    flush_max_events=cfg.memory_flush_max_events,
+    flush_interval=cfg.memory_flush_interval_ms / 1000,
+    fsync=cfg.memory_fsync,
+)
+http_pool = HttpPool(
+    max_connections=cfg.http_max_connections,
+    max_per_host=cfg.http_max_per_host,
+    timeout=cfg.http_timeout_s,
+    preview_chars=cfg.http_preview_chars,
+    cache_entries=cfg.http_cache_entries,
+)
+warm_pool = (
+    WarmPool(size=cfg.exec_warm_pool_size, max_runs=cfg.exec_warm_max_runs, preload=cfg.exec_warm_preload)
+    if cfg.allow_execute and cfg.exec_warm_pool_size > 0 and WarmPool.supported()
+    else None
+)
+runner = CodeRunner(
+    max_concurrent=cfg.exec_max_concurrency or None,
+    max_queue=cfg.exec_max_queue,
+    cpu_seconds=cfg.exec_cpu_seconds,
+    memory_mb=cfg.exec_memory_mb,
+    timeout=cfg.exec_timeout_s,
+    max_output_bytes=cfg.exec_max_output_bytes,
+    pool=warm_pool,
+)
+sandboxes = (
+    SandboxManager(
+        cfg.sandbox_dir,
+        quota_bytes=cfg.sandbox_quota_mb * 1024 * 1024,
+        idle_ttl=cfg.sandbox_idle_ttl_s or None,
+        gc_interval=cfg.sandbox_gc_interval_s,
+        link=cfg.sandbox_link,
+    )
+    if cfg.sandbox_per_session
+    else None
+)
+tools = SimulatedTools(allow_execute=cfg.allow_execute, sandbox_dir=cfg.sandbox_dir, http=http_pool, runner=runner, sandboxes=sandboxes)
 agent = ForgePilotAgent(cfg=cfg, memory=memory, tools=tools)
 
-app = FastAPI(title="ForgePilot Backend", version="0.1.0")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    memory.start()
+    await http_pool.start()
+    if warm_pool is not None:
+        await warm_pool.start()
+    if sandboxes is not None:
+        sandboxes.start()
+    try:
+        yield
+    finally:
+        if sandboxes is not None:
+            await sandboxes.close()
+        if warm_pool is not None:
+            await warm_pool.close()
+        await http_pool.close()
+        # Drain queued memory writes before the process exits
+        await memory.close()
+
+
+app = FastAPI(title="ForgePilot Backend", version="0.1.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -36,7 +102,7 @@ class MessageRequest(BaseModel):
 
 @app.get("/api/health")
 async def health():
-    return {"ok": True, "env": cfg.env, "allow_execute": cfg.allow_execute}
+    return {"ok": True, "env": cfg.env, "allow_execute": cfg.allow_execute, "memory_cache": memory.in_memory.stats(), "executor": runner.stats(), "sandboxes": sandboxes.stats() if sandboxes else None}
 
 
 @app.post("/api/message")
@@ -49,9 +115,14 @@ async def message(req: MessageRequest):
 
 
 @app.get("/api/memory/{session_id}")
-async def session_memory(session_id: str, limit: int = 100):
-    events = memory.get_session(session_id, limit=limit)
-    return {"session_id": session_id, "events": [e.__dict__ for e in events]}
+async def session_memory(session_id: str, limit: int = 100, before: Optional[int] = None, after: Optional[int] = None):
+    page = await memory.read_page(session_id, limit=limit, before=before, after=after)
+    return {
+        "session_id": session_id,
+        "events": [e.__dict__ for e in page.events],
+        "cursor": {"before": page.start, "after": page.end},
+        "total": page.total,
+    }
 
 
 if __name__ == "__main__":
@@ -0,0 +1,215 @@
+from __future__ import annotations
+
+import json
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+# Declarative scaffold templates. The first template (by priority) with a
+# keyword occurring in the instruction wins; the default one is the fallback.
+TEMPLATE_DEFINITIONS: List[Dict[str, Any]] = [
+    {
+        "name": "node_cli",
+        "keywords": ["node", "express", "javascript", "typescript"],
+        "priority": 10,
+        "entrypoint": "index.js",
+        "language": "node",
+        "files": {
+            "package.json": '{ "name": "cli", "version": "0.1.0", "type": "module", "bin": { "cli": "index.js" }, "dependencies": {} }',
+            "index.js": "#!/usr/bin/env node\nconsole.log(\"Hello from CLI\");\n",
+            "README.md": "# Generated Node CLI\nRun: npm install && node index.js",
+        },
+    },
+    {
+        "name": "python_cli",
+        "keywords": [],
+        "default": True,
+        "entrypoint": "cli.py",
+        "language": "python",
+        "files": {
+            "pyproject.toml": "[project]\nname = \"cli\"\nversion = \"0.1.0\"\nrequires-python = \">=3.9\"\n",
+            "cli.py": "import argparse\n\ndef main():\n    p = argparse.ArgumentParser()\n    p.add_argument('--name', default='world')\n    args = p.parse_args()\n    print(f'Hello, {args.name}!')\n\nif __name__ == '__main__':\n    main()\n",
+            "README.md": "# Generated Python CLI\nRun: python cli.py --name You",
+        },
+    },
+]
+
+# Plan steps, plus rules inserting extra steps when a keyword occurs. Rules
+# apply in order, each inserting at its position in the plan built so far.
+PLAN_DEFINITION: Dict[str, Any] = {
+    "steps": [
+        "Understand requirements",
+        "Propose project structure",
+        "Generate scaffold files",
+        "Simulate tool execution (git, http, code run)",
+        "Summarize outcome and next steps",
+    ],
+    "rules": [
+        {"keywords": ["api"], "insert_at": 2, "step": "Define API endpoints and data models"},
+        {"keywords": ["frontend", "ui"], "insert_at": 2, "step": "Define frontend pages and components"},
+    ],
+}
+
+
+class FrozenManifest(dict):
+    """A dict that refuses mutation, so one manifest can be shared by every request."""
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("scaffold manifests are read-only")
+
+    __setitem__ = __delitem__ = __ior__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+    def __copy__(self) -> "FrozenManifest":
+        return self
+
+    def __deepcopy__(self, memo) -> "FrozenManifest":
+        return self
+
+
+class KeywordMatcher:
+    """Aho-Corasick automaton that finds every keyword occurring in a text in one pass."""
+
+    def __init__(self, keywords: Iterable[str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[FrozenSet[str]] = [frozenset()]
+        for keyword in keywords:
+            state = 0
+            for ch in keyword:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(frozenset())
+                state = nxt
+            self._out[state] = self._out[state] | {keyword}
+
+        # Breadth-first: a state's failure link points at its longest proper
+        # suffix that is also a trie path; outputs inherit along those links.
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0)
+                self._out[nxt] = self._out[nxt] | self._out[self._fail[nxt]]
+
+    def find(self, text: str) -> Set[str]:
+        found: Set[str] = set()
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                found |= out[state]
+        return found
+
+
+@dataclass(frozen=True)
+class Template:
+    name: str
+    keywords: Tuple[str, ...]
+    priority: int
+    entrypoint: str
+    language: str
+    manifest: FrozenManifest
+
+
+@dataclass(frozen=True)
+class PlanRule:
+    keywords: Tuple[str, ...]
+    insert_at: int
+    step: str
+
+
+class TemplateRegistry:
+    """Routes instructions to a scaffold template and a plan.
+
+    Built once from declarative definitions: every trigger keyword is
+    compiled into a single matcher, so routing costs one scan of the
+    lower-cased instruction however many templates and rules exist.
+    """
+
+    def __init__(self, templates: List[Template], default: Template, steps: Tuple[str, ...], rules: List[PlanRule]):
+        self.templates = sorted(templates, key=lambda t: -t.priority)
+        self.default = default
+        self.steps = steps
+        self.rules = rules
+        # Keyword -> best-ranked template using it, and -> rules it fires
+        self._template_by_keyword: Dict[str, int] = {}
+        for rank, template in enumerate(self.templates):
+            for keyword in template.keywords:
+                self._template_by_keyword.setdefault(keyword, rank)
+        self._rules_by_keyword: Dict[str, List[int]] = {}
+        for i, rule in enumerate(rules):
+            for keyword in set(rule.keywords):
+                self._rules_by_keyword.setdefault(keyword, []).append(i)
+        self._matcher = KeywordMatcher(set(self._template_by_keyword) | set(self._rules_by_keyword))
+
+    @classmethod
+    def from_definitions(
+        cls,
+        templates: Optional[List[Dict[str, Any]]] = None,
+        plan: Optional[Dict[str, Any]] = None,
+    ) -> "TemplateRegistry":
+        templates = TEMPLATE_DEFINITIONS if templates is None else templates
+        plan = PLAN_DEFINITION if plan is None else plan
+        built = [
+            Template(
+                name=t["name"],
+                keywords=tuple(k.lower() for k in t.get("keywords", [])),
+                priority=t.get("priority", 0),
+                entrypoint=t["entrypoint"],
+                language=t.get("language", "python"),
+                manifest=FrozenManifest(t["files"]),
+            )
+            for t in templates
+        ]
+        defaults = [b for b, t in zip(built, templates) if t.get("default")]
+        if not defaults:
+            raise ValueError("one template must be marked as default")
+        rules = [
+            PlanRule(keywords=tuple(k.lower() for k in r["keywords"]), insert_at=r["insert_at"], step=r["step"])
+            for r in plan.get("rules", [])
+        ]
+        return cls(built, defaults[0], tuple(plan["steps"]), rules)
+
+    @classmethod
+    def load(cls, path: Optional[str] = None) -> "TemplateRegistry":
+        """Build from a JSON file with "templates" and "plan" keys, or from the built-in definitions."""
+        if not path:
+            return cls.from_definitions()
+        with open(path, "r", encoding="utf-8") as f:
+            raw = json.load(f)
+        return cls.from_definitions(raw.get("templates"), raw.get("plan"))
+
+    def route(self, instruction: str) -> Tuple[Tuple[str, ...], Template]:
+        found = self._matcher.find(instruction.lower())
+        return self._plan(found), self._template(found)
+
+    def plan(self, instruction: str) -> Tuple[str, ...]:
+        return self._plan(self._matcher.find(instruction.lower()))
+
+    def template(self, instruction: str) -> Template:
+        return self._template(self._matcher.find(instruction.lower()))
+
+    def _template(self, found: Set[str]) -> Template:
+        ranks = [self._template_by_keyword[k] for k in found if k in self._template_by_keyword]
+        return self.templates[min(ranks)] if ranks else self.default
+
+    def _plan(self, found: Set[str]) -> Tuple[str, ...]:
+        fired = sorted({i for k in found for i in self._rules_by_keyword.get(k, ())})
+        if not fired:
+            return self.steps
+        steps = list(self.steps)
+        for i in fired:
+            steps.insert(self.rules[i].insert_at, self.rules[i].step)
+        return tuple(steps)
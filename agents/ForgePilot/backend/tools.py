@@ -1,10 +1,15 @@
 from __future__ import annotations
 
+import asyncio
 import os
 import time
-from typing import Any, Dict, List, Optional
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
 
-import httpx
+from .http_pool import HttpPool
+from .objects import ObjectStore, write_atomic
+from .runner import CodeRunner
+from .sandboxes import SandboxManager
 
 
 class ToolResult(Dict[str, Any]):
@@ -12,19 +17,45 @@ class ToolResult(Dict[str, Any]):
 
 
 class SimulatedTools:
-    def __init__(self, allow_execute: bool = False, sandbox_dir: str = "./backend/sandbox"):
+    def __init__(
+        self,
+        allow_execute: bool = False,
+        sandbox_dir: str = "./backend/sandbox",
+        http: Optional[HttpPool] = None,
+        runner: Optional[CodeRunner] = None,
+        sandboxes: Optional[SandboxManager] = None,
+        objects: Optional[ObjectStore] = None,
+    ):
         self.allow_execute = allow_execute
         self.sandbox_dir = sandbox_dir
+        self.http = http or HttpPool()
+        self.runner = runner or CodeRunner()
+        self.sandboxes = sandboxes
+        self.objects = objects or ObjectStore(sandbox_dir)
         os.makedirs(self.sandbox_dir, exist_ok=True)
 
+    @contextmanager
+    def session(self, session_id: str) -> Iterator["SimulatedTools"]:
+        """Tools bound to the session's own sandbox, leased for the duration; shared sandbox without a SandboxManager."""
+        if self.sandboxes is None:
+            yield self
+            return
+        with self.sandboxes.lease(session_id) as path:
+            yield SimulatedTools(
+                allow_execute=self.allow_execute,
+                sandbox_dir=path,
+                http=self.http,
+                runner=self.runner,
+                objects=self.sandboxes.store(session_id),
+            )
+
     async def code_execute(self, code: str, language: str = "python", filename: Optional[str] = None) -> ToolResult:
         # Simulation first; can be expanded to real execution if allow_execute=True
         ts = time.time()
         fn = filename or f"snippet_{int(ts)}.{ 'py' if language == 'python' else 'txt' }"
         path = os.path.join(self.sandbox_dir, fn)
         try:
-            with open(path, "w", encoding="utf-8") as f:
-                f.write(code)
+            await asyncio.to_thread(_write_if_changed, path, code)
         except Exception as e:
             return ToolResult(ok=False, type="code_execute", filename=fn, error=str(e), timestamp=ts)
 
@@ -33,22 +64,20 @@ class SimulatedTools:
 
         # Minimal execution only for Python with strict safety
         if language == "python":
-            import subprocess, shlex
             try:
-                proc = subprocess.run(
-                    shlex.split(f"python {path}"),
-                    capture_output=True,
-                    timeout=10,
-                    cwd=self.sandbox_dir
-                )
+                res = await self.runner.run_python(os.path.abspath(path), cwd=self.sandbox_dir)
                 return ToolResult(
-                    ok=proc.returncode == 0,
+                    ok=res.returncode == 0 and not res.timed_out,
                     type="code_execute",
                     filename=fn,
                     simulated=False,
-                    stdout=proc.stdout.decode("utf-8", errors="ignore"),
-                    stderr=proc.stderr.decode("utf-8", errors="ignore"),
-                    returncode=proc.returncode,
+                    stdout=res.stdout,
+                    stderr=res.stderr,
+                    returncode=res.returncode,
+                    timed_out=res.timed_out,
+                    truncated=res.truncated,
+                    queued_ms=res.queued_ms,
+                    duration_ms=res.duration_ms,
                     timestamp=ts,
                 )
             except Exception as e:
@@ -62,24 +91,30 @@ class SimulatedTools:
             return ToolResult(ok=True, type="http_fetch", simulated=True, url=url, method=method, status=200, body_preview="...", timestamp=ts)
 
         try:
-            async with httpx.AsyncClient(timeout=10) as client:
-                resp = await client.request(method, url, headers=headers, data=body)
-                preview = resp.text[:500] if resp.text else ""
-                return ToolResult(ok=True, type="http_fetch", simulated=False, url=url, method=method, status=resp.status_code, body_preview=preview, timestamp=ts)
+            res = await self.http.fetch(method, url, headers=headers, body=body)
+            return ToolResult(ok=True, type="http_fetch", simulated=False, url=url, method=method, status=res.status, body_preview=res.preview, truncated=res.truncated, cached=res.cached, timestamp=ts)
         except Exception as e:
             return ToolResult(ok=False, type="http_fetch", simulated=False, url=url, method=method, error=str(e), timestamp=ts)
 
     async def git_commit(self, message: str, changes: Dict[str, str]) -> ToolResult:
-        # Simulate a commit by writing files into sandbox and returning a fake commit hash
+        # Commit into the sandbox's content-addressed store; only changed files hit the disk
         ts = time.time()
         try:
-            for rel, content in changes.items():
-                abspath = os.path.join(self.sandbox_dir, rel)
-                os.makedirs(os.path.dirname(abspath), exist_ok=True)
-                with open(abspath, "w", encoding="utf-8") as f:
-                    f.write(content)
-            commit = f"sim-{int(ts)}"
-            return ToolResult(ok=True, type="git_commit", simulated=True, commit=commit, files=list(changes.keys()), message=message, timestamp=ts)
+            res = await asyncio.to_thread(self.objects.commit, message, changes)
+            return ToolResult(
+                ok=True,
+                type="git_commit",
+                simulated=True,
+                commit=res.commit,
+                tree=res.tree,
+                parent=res.parent,
+                files=list(changes.keys()),
+                written=res.written,
+                unchanged=res.unchanged,
+                empty=res.empty,
+                message=message,
+                timestamp=ts,
+            )
         except Exception as e:
             return ToolResult(ok=False, type="git_commit", simulated=True, error=str(e), timestamp=ts)
 
@@ -89,4 +124,16 @@ class SimulatedTools:
 
     async def db_write(self, collection: str, data: Dict[str, Any]) -> ToolResult:
         ts = time.time()
-        return ToolResult(ok=True, type="db_write", simulated=True, collection=collection, data=data, inserted_id=f"sim-{int(ts)}", timestamp=ts)
\ No newline at end of file
+        return ToolResult(ok=True, type="db_write", simulated=True, collection=collection, data=data, inserted_id=f"sim-{int(ts)}", timestamp=ts)
+
+
+def _write_if_changed(path: str, content: str) -> None:
+    # Leaves an identical file (and its mtime) alone, e.g. a scaffold git_commit just wrote
+    data = content.encode("utf-8")
+    try:
+        with open(path, "rb") as f:
+            if f.read() == data:
+                return
+    except FileNotFoundError:
+        pass
+    write_atomic(path, data)
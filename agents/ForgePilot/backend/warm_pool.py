@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import socket
+import sys
+from typing import Any, Dict, List, Sequence, Set
+
+logger = logging.getLogger(__name__)
+
+ZYGOTE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "zygote.py")
+
+
+class Zygote:
+    """One warm fork server process and its control socket."""
+
+    def __init__(self, proc: asyncio.subprocess.Process, sock: socket.socket):
+        self.proc = proc
+        self.sock = sock
+        self.runs = 0
+        self._buf = b""
+
+    @property
+    def alive(self) -> bool:
+        return self.proc.returncode is None and self.sock.fileno() != -1
+
+    def send(self, req: Dict[str, Any], fds: Sequence[int]) -> None:
+        socket.send_fds(self.sock, [json.dumps(req).encode() + b"\n"], list(fds))
+
+    async def recv(self) -> Dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        while b"\n" not in self._buf:
+            chunk = await loop.sock_recv(self.sock, 4096)
+            if not chunk:
+                raise ConnectionError("warm interpreter exited")
+            self._buf += chunk
+        line, self._buf = self._buf.split(b"\n", 1)
+        return json.loads(line)
+
+    async def close(self) -> None:
+        self.sock.close()  # EOF makes the zygote exit on its own
+        try:
+            await asyncio.wait_for(self.proc.wait(), 2)
+        except asyncio.TimeoutError:
+            self.proc.kill()
+            await self.proc.wait()
+
+
+class WarmPool:
+    """Pre-started interpreters that fork a fresh child for every snippet.
+
+    Each zygote has paid interpreter startup and imported ``preload`` once;
+    a run only costs a fork. Zygotes go back to the pool after every run
+    that reported its exit status, and are replaced in the background after
+    ``max_runs`` runs or as soon as a run breaks the protocol. Runs beyond ``size``
+    concurrent ones spawn an extra zygote that is closed afterwards.
+    POSIX only (needs fork and fd passing).
+    """
+
+    def __init__(self, size: int = 2, max_runs: int = 100, preload: Sequence[str] = ("argparse", "json"), python: str = sys.executable):
+        self.size = size
+        self.max_runs = max_runs
+        self.preload = list(preload)
+        self.python = python
+        self._idle: List[Zygote] = []
+        self._spawning: Set[asyncio.Task] = set()
+        self._closed = False
+        self.spawned = 0
+        self.recycled = 0
+
+    @staticmethod
+    def supported() -> bool:
+        return hasattr(os, "fork") and hasattr(socket, "send_fds")
+
+    def stats(self) -> Dict[str, int]:
+        return {"idle": len(self._idle), "size": self.size, "spawned": self.spawned, "recycled": self.recycled}
+
+    async def start(self) -> None:
+        self._closed = False
+        await asyncio.gather(*(self._spawn_idle() for _ in range(self.size - len(self._idle))))
+
+    async def close(self) -> None:
+        self._closed = True
+        for task in list(self._spawning):
+            task.cancel()
+        await asyncio.gather(*self._spawning, return_exceptions=True)
+        idle, self._idle = self._idle, []
+        await asyncio.gather(*(z.close() for z in idle))
+
+    async def _spawn(self) -> Zygote:
+        parent, child = socket.socketpair()
+        try:
+            proc = await asyncio.create_subprocess_exec(
+                self.python, ZYGOTE, str(child.fileno()), ",".join(self.preload),
+                pass_fds=(child.fileno(),),
+                stdin=asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.DEVNULL,
+            )
+        finally:
+            child.close()
+        parent.setblocking(False)
+        zygote = Zygote(proc, parent)
+        try:
+            await asyncio.wait_for(zygote.recv(), 30)  # {"ready": true}
+        except BaseException:
+            await zygote.close()
+            raise
+        self.spawned += 1
+        return zygote
+
+    async def _spawn_idle(self) -> None:
+        try:
+            zygote = await self._spawn()
+        except Exception as e:
+            logger.warning(f"Could not start warm interpreter: {e}")
+            return
+        if self._closed or len(self._idle) >= self.size:
+            await zygote.close()
+        else:
+            self._idle.append(zygote)
+
+    def _refill(self) -> None:
+        if self._closed or len(self._idle) + len(self._spawning) >= self.size:
+            return
+        task = asyncio.create_task(self._spawn_idle())
+        self._spawning.add(task)
+        task.add_done_callback(self._spawning.discard)
+
+    async def acquire(self) -> Zygote:
+        while True:
+            while self._idle:
+                zygote = self._idle.pop()
+                if zygote.alive:
+                    return zygote
+                await zygote.close()
+            if not self._spawning:
+                break
+            # A replacement is already starting; that beats paying for another
+            await asyncio.wait(set(self._spawning), return_when=asyncio.FIRST_COMPLETED)
+        self._refill()
+        return await self._spawn()
+
+    async def release(self, zygote: Zygote, healthy: bool) -> None:
+        zygote.runs += 1
+        if healthy and zygote.alive and zygote.runs < self.max_runs and not self._closed and len(self._idle) < self.size:
+            self._idle.append(zygote)
+            return
+        self.recycled += 1
+        await zygote.close()
+        self._refill()
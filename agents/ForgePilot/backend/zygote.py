@@ -0,0 +1,105 @@
+"""Fork server behind WarmPool: a pre-warmed interpreter that forks one child per snippet.
+
+Started as ``python zygote.py <socket-fd> <preload>``; it is a standalone
+script and imports nothing from the app. Protocol over the Unix socket,
+one JSON line each way:
+
+    -> {"ready": true}                                      once warmed up
+    <- {"path", "cwd", "cpu_seconds", "memory_mb", "fsize"}  + stdout/stderr fds
+    -> {"pid": <child pid>}                                 child started
+    -> {"returncode": <exit code>}                          child finished
+"""
+import json
+import os
+import runpy
+import socket
+import sys
+import traceback
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+def _child(req, fds, sock):
+    sock.close()
+    os.setsid()
+    if resource is not None:
+        cpu = req["cpu_seconds"]
+        resource.setrlimit(resource.RLIMIT_CPU, (cpu, cpu + 1))
+        if req.get("memory_mb"):
+            limit = req["memory_mb"] * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+        if req.get("fsize"):
+            resource.setrlimit(resource.RLIMIT_FSIZE, (req["fsize"], req["fsize"]))
+    devnull = os.open(os.devnull, os.O_RDONLY)
+    os.dup2(devnull, 0)
+    os.dup2(fds[0], 1)
+    os.dup2(fds[1], 2)
+    for fd in (devnull, *fds):
+        os.close(fd)
+
+    path = req["path"]
+    code = 0
+    try:
+        os.chdir(req["cwd"] or os.path.dirname(path))
+        sys.argv = [path]
+        sys.path[0] = os.path.dirname(path)
+        runpy.run_path(path, run_name="__main__")
+    except SystemExit as e:
+        if e.code is None:
+            code = 0
+        elif isinstance(e.code, int):
+            code = e.code
+        else:
+            print(e.code, file=sys.stderr)
+            code = 1
+    except BaseException:
+        traceback.print_exc()
+        code = 1
+    try:
+        sys.stdout.flush()
+        sys.stderr.flush()
+    finally:
+        os._exit(code & 0xFF)
+
+
+def _recv_request(sock):
+    data, fds = b"", []
+    while not data.endswith(b"\n"):
+        chunk, new_fds, _, _ = socket.recv_fds(sock, 65536, 2)
+        if not chunk:
+            return None, fds
+        data += chunk
+        fds.extend(new_fds)
+    return json.loads(data), fds
+
+
+def main():
+    sock = socket.socket(fileno=int(sys.argv[1]))
+    for name in filter(None, sys.argv[2].split(",") if len(sys.argv) > 2 else []):
+        try:
+            __import__(name)
+        except ImportError:
+            pass
+    sock.sendall(b'{"ready": true}\n')
+    while True:
+        req, fds = _recv_request(sock)
+        if req is None:
+            return
+        pid = os.fork()
+        if pid == 0:
+            _child(req, fds, sock)
+        for fd in fds:
+            os.close(fd)
+        sock.sendall(json.dumps({"pid": pid}).encode() + b"\n")
+        _, status = os.waitpid(pid, 0)
+        sock.sendall(json.dumps({"returncode": os.waitstatus_to_exitcode(status)}).encode() + b"\n")
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except (BrokenPipeError, ConnectionError):
+        pass  # the pool closed our socket
@@ -0,0 +1,70 @@
+"""Compare cold subprocess launches with the warm interpreter pool for code_execute.
+
+Run from agents/ForgePilot:  python scripts/bench_code_execute.py [--runs 50] [--concurrency 1]
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from backend.runner import CodeRunner  # noqa: E402
+from backend.templates import TemplateRegistry  # noqa: E402
+from backend.warm_pool import WarmPool  # noqa: E402
+
+
+async def bench(runner: CodeRunner, path: str, runs: int, concurrency: int):
+    latencies = []
+    gate = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with gate:
+            t0 = time.perf_counter()
+            res = await runner.run_python(path, cwd=str(Path(path).parent))
+            latencies.append((time.perf_counter() - t0) * 1000)
+            if res.returncode != 0:
+                raise RuntimeError(res.stderr)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(runs)))
+    return latencies, time.perf_counter() - t0
+
+
+def report(name: str, latencies, wall: float):
+    latencies = sorted(latencies)
+    p95 = latencies[max(0, int(len(latencies) * 0.95) - 1)]
+    print(f"{name:<6} mean {statistics.mean(latencies):7.1f} ms  p50 {statistics.median(latencies):7.1f} ms  "
+          f"p95 {p95:7.1f} ms  throughput {len(latencies) / wall:6.1f} runs/s")
+
+
+async def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--runs", type=int, default=50)
+    p.add_argument("--concurrency", type=int, default=1)
+    p.add_argument("--pool-size", type=int, default=None, help="warm interpreters (default: --concurrency)")
+    args = p.parse_args()
+
+    # The python_cli scaffold's entrypoint, as the agent runs it
+    template = TemplateRegistry.from_definitions().template("python cli")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = str(Path(tmp) / template.entrypoint)
+        Path(path).write_text(template.manifest[template.entrypoint])
+
+        cold = CodeRunner(max_concurrent=args.concurrency)
+        report("cold", *await bench(cold, path, args.runs, args.concurrency))
+
+        pool = WarmPool(size=args.pool_size or args.concurrency)
+        await pool.start()
+        try:
+            warm = CodeRunner(max_concurrent=args.concurrency, pool=pool)
+            report("warm", *await bench(warm, path, args.runs, args.concurrency))
+        finally:
+            await pool.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,95 @@
+import asyncio
+import time
+
+import pytest
+
+from backend.dag import ToolGraph, ToolStep
+
+
+def _sleeper(seconds, ok=True, log=None, name=None):
+    async def run(results):
+        if log is not None:
+            log.append(("start", name))
+        await asyncio.sleep(seconds)
+        if log is not None:
+            log.append(("end", name))
+        return {"ok": ok, "seen": sorted(results)}
+    return run
+
+
+def test_independent_steps_run_concurrently():
+    graph = ToolGraph()
+    steps = [ToolStep(n, _sleeper(0.2)) for n in ("a", "b", "c")]
+    t0 = time.perf_counter()
+    results, timings = asyncio.run(graph.run(steps))
+    assert time.perf_counter() - t0 < 0.4
+    assert all(r["ok"] for r in results.values())
+    assert set(timings["steps"]) == {"a", "b", "c"}
+    assert all(t["status"] == "ok" and t["duration_ms"] >= 190 for t in timings["steps"].values())
+    assert timings["total_ms"] < 400
+
+
+def test_dependencies_order_and_failures():
+    log = []
+    steps = [
+        ToolStep("c", _sleeper(0.01, log=log, name="c"), deps=("a", "b")),
+        ToolStep("a", _sleeper(0.05, log=log, name="a")),
+        ToolStep("b", _sleeper(0.01, ok=False, log=log, name="b")),
+        ToolStep("d", _sleeper(0.01, log=log, name="d"), deps=("a",)),
+    ]
+    results, timings = asyncio.run(ToolGraph().run(steps))
+    assert log.index(("end", "a")) < log.index(("start", "d"))
+    assert "a" in results["d"]["seen"]
+    assert results["c"]["skipped"] is True and "b" in results["c"]["error"]
+    assert ("start", "c") not in log
+    assert timings["steps"]["b"]["status"] == "error"
+    assert timings["steps"]["c"]["status"] == "skipped"
+
+
+def test_timeouts_errors_and_limits():
+    async def boom(results):
+        raise RuntimeError("boom")
+
+    active = peak = 0
+
+    async def capped(results):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.02)
+        active -= 1
+        return {"ok": True}
+
+    graph = ToolGraph(timeout=0.05)
+    results, timings = asyncio.run(graph.run([
+        ToolStep("slow", _sleeper(1)),
+        ToolStep("fast", _sleeper(0.3), timeout=0.5),
+        ToolStep("boom", boom),
+    ]))
+    assert timings["steps"]["slow"]["status"] == "timeout" and not results["slow"]["ok"]
+    assert results["fast"]["ok"]
+    assert results["boom"]["error"] == "boom"
+
+    graph = ToolGraph(max_concurrency=2)
+    asyncio.run(graph.run([ToolStep(f"x{i}", capped) for i in range(6)]))
+    assert peak == 2
+
+    # Per-tool caps hold across graphs sharing the executor
+    peak = 0
+    graph = ToolGraph(limits={"x": 1})
+
+    async def many():
+        await asyncio.gather(*(graph.run([ToolStep("x", capped)]) for _ in range(4)))
+
+    asyncio.run(many())
+    assert peak == 1
+
+
+def test_invalid_graphs():
+    run = _sleeper(0)
+    with pytest.raises(ValueError):
+        asyncio.run(ToolGraph().run([ToolStep("a", run, deps=("b",)), ToolStep("b", run, deps=("a",))]))
+    with pytest.raises(ValueError):
+        asyncio.run(ToolGraph().run([ToolStep("a", run, deps=("missing",))]))
+    with pytest.raises(ValueError):
+        asyncio.run(ToolGraph().run([ToolStep("a", run), ToolStep("a", run)]))
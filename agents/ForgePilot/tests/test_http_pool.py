@@ -0,0 +1,85 @@
+import asyncio
+
+import httpx
+
+from backend.http_pool import HttpPool
+from backend.tools import SimulatedTools
+
+
+def test_preview_is_capped_and_streamed():
+    served = []
+
+    def handler(request):
+        body = httpx.ByteStream(b"x" * 100_000)
+        served.append(request.url.path)
+        return httpx.Response(200, stream=body)
+
+    pool = HttpPool(preview_chars=50, cache_entries=0, transport=httpx.MockTransport(handler))
+
+    async def go():
+        try:
+            return await pool.fetch("GET", "https://example.com/big")
+        finally:
+            await pool.close()
+
+    res = asyncio.run(go())
+    assert res.status == 200 and res.preview == "x" * 50 and res.truncated and not res.cached
+
+
+def test_conditional_get_cache():
+    seen = []
+
+    def handler(request):
+        seen.append((request.url.path, request.headers.get("if-none-match"), request.headers.get("if-modified-since")))
+        if request.url.path == "/etag":
+            if request.headers.get("if-none-match") == '"v1"':
+                return httpx.Response(304)
+            return httpx.Response(200, text="hello", headers={"ETag": '"v1"'})
+        if request.url.path == "/modified":
+            if request.headers.get("if-modified-since"):
+                return httpx.Response(304)
+            return httpx.Response(200, text="dated", headers={"Last-Modified": "Wed, 21 Oct 2015 07:28:00 GMT"})
+        return httpx.Response(200, text="plain")
+
+    pool = HttpPool(transport=httpx.MockTransport(handler))
+
+    async def go():
+        out = []
+        for path in ("/etag", "/etag", "/modified", "/modified", "/plain", "/plain"):
+            out.append(await pool.fetch("GET", f"https://example.com{path}"))
+        out.append(await pool.fetch("POST", "https://example.com/etag", body={"x": "1"}))
+        await pool.close()
+        return out
+
+    first, again, dated, dated_again, plain, plain_again, post = asyncio.run(go())
+    assert not first.cached and again.cached and again.preview == "hello" and again.status == 200
+    assert dated_again.cached and dated_again.preview == "dated"
+    assert not plain_again.cached
+    assert seen[1] == ("/etag", '"v1"', None)
+    assert seen[3][2] == "Wed, 21 Oct 2015 07:28:00 GMT"
+    assert seen[-1] == ("/etag", None, None) and not post.cached
+
+
+def test_per_host_limit_and_shared_client(tmp_path):
+    active = {"n": 0, "peak": 0}
+
+    async def handler(request):
+        active["n"] += 1
+        active["peak"] = max(active["peak"], active["n"])
+        await asyncio.sleep(0.02)
+        active["n"] -= 1
+        return httpx.Response(200, text="ok")
+
+    pool = HttpPool(max_per_host=2, transport=httpx.MockTransport(handler))
+    tools = SimulatedTools(allow_execute=True, sandbox_dir=str(tmp_path / "box"), http=pool)
+
+    async def go():
+        client = pool.client
+        results = await asyncio.gather(*(tools.http_fetch("https://example.com/health") for _ in range(6)))
+        assert pool.client is client
+        await pool.close()
+        return results
+
+    results = asyncio.run(go())
+    assert all(r["ok"] and r["status"] == 200 and r["body_preview"] == "ok" for r in results)
+    assert active["peak"] == 2
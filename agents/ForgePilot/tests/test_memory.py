@@ -1,3 +1,6 @@
+import asyncio
+import time
+
 from backend.memory import MemoryBus
 
 def test_memory_persistence(tmp_path):
@@ -8,4 +11,149 @@ def test_memory_persistence(tmp_path):
     mem.add(sid, "agent", "plan", {"steps": ["a", "b"]})
     events = mem.get_session(sid, limit=10)
     assert len(events) >= 2
-    assert events[-1].type in ("message", "plan", "scaffold", "simulation", "log")
\ No newline at end of file
+    assert events[-1].type in ("message", "plan", "scaffold", "simulation", "log")
+
+def test_memory_tail_and_cursors(tmp_path):
+    mem = MemoryBus(data_dir=str(tmp_path / "data"))
+    sid = mem.new_session_id()
+    for i in range(10):
+        mem.add(sid, "user", "message", {"i": i})
+
+    tail = mem.get_page(sid, limit=3)
+    assert [e.content["i"] for e in tail.events] == [7, 8, 9]
+    assert (tail.start, tail.end, tail.total) == (7, 10, 10)
+
+    older = mem.get_page(sid, limit=3, before=tail.start)
+    assert [e.content["i"] for e in older.events] == [4, 5, 6]
+
+    newer = mem.get_page(sid, limit=4, after=2)
+    assert [e.content["i"] for e in newer.events] == [2, 3, 4, 5]
+    assert mem.get_page(sid, limit=5, after=10).events == []
+
+
+def test_memory_index_rebuilt_for_legacy_log(tmp_path):
+    data_dir = tmp_path / "data"
+    mem = MemoryBus(data_dir=str(data_dir))
+    sid = mem.new_session_id()
+    for i in range(4):
+        mem.add(sid, "user", "message", {"i": i})
+
+    # Logs written before the index existed, or with a stale index, are re-indexed
+    (data_dir / f"{sid}.idx").unlink()
+    with open(data_dir / f"{sid}.jsonl", "a", encoding="utf-8") as f:
+        f.write("not json\n")
+    mem = MemoryBus(data_dir=str(data_dir))
+    mem.add(sid, "user", "message", {"i": 4})
+
+    page = mem.get_page(sid, limit=3)
+    assert page.total == 6
+    assert [e.content["i"] for e in page.events] == [3, 4]
+
+
+def test_memory_group_commit_writer(tmp_path):
+    mem = MemoryBus(data_dir=str(tmp_path / "data"), flush_interval=0.01)
+    writes = []
+    append_many = mem.persistent.append_many
+
+    def counting_append_many(session_id, events, fsync=False):
+        writes.append((session_id, len(events)))
+        append_many(session_id, events, fsync=fsync)
+
+    mem.persistent.append_many = counting_append_many
+    a, b = mem.new_session_id(), mem.new_session_id()
+
+    async def scenario():
+        mem.start()
+        for i in range(5):
+            mem.add(a, "user", "message", {"i": i})
+            mem.add(b, "agent", "log", {"i": i})
+        await mem.flush()
+        assert [e.content["i"] for e in mem.get_session(a)] == [0, 1, 2, 3, 4]
+        mem.add(a, "agent", "log", {"i": 5})
+        await mem.close()
+
+    asyncio.run(scenario())
+    # One coalesced append per session per batch instead of one per event
+    assert writes == [(a, 5), (b, 5), (a, 1)]
+    assert [e.content["i"] for e in mem.get_session(a)] == [0, 1, 2, 3, 4, 5]
+
+
+def test_memory_session_cache(tmp_path):
+    data_dir = str(tmp_path / "data")
+    mem = MemoryBus(data_dir=data_dir, max_events=4, max_cached_events=6)
+    a, b = mem.new_session_id(), mem.new_session_id()
+    for i in range(6):
+        mem.add(a, "user", "message", {"i": i})
+
+    # Recent pages come from the ring buffer, older ones fall through to disk
+    assert [e.content["i"] for e in mem.get_session(a, limit=3)] == [3, 4, 5]
+    assert [e.content["i"] for e in mem.get_session(a, limit=2, before=2)] == [0, 1]
+    assert (mem.in_memory.hits, mem.in_memory.misses) == (1, 1)
+
+    for i in range(3):
+        mem.add(b, "user", "message", {"i": i})
+    assert a not in mem.in_memory  # evicted to stay within the global budget
+    assert mem.in_memory.stats()["events"] == 3
+
+    # A restarted process warms the cache on first read
+    fresh = MemoryBus(data_dir=data_dir, max_events=4)
+    assert [e.content["i"] for e in fresh.get_session(a, limit=4)] == [2, 3, 4, 5]
+    assert [e.content["i"] for e in fresh.get_session(a, limit=2)] == [4, 5]
+    assert (fresh.in_memory.hits, fresh.in_memory.misses) == (1, 1)
+
+
+def test_memory_add_never_reads_the_log(tmp_path):
+    data_dir = str(tmp_path / "data")
+    old = MemoryBus(data_dir=data_dir)
+    known = old.new_session_id()
+    for i in range(3):
+        old.add(known, "user", "message", {"i": i})
+
+    mem = MemoryBus(data_dir=data_dir)
+    counts = []
+    count = mem.persistent.count
+    mem.persistent.count = lambda sid: counts.append(sid) or count(sid)
+    fresh = mem.new_session_id()
+    mem.add(fresh, "user", "message", {"i": 0})
+    mem.add(known, "user", "message", {"i": 3})
+    assert counts == []
+
+    # New sessions are cached from the start; existing ones on first read
+    assert [e.content["i"] for e in mem.get_session(fresh)] == [0]
+    assert [e.content["i"] for e in mem.get_session(known)] == [0, 1, 2, 3]
+    assert [e.content["i"] for e in mem.get_session(known, limit=2)] == [2, 3]
+    assert (mem.in_memory.hits, mem.in_memory.misses) == (2, 1)
+
+
+def test_memory_cold_read_waits_only_for_its_session(tmp_path):
+    data_dir = str(tmp_path / "data")
+    old = MemoryBus(data_dir=data_dir)
+    idle = old.new_session_id()
+    old.add(idle, "user", "message", {"i": 0})
+
+    mem = MemoryBus(data_dir=data_dir, flush_interval=0)
+    append_many = mem.persistent.append_many
+
+    def slow_append_many(session_id, events, fsync=False):
+        time.sleep(0.2)
+        append_many(session_id, events, fsync=fsync)
+
+    mem.persistent.append_many = slow_append_many
+    busy = "busy-session"  # not minted here, so not cached
+
+    async def scenario():
+        mem.start()
+        for i in range(3):
+            mem.add(busy, "agent", "log", {"i": i})
+        await asyncio.sleep(0.01)  # the writer is now inside a slow write
+        started = time.monotonic()
+        page = await mem.read_page(idle)
+        assert time.monotonic() - started < 0.1
+        assert [e.content["i"] for e in page.events] == [0]
+
+        # A cold read of the busy session still sees everything queued before it
+        page = await mem.read_page(busy)
+        assert [e.content["i"] for e in page.events] == [0, 1, 2]
+        await mem.close()
+
+    asyncio.run(scenario())
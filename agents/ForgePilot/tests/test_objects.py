@@ -0,0 +1,57 @@
+import asyncio
+import os
+import subprocess
+
+from backend.objects import ObjectStore
+from backend.tools import SimulatedTools
+
+MANIFEST = {"README.md": "# demo\n", "src/cli.py": "print('hi')\n"}
+
+
+def test_commit_writes_only_changed_files(tmp_path):
+    store = ObjectStore(str(tmp_path))
+    first = store.commit("Initial scaffold", MANIFEST)
+    assert sorted(first.written) == ["README.md", "src/cli.py"] and first.parent is None
+    assert (tmp_path / "src" / "cli.py").read_text() == "print('hi')\n"
+
+    # Same content again: hashes only, no writes and no new commit
+    mtime = os.stat(tmp_path / "README.md").st_mtime_ns
+    again = store.commit("Initial scaffold", MANIFEST)
+    assert again.written == [] and again.empty and again.commit == first.commit
+    assert os.stat(tmp_path / "README.md").st_mtime_ns == mtime
+
+    second = store.commit("Update readme", {"README.md": "# demo v2\n"})
+    assert second.written == ["README.md"] and second.parent == first.commit
+    assert store.tree(second.commit) == {**store.tree(first.commit), "README.md": store.tree(second.commit)["README.md"]}
+    assert store.head() == second.commit
+
+    # A working copy edited behind the store's back is restored
+    (tmp_path / "src" / "cli.py").write_text("tampered")
+    third = store.commit("Restore", {"src/cli.py": MANIFEST["src/cli.py"]})
+    assert third.written == ["src/cli.py"] and third.empty
+    assert (tmp_path / "src" / "cli.py").read_text() == "print('hi')\n"
+
+
+def test_ids_are_deterministic_and_git_compatible(tmp_path):
+    a = ObjectStore(str(tmp_path / "a")).commit("Initial scaffold", MANIFEST)
+    b = ObjectStore(str(tmp_path / "b")).commit("Initial scaffold", MANIFEST)
+    assert a.commit == b.commit and a.tree == b.tree
+    assert ObjectStore(str(tmp_path / "c")).commit("Other message", MANIFEST).commit != a.commit
+
+    blob = ObjectStore(str(tmp_path / "a")).tree(a.commit)["README.md"]
+    try:
+        expected = subprocess.run(["git", "hash-object", str(tmp_path / "a" / "README.md")], capture_output=True, text=True).stdout.strip()
+    except FileNotFoundError:
+        expected = None
+    if expected:
+        assert blob == expected
+
+
+def test_git_commit_tool(tmp_path):
+    tools = SimulatedTools(allow_execute=False, sandbox_dir=str(tmp_path / "box"))
+    first = asyncio.run(tools.git_commit("init", MANIFEST))
+    assert first["ok"] and len(first["commit"]) == 40 and first["files"] == list(MANIFEST)
+    # Running the entrypoint rewrites nothing, so the next commit is still free
+    asyncio.run(tools.code_execute(MANIFEST["src/cli.py"], filename="src/cli.py"))
+    again = asyncio.run(tools.git_commit("init", MANIFEST))
+    assert again["commit"] == first["commit"] and again["written"] == [] and again["empty"]
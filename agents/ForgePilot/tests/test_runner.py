@@ -0,0 +1,75 @@
+import asyncio
+import sys
+import time
+
+import pytest
+
+from backend.runner import CodeRunner, RunnerBusy
+from backend.tools import SimulatedTools
+
+
+def _script(tmp_path, name, code):
+    path = tmp_path / name
+    path.write_text(code)
+    return str(path)
+
+
+def test_runs_concurrently_and_streams_output(tmp_path):
+    path = _script(tmp_path, "sleep.py", "import sys, time\nprint('start', flush=True)\ntime.sleep(0.5)\nprint('done')\nsys.stderr.write('err')\n")
+    runner = CodeRunner(max_concurrent=4)
+    seen = []
+
+    async def go():
+        return await asyncio.gather(*(runner.run_python(path, on_output=lambda s, c: seen.append(s)) for _ in range(4)))
+
+    t0 = time.perf_counter()
+    results = asyncio.run(go())
+    assert time.perf_counter() - t0 < 1.5
+    assert all(r.returncode == 0 and r.stdout == "start\ndone\n" and r.stderr == "err" for r in results)
+    assert "stdout" in seen and "stderr" in seen
+
+
+def test_timeout_output_cap_and_rlimits(tmp_path):
+    runner = CodeRunner(timeout=0.5, max_output_bytes=1000, memory_mb=256)
+    loop = _script(tmp_path, "loop.py", "while True: pass\n")
+    res = asyncio.run(runner.run_python(loop))
+    assert res.timed_out and res.returncode is not None and res.duration_ms < 3000
+
+    chatty = _script(tmp_path, "chatty.py", "print('x' * 100000)\n")
+    res = asyncio.run(runner.run_python(chatty))
+    assert res.returncode == 0 and res.truncated and len(res.stdout) == 1000
+
+    if sys.platform.startswith("linux"):
+        hog = _script(tmp_path, "hog.py", "b = bytearray(1024 * 1024 * 1024)\n")
+        res = asyncio.run(runner.run_python(hog))
+        assert res.returncode != 0 and "MemoryError" in res.stderr
+
+        cpu = _script(tmp_path, "cpu.py", "while True: pass\n")
+        res = asyncio.run(CodeRunner(cpu_seconds=1, timeout=10).run_python(cpu))
+        assert not res.timed_out and res.returncode != 0 and res.duration_ms < 5000
+
+
+def test_admission_control(tmp_path):
+    path = _script(tmp_path, "sleep.py", "import time\ntime.sleep(0.3)\n")
+    runner = CodeRunner(max_concurrent=1, max_queue=1)
+
+    async def go():
+        first = asyncio.create_task(runner.run_python(path))
+        second = asyncio.create_task(runner.run_python(path))
+        await asyncio.sleep(0.05)
+        assert runner.stats()["running"] == 1 and runner.stats()["waiting"] == 1
+        with pytest.raises(RunnerBusy):
+            await runner.run_python(path)
+        done = await asyncio.gather(first, second)
+        assert done[1].queued_ms >= 200
+        return done
+
+    assert all(r.returncode == 0 for r in asyncio.run(go()))
+
+
+def test_code_execute_real(tmp_path):
+    tools = SimulatedTools(allow_execute=True, sandbox_dir=str(tmp_path / "box"))
+    res = asyncio.run(tools.code_execute("print('hi')", language="python", filename="cli.py"))
+    assert res["ok"] and res["simulated"] is False and res["stdout"] == "hi\n"
+    res = asyncio.run(tools.code_execute("raise SystemExit(3)", language="python", filename="bad.py"))
+    assert not res["ok"] and res["returncode"] == 3
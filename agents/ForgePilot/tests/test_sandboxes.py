@@ -0,0 +1,154 @@
+import asyncio
+import os
+import time
+
+from backend.config import Config
+from backend.memory import MemoryBus
+from backend.orchestrator import ForgePilotAgent
+from backend.sandboxes import SandboxManager
+from backend.tools import SimulatedTools
+
+MANIFEST = {"README.md": "# demo\n" * 100, "cli.py": "print('hi')\n"}
+
+
+def _commit(manager, sid, changes):
+    with manager.lease(sid):
+        return manager.store(sid).commit("scaffold", changes)
+
+
+def test_sessions_share_blobs_but_not_files(tmp_path):
+    manager = SandboxManager(str(tmp_path), link="hardlink")
+    _commit(manager, "a", MANIFEST)
+    _commit(manager, "b", MANIFEST)
+    a, b = manager.path("a"), manager.path("b")
+    assert a != b
+    assert os.stat(os.path.join(a, "README.md")).st_ino == os.stat(os.path.join(b, "README.md")).st_ino
+    # One blob in the shared store plus a link from each sandbox
+    assert os.stat(os.path.join(a, "README.md")).st_nlink == 3
+
+    # Changing one session's copy replaces its link and leaves the other alone
+    _commit(manager, "a", {"cli.py": "print('changed')\n"})
+    with open(os.path.join(b, "cli.py")) as f:
+        assert f.read() == "print('hi')\n"
+    with open(os.path.join(a, "cli.py")) as f:
+        assert f.read() == "print('changed')\n"
+
+    assert manager.path("../../etc").startswith(manager.sessions_dir + os.sep)
+    assert os.path.dirname(manager.path("../../etc")) == manager.sessions_dir
+
+
+def _read(*parts):
+    with open(os.path.join(*parts), "rb") as f:
+        return f.read()
+
+
+def _blob(manager, sid, rel):
+    store = manager.store(sid)
+    return store._path(store.tree(store.head())[rel])
+
+
+def test_in_place_writes_stay_private_by_default(tmp_path):
+    manager = SandboxManager(str(tmp_path))
+    _commit(manager, "a", MANIFEST)
+    _commit(manager, "b", MANIFEST)
+    blob = _blob(manager, "b", "cli.py")
+
+    # Generated code rewriting its own file, e.g. open(path, "w"), even as root
+    with open(os.path.join(manager.path("a"), "cli.py"), "w") as f:
+        f.write("print('tampered')\n")
+    assert _read(manager.path("b"), "cli.py") == b"print('hi')\n"
+    assert _read(blob) == b"print('hi')\n"
+    assert os.stat(os.path.join(manager.path("a"), "cli.py")).st_mode & 0o200
+
+
+def test_hardlinked_blobs_are_verified_before_linking(tmp_path):
+    manager = SandboxManager(str(tmp_path), link="hardlink")
+    _commit(manager, "a", MANIFEST)
+    _commit(manager, "b", MANIFEST)
+    blob = _blob(manager, "a", "cli.py")
+    path = os.path.join(manager.path("a"), "cli.py")
+    os.chmod(path, 0o644)
+    with open(path, "w") as f:
+        f.write("print('tampered')\n")
+    assert _read(blob) == b"print('tampered')\n"  # why hardlinks are opt-in
+
+    # New checkouts get the blob rewritten from the committed content
+    _commit(manager, "c", MANIFEST)
+    assert _read(manager.path("c"), "cli.py") == b"print('hi')\n"
+    assert _read(blob) == b"print('hi')\n"
+    # b's copy changed under it, so its next commit checks it out again
+    assert _commit(manager, "b", MANIFEST).written == ["cli.py"]
+    assert _read(manager.path("b"), "cli.py") == b"print('hi')\n"
+
+
+def test_gc_evicts_idle_sandboxes_lru_under_quota(tmp_path):
+    manager = SandboxManager(str(tmp_path), quota_bytes=0, idle_ttl=None, link="hardlink", object_grace=0)
+    for i, sid in enumerate(["old", "mid", "busy"]):
+        _commit(manager, sid, {"data.txt": sid * 1000})
+        os.utime(manager.path(sid), (1000 + i, 1000 + i))
+
+    with manager.lease("busy"):
+        res = manager.gc()
+    assert res["evicted"] == ["old", "mid"]
+    assert sorted(os.listdir(manager.sessions_dir)) == ["busy"]
+    assert res["objects_pruned"] > 0
+    # What the surviving sandbox needs is still there
+    store = manager.store("busy")
+    assert store.reachable() and all(os.path.exists(store._path(oid)) for oid in store.reachable())
+    assert manager.stats()["evicted"] == 2 and os.listdir(manager.trash_dir) == []
+
+
+def test_gc_keeps_sandboxes_under_quota_unless_expired(tmp_path):
+    manager = SandboxManager(str(tmp_path), quota_bytes=10 * 1024 * 1024, idle_ttl=3600, link="copy")
+    _commit(manager, "fresh", MANIFEST)
+    _commit(manager, "stale", MANIFEST)
+    os.utime(manager.path("stale"), (0, 0))
+    assert manager.gc()["evicted"] == ["stale"]
+    assert manager.gc()["evicted"] == []
+
+
+def test_gc_spares_old_objects_a_commit_is_reusing(tmp_path, monkeypatch):
+    manager = SandboxManager(str(tmp_path), quota_bytes=10 * 1024 * 1024, idle_ttl=3600, link="hardlink", object_grace=0.5)
+    _commit(manager, "a", MANIFEST)
+    os.utime(manager.path("a"), (0, 0))
+    time.sleep(0.6)  # a's objects are past the grace period
+
+    # b commits the same content; GC evicts a after b stored its objects but before b's HEAD moves
+    store = manager.store("b")
+    save_index = store._save_index
+    evicted = []
+
+    def gc_then_save(index):
+        evicted.extend(manager.gc()["evicted"])
+        save_index(index)
+
+    monkeypatch.setattr(store, "_save_index", gc_then_save)
+    with manager.lease("b"):
+        head = store.commit("scaffold", MANIFEST).commit
+    monkeypatch.undo()
+    assert evicted == ["a"]
+    assert store.reachable() and all(os.path.exists(store._path(oid)) for oid in store.reachable())
+    assert _commit(manager, "b", {"cli.py": "print('next')\n"}).parent == head
+
+
+def test_agent_runs_in_session_sandboxes(tmp_path):
+    cfg = Config()
+    cfg.data_dir = str(tmp_path / "data")
+    cfg.sandbox_dir = str(tmp_path / "sandbox")
+    cfg.ensure_dirs()
+    mem = MemoryBus(data_dir=cfg.data_dir)
+    manager = SandboxManager(cfg.sandbox_dir)
+    tools = SimulatedTools(allow_execute=False, sandbox_dir=cfg.sandbox_dir, sandboxes=manager)
+    agent = ForgePilotAgent(cfg, mem, tools)
+
+    async def go():
+        return await asyncio.gather(
+            agent.run(session_id="s1", instruction="Python CLI"),
+            agent.run(session_id="s2", instruction="Node CLI"),
+        )
+
+    r1, r2 = asyncio.run(go())
+    assert os.path.exists(os.path.join(manager.path("s1"), "cli.py"))
+    assert os.path.exists(os.path.join(manager.path("s2"), "index.js"))
+    assert not os.path.exists(os.path.join(manager.path("s1"), "index.js"))
+    assert r1["simulations"]["git_commit"]["ok"] and r2["simulations"]["git_commit"]["ok"]
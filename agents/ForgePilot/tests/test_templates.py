@@ -0,0 +1,104 @@
+import asyncio
+import json
+
+import pytest
+
+from backend.config import Config
+from backend.memory import MemoryBus
+from backend.tools import SimulatedTools
+from backend.orchestrator import ForgePilotAgent
+from backend.templates import KeywordMatcher, TemplateRegistry
+
+
+def test_matcher_finds_overlapping_keywords():
+    matcher = KeywordMatcher(["he", "she", "his", "hers", "ui"])
+    assert matcher.find("ushers") == {"she", "he", "hers"}
+    assert matcher.find("build a guide") == {"ui"}
+    assert matcher.find("nothing here") == {"he"}
+    assert matcher.find("") == set()
+
+
+def test_registry_routes_like_keyword_checks():
+    registry = TemplateRegistry.from_definitions()
+
+    steps, template = registry.route("Create a Python CLI that prints hello")
+    assert template.name == "python_cli" and template.entrypoint == "cli.py"
+    assert len(steps) == 5
+
+    steps, template = registry.route("Build an Express API with a UI")
+    assert template.name == "node_cli" and template.language == "node"
+    assert steps[2] == "Define frontend pages and components"
+    assert steps[3] == "Define API endpoints and data models"
+
+    # Keywords match anywhere, as the substring checks they replace did
+    assert "Define frontend pages and components" in registry.plan("build it")
+    assert "Define API endpoints and data models" in registry.plan("RAPID prototype")
+    assert registry.template("TypeScript tool").name == "node_cli"
+
+
+def test_manifests_are_shared_and_read_only():
+    registry = TemplateRegistry.from_definitions()
+    a = registry.template("a node tool").manifest
+    b = registry.template("another node tool").manifest
+    assert a is b
+    assert isinstance(a, dict)
+    with pytest.raises(TypeError):
+        a["index.js"] = "tampered"
+    with pytest.raises(TypeError):
+        a.update({"x": "y"})
+    assert registry.plan("plain") is registry.steps
+
+
+def test_registry_loads_definitions_from_file(tmp_path):
+    path = tmp_path / "templates.json"
+    path.write_text(json.dumps({
+        "templates": [
+            {"name": "go_cli", "keywords": ["golang"], "priority": 5, "entrypoint": "main.go", "language": "go", "files": {"main.go": "package main\n"}},
+            {"name": "python_cli", "default": True, "entrypoint": "cli.py", "files": {"cli.py": "print('hi')\n"}},
+        ],
+        "plan": {"steps": ["One", "Two"], "rules": [{"keywords": ["db"], "insert_at": 1, "step": "Design schema"}]},
+    }))
+    registry = TemplateRegistry.load(str(path))
+    steps, template = registry.route("A Golang service with a DB")
+    assert template.name == "go_cli"
+    assert steps == ("One", "Design schema", "Two")
+    assert registry.template("anything").name == "python_cli"
+
+    with pytest.raises(ValueError):
+        TemplateRegistry.from_definitions([{"name": "x", "entrypoint": "x", "files": {}}])
+
+
+def test_registry_prefers_higher_priority_templates():
+    registry = TemplateRegistry.from_definitions(
+        [
+            {"name": "web", "keywords": ["web", "site"], "priority": 1, "entrypoint": "a", "files": {}},
+            {"name": "react", "keywords": ["react", "site"], "priority": 9, "entrypoint": "b", "files": {}},
+            {"name": "base", "default": True, "entrypoint": "c", "files": {}},
+        ],
+        {"steps": ["One"], "rules": [
+            {"keywords": ["site", "web"], "insert_at": 0, "step": "Pick a host"},
+            {"keywords": ["site"], "insert_at": 1, "step": "Write copy"},
+        ]},
+    )
+    assert registry.template("a web app").name == "web"
+    assert registry.template("a react web app").name == "react"
+    assert registry.template("a web site").name == "react"
+    # Each rule fires once however many of its keywords occur
+    assert registry.plan("a web site") == ("Pick a host", "Write copy", "One")
+    assert registry.plan("a web app") == ("Pick a host", "One")
+
+
+def test_orchestrator_uses_registry(tmp_path):
+    cfg = Config()
+    cfg.data_dir = str(tmp_path / "data")
+    cfg.sandbox_dir = str(tmp_path / "sandbox")
+    cfg.templates_path = None
+    cfg.ensure_dirs()
+    mem = MemoryBus(data_dir=cfg.data_dir)
+    tools = SimulatedTools(allow_execute=False, sandbox_dir=cfg.sandbox_dir)
+    agent = ForgePilotAgent(cfg, mem, tools)
+
+    result = asyncio.run(agent.run(session_id=mem.new_session_id(), instruction="Node CLI with an API"))
+    assert result["summary"]["template"] == "node_cli"
+    assert result["simulations"]["code_execute"]["filename"] == "index.js"
+    assert "Define API endpoints and data models" in result["plan"]
@@ -0,0 +1,122 @@
+import asyncio
+import os
+
+import pytest
+
+from backend.runner import CodeRunner
+from backend.tools import SimulatedTools
+from backend.warm_pool import WarmPool, Zygote
+
+pytestmark = pytest.mark.skipif(not WarmPool.supported(), reason="warm pool needs fork and fd passing")
+
+
+def _script(tmp_path, name, code):
+    path = tmp_path / name
+    path.write_text(code)
+    return str(path)
+
+
+def test_warm_runs_match_cold_semantics(tmp_path):
+    ok = _script(tmp_path, "ok.py", "import os, sys\nprint(__name__, os.path.basename(sys.argv[0]), os.getcwd())\nsys.stderr.write('warn')\n")
+    exit3 = _script(tmp_path, "exit3.py", "raise SystemExit(3)\n")
+    boom = _script(tmp_path, "boom.py", "1 / 0\n")
+
+    async def go():
+        pool = WarmPool(size=1)
+        await pool.start()
+        runner = CodeRunner(pool=pool)
+        try:
+            return [await runner.run_python(p, cwd=str(tmp_path)) for p in (ok, exit3, boom)], pool.stats()
+        finally:
+            await pool.close()
+
+    (res_ok, res_exit, res_boom), stats = asyncio.run(go())
+    assert res_ok.returncode == 0 and res_ok.stdout == f"__main__ ok.py {tmp_path}\n" and res_ok.stderr == "warn"
+    assert res_exit.returncode == 3
+    assert res_boom.returncode == 1 and "ZeroDivisionError" in res_boom.stderr
+    # Failing children leave their zygote intact, so it is reused
+    assert stats["recycled"] == 0 and stats["spawned"] == 1
+
+
+def test_runs_are_isolated_and_recycled(tmp_path):
+    # State set by one run must not leak into the next one through the warm interpreter
+    leak = _script(tmp_path, "leak.py", "import json\nprint(getattr(json, 'leaked', False))\njson.leaked = True\n")
+
+    async def go():
+        pool = WarmPool(size=1, max_runs=2)
+        await pool.start()
+        runner = CodeRunner(pool=pool)
+        try:
+            outs = [(await runner.run_python(leak)).stdout for _ in range(3)]
+            await asyncio.sleep(0.5)
+            return outs, pool.stats()
+        finally:
+            await pool.close()
+
+    outs, stats = asyncio.run(go())
+    assert outs == ["False\n"] * 3
+    assert stats["recycled"] == 1 and stats["spawned"] == 2 and stats["idle"] == 1
+
+
+def test_warm_limits_and_timeouts(tmp_path):
+    loop = _script(tmp_path, "loop.py", "while True: pass\n")
+    chatty = _script(tmp_path, "chatty.py", "print('x' * 100000)\n")
+    after = _script(tmp_path, "after.py", "print('fine')\n")
+
+    async def go():
+        pool = WarmPool(size=1)
+        await pool.start()
+        runner = CodeRunner(pool=pool, timeout=0.5, max_output_bytes=1000)
+        try:
+            return [await runner.run_python(p) for p in (loop, chatty, after)]
+        finally:
+            await pool.close()
+
+    timed, capped, fine = asyncio.run(go())
+    assert timed.timed_out and timed.returncode == -9
+    assert capped.truncated and len(capped.stdout) == 1000
+    assert fine.stdout == "fine\n"
+
+
+@pytest.mark.skipif(not os.path.isdir("/proc/self/fd"), reason="counts open fds through /proc")
+def test_failed_handoff_closes_pipes_and_retires_the_zygote(tmp_path, monkeypatch):
+    ok = _script(tmp_path, "ok.py", "print('ok')\n")
+
+    def broken_send(self, req, fds):
+        raise ConnectionResetError("zygote went away")
+
+    async def go():
+        pool = WarmPool(size=1)
+        await pool.start()
+        runner = CodeRunner(pool=pool)
+        try:
+            fds = len(os.listdir("/proc/self/fd"))
+            with monkeypatch.context() as patch:
+                patch.setattr(Zygote, "send", broken_send)
+                for _ in range(3):
+                    with pytest.raises(ConnectionResetError):
+                        await runner.run_python(ok)
+            leaked = len(os.listdir("/proc/self/fd")) - fds
+            return leaked, pool.stats(), (await runner.run_python(ok)).stdout
+        finally:
+            await pool.close()
+
+    leaked, stats, out = asyncio.run(go())
+    assert leaked <= 0
+    assert stats["recycled"] == 3
+    assert out == "ok\n"
+
+
+def test_code_execute_uses_pool(tmp_path):
+    async def go():
+        pool = WarmPool(size=1)
+        await pool.start()
+        tools = SimulatedTools(allow_execute=True, sandbox_dir=str(tmp_path / "box"), runner=CodeRunner(pool=pool))
+        try:
+            return await tools.code_execute("print('hi')", language="python", filename="cli.py"), pool.stats()
+        finally:
+            await pool.close()
+
+    res, stats = asyncio.run(go())
+    assert res["ok"] and res["stdout"] == "hi\n"
+    assert stats["spawned"] == 1
@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import hashlib
+import math
+from typing import Any, Dict, Optional
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings, sized for ``capacity`` keys."""
+
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        self.size = max(8, int(math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str):
+        # Double hashing: k positions derived from one 128-bit digest
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, key: str):
+        for pos in self._positions(key):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+
+class LeadDeduplicator:
+    """Dedup keys for leads plus a Bloom filter of keys already stored.
+
+    The unique index on ``dedup_key`` is the source of truth; the filter only
+    tells the write path when a lead is certainly new so it can skip the
+    upsert lookup. Observed hit and false-positive rates are kept for sizing.
+    """
+
+    def __init__(self, with_company: bool = False, capacity: int = 1_000_000, error_rate: float = 0.01):
+        self.with_company = with_company
+        self.bloom = BloomFilter(capacity, error_rate)
+        self.checks = 0
+        self.bloom_hits = 0
+        self.false_positives = 0
+        self.duplicates = 0
+
+    def key(self, lead: Dict[str, Any]) -> Optional[str]:
+        """Normalized dedup key, or None for a lead without an email (never deduplicated)"""
+        key = (lead.get("email") or "").strip().lower()
+        if not key:
+            return None
+        if self.with_company:
+            key += "|" + (lead.get("company") or "").strip().lower()
+        return key
+
+    def maybe_seen(self, key: str) -> bool:
+        self.checks += 1
+        hit = key in self.bloom
+        if hit:
+            self.bloom_hits += 1
+        return hit
+
+    def record(self, key: str, bloom_hit: bool, duplicate: bool):
+        if duplicate:
+            self.duplicates += 1
+        elif bloom_hit:
+            self.false_positives += 1
+        if not bloom_hit:
+            self.bloom.add(key)
+
+    async def warm(self, collection, batch_size: int = 5000) -> int:
+        """Load the keys of stored leads into the filter.
+
+        Leads stored without a ``dedup_key`` (from before deduplication, or
+        without an email) are skipped: the upsert can never match them.
+        """
+        loaded = 0
+        cursor = collection.find({"dedup_key": {"$exists": True}}, {"_id": 0, "dedup_key": 1}).batch_size(batch_size)
+        async for doc in cursor:
+            self.bloom.add(doc["dedup_key"])
+            loaded += 1
+        return loaded
+
+    def stats(self) -> Dict[str, Optional[float]]:
+        return {
+            "checks": self.checks,
+            "bloom_hits": self.bloom_hits,
+            "duplicates": self.duplicates,
+            "false_positives": self.false_positives,
+            "hit_rate": self.bloom_hits / self.checks if self.checks else None,
+            "false_positive_rate": self.false_positives / self.bloom_hits if self.bloom_hits else None,
+            "keys": self.bloom.count,
+        }
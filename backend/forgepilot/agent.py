@@ -1,11 +1,21 @@
 from __future__ import annotations
 
+import asyncio
+import logging
 import os
 import time
-from typing import Any, Dict, List, Tuple, Optional
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, List, Set, Tuple, Optional
 
 import httpx
 
+from .templates import TemplateRegistry
+
+logger = logging.getLogger(__name__)
+
+RefinedCallback = Callable[[Optional[List[str]]], Awaitable[None]]
+
 
 class ToolResult(Dict[str, Any]):
     pass
@@ -46,84 +56,210 @@ class SimulatedTools:
             return ToolResult(ok=False, type="git_commit", simulated=True, error=str(e), timestamp=ts)
 
 
+class PlanCache:
+    """LRU of plans keyed by normalized instruction; entries expire after ``ttl`` seconds."""
+
+    def __init__(self, max_entries: int = 256, ttl: float = 3600.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, Tuple[str, ...]]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[Tuple[str, ...]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, steps = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return steps
+
+    def put(self, key: str, steps: Tuple[str, ...]) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl, steps)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+def _call_soon(loop: asyncio.AbstractEventLoop, callback: Callable[[], Any]) -> None:
+    try:
+        loop.call_soon_threadsafe(callback)
+    except RuntimeError:
+        pass  # loop already closed
+
+
+def _parse_steps(text: Any) -> List[str]:
+    steps: List[str] = []
+    for line in str(text).splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        # strip leading numbers/bullets
+        line = line.lstrip("- ")
+        if ". " in line:
+            line = line.split(". ", 1)[1]
+        steps.append(line)
+    return steps[:8]
+
+
 class LLMPlanner:
-    def __init__(self):
-        self.enabled = False
-        self._llm = None
-        key = os.environ.get("EMERGENT_LLM_KEY")
-        if key:
+    """Plans instructions with an LLM without blocking the event loop.
+
+    The client's blocking ``complete`` runs on a dedicated thread pool, at
+    most ``max_concurrency`` calls at a time and each bounded by ``timeout``.
+    Plans are cached by normalized instruction, and identical requests in
+    flight share one completion. Pass ``llm`` (anything with
+    ``complete(prompt, model=...)``) to use a client other than UniversalLLM.
+    """
+
+    def __init__(
+        self,
+        llm: Any = None,
+        max_concurrency: Optional[int] = None,
+        timeout: Optional[float] = None,
+        cache_size: Optional[int] = None,
+        cache_ttl: Optional[float] = None,
+    ):
+        self._llm = llm
+        if llm is None and os.environ.get("EMERGENT_LLM_KEY"):
             try:
                 from emergentintegrations.llms import UniversalLLM  # type: ignore
                 self._llm = UniversalLLM()
-                self.enabled = True
             except Exception:
-                self.enabled = False
+                self._llm = None
+        self.enabled = self._llm is not None
+        self.max_concurrency = max_concurrency or int(os.environ.get("FORGEPILOT_LLM_CONCURRENCY", "4"))
+        self.timeout = timeout or float(os.environ.get("FORGEPILOT_LLM_TIMEOUT", "30"))
+        self.cache = PlanCache(
+            max_entries=cache_size or int(os.environ.get("FORGEPILOT_PLAN_CACHE_SIZE", "256")),
+            ttl=cache_ttl or float(os.environ.get("FORGEPILOT_PLAN_CACHE_TTL", "3600")),
+        )
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="forgepilot-llm")
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+    @staticmethod
+    def normalize(instruction: str) -> str:
+        return " ".join(instruction.lower().split())
+
+    def cached(self, instruction: str) -> Optional[List[str]]:
+        steps = self.cache.get(self.normalize(instruction)) if self.enabled else None
+        return list(steps) if steps is not None else None
 
     async def plan(self, instruction: str) -> Optional[List[str]]:
-        if not self.enabled or not self._llm:
+        if not self.enabled:
             return None
+        key = self.normalize(instruction)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return list(cached)
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._complete(key, instruction))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # A cancelled caller leaves the shared completion running for the others
+        steps = await asyncio.shield(task)
+        return list(steps) if steps else None
+
+    async def _complete(self, key: str, instruction: str) -> Optional[Tuple[str, ...]]:
         prompt = (
             "Return a concise ordered plan (5-8 steps) to scaffold a project for the following instruction. "
             "Use imperative step names. Respond as a numbered list only. Instruction: " + instruction
         )
+        await self._semaphore.acquire()
         try:
-            text = self._llm.complete(prompt, model="gpt-4o-mini")  # provider auto-chosen by UniversalLLM
-            steps: List[str] = []
-            for line in str(text).splitlines():
-                line = line.strip()
-                if not line:
-                    continue
-                # strip leading numbers/bullets
-                line = line.lstrip("- ")
-                if ". " in line:
-                    line = line.split(". ", 1)[1]
-                steps.append(line)
-            return steps[:8]
-        except Exception:
+            call = self._executor.submit(self._call, prompt)
+        except BaseException:
+            self._semaphore.release()
+            raise
+        # A timed-out call keeps its thread busy, so its slot is only freed once the thread is done
+        loop = asyncio.get_running_loop()
+        call.add_done_callback(lambda _: _call_soon(loop, self._semaphore.release))
+        try:
+            text = await asyncio.wait_for(asyncio.wrap_future(call), self.timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"ForgePilot LLM plan timed out after {self.timeout}s")
             return None
+        except Exception as e:
+            logger.error(f"ForgePilot LLM plan failed: {e}")
+            return None
+        steps = tuple(_parse_steps(text))
+        if steps:
+            self.cache.put(key, steps)
+        return steps or None
+
+    def _call(self, prompt: str) -> Any:
+        return self._llm.complete(prompt, model="gpt-4o-mini")  # provider auto-chosen by UniversalLLM
+
+    def close(self) -> None:
+        # Completions still queued are dropped; running ones cannot be interrupted
+        self._executor.shutdown(wait=False, cancel_futures=True)
 
 
 class ForgePilotAgent:
-    def __init__(self, tools: SimulatedTools):
+    def __init__(
+        self,
+        tools: SimulatedTools,
+        registry: Optional[TemplateRegistry] = None,
+        planner: Optional[LLMPlanner] = None,
+        plan_deadline: Optional[float] = None,
+    ):
         self.tools = tools
-        self.planner = LLMPlanner()
-
-    def _heuristic_decompose(self, instruction: str) -> List[str]:
-        steps = [
-            "Understand requirements",
-            "Propose project structure",
-            "Generate scaffold files",
-            "Simulate tool execution (git, http, code run)",
-            "Summarize outcome and next steps"
-        ]
-        if "api" in instruction.lower():
-            steps.insert(2, "Define API endpoints and data models")
-        if "frontend" in instruction.lower() or "ui" in instruction.lower():
-            steps.insert(2, "Define frontend pages and components")
-        return steps
+        self.planner = planner or LLMPlanner()
+        self.plan_deadline = plan_deadline
+        self._refinements: Set[asyncio.Task] = set()
+        self.registry = registry or TemplateRegistry.load(os.environ.get("FORGEPILOT_TEMPLATES_PATH"))
 
-    def _choose_template(self, instruction: str) -> Tuple[str, Dict[str, str]]:
-        lc = instruction.lower()
-        if any(k in lc for k in ["node", "express", "javascript", "typescript"]):
-            return "node_cli", {
-                "package.json": '{ "name": "cli", "version": "0.1.0", "type": "module", "bin": { "cli": "index.js" }, "dependencies": {} }',
-                "index.js": "#!/usr/bin/env node\nconsole.log(\"Hello from CLI\");\n",
-                "README.md": "# Generated Node CLI\nRun: npm install && node index.js"
-            }
-        return "python_cli", {
-            "pyproject.toml": "[project]\nname = \"cli\"\nversion = \"0.1.0\"\nrequires-python = \">=3.9\"\n",
-            "cli.py": "import argparse\n\ndef main():\n    p = argparse.ArgumentParser()\n    p.add_argument('--name', default='world')\n    args = p.parse_args()\n    print(f'Hello, {args.name}!')\n\nif __name__ == '__main__':\n    main()\n",
-            "README.md": "# Generated Python CLI\nRun: python cli.py --name You"
-        }
+    async def _hedged_plan(self, instruction: str, heuristic: List[str], on_refined: Optional[RefinedCallback]) -> Tuple[List[str], str, bool]:
+        """Wait for the LLM plan up to ``plan_deadline``, else fall back to ``heuristic``.
+
+        Returns (plan, source, pending). When the deadline passes and
+        ``on_refined`` is given, the LLM plan keeps running in the background
+        and ``on_refined`` receives it (or None if planning failed).
+        """
+        if not self.planner.enabled:
+            return heuristic, "heuristic", False
+        cached = self.planner.cached(instruction)
+        if cached:
+            return cached, "llm", False
+        task = asyncio.ensure_future(self.planner.plan(instruction))
+        try:
+            steps = await asyncio.wait_for(asyncio.shield(task), self.plan_deadline)
+        except asyncio.TimeoutError:
+            # The completion carries on either way and lands in the plan cache
+            if on_refined is None:
+                return heuristic, "heuristic", False
+            refinement = asyncio.create_task(self._refine(task, on_refined))
+            self._refinements.add(refinement)
+            refinement.add_done_callback(self._refinements.discard)
+            return heuristic, "heuristic", True
+        return (steps, "llm", False) if steps else (heuristic, "heuristic", False)
+
+    async def _refine(self, task: "asyncio.Future[Optional[List[str]]]", on_refined: RefinedCallback) -> None:
+        try:
+            steps = await task
+        except Exception as e:
+            logger.error(f"ForgePilot background plan failed: {e}")
+            steps = None
+        await on_refined(steps)
+
+    async def close(self) -> None:
+        for task in list(self._refinements):
+            task.cancel()
+        await asyncio.gather(*self._refinements, return_exceptions=True)
+        self.planner.close()
 
-    async def run(self, instruction: str) -> Dict[str, Any]:
-        plan = await self.planner.plan(instruction) or self._heuristic_decompose(instruction)
-        template_name, manifest = self._choose_template(instruction)
+    async def run(self, instruction: str, on_refined: Optional[RefinedCallback] = None) -> Dict[str, Any]:
+        steps, template = self.registry.route(instruction)
+        plan, plan_source, plan_pending = await self._hedged_plan(instruction, list(steps), on_refined)
+        template_name, manifest = template.name, template.manifest
 
         git_res = await self.tools.git_commit("Initial scaffold", manifest)
         http_res = await self.tools.http_fetch("https://example.com/health")
-        code_file = "cli.py" if "cli.py" in manifest else "index.js"
-        code_res = await self.tools.code_execute(manifest[code_file], language="python" if code_file.endswith(".py") else "node", filename=code_file)
+        code_file = template.entrypoint
+        code_res = await self.tools.code_execute(manifest[code_file], language=template.language, filename=code_file)
 
         summary = {
             "template": template_name,
@@ -134,4 +270,4 @@ class ForgePilotAgent:
                 "code": {k: code_res.get(k) for k in ("ok", "filename", "simulated")}
             }
         }
-        return {"plan": plan, "manifest": manifest, "summary": summary}
\ No newline at end of file
+        return {"plan": plan, "plan_source": plan_source, "plan_pending": plan_pending, "manifest": manifest, "summary": summary}
\ No newline at end of file
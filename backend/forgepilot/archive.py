@@ -0,0 +1,193 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import io
+import json
+import logging
+import os
+import threading
+import zipfile
+from collections import OrderedDict
+from typing import AsyncIterator, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Members below this size, or already compressed, are stored rather than deflated
+MIN_DEFLATE_SIZE = 256
+STORED_SUFFIXES = {
+    ".zip", ".gz", ".tgz", ".bz2", ".xz", ".zst", ".7z", ".jar", ".whl",
+    ".png", ".jpg", ".jpeg", ".gif", ".webp", ".ico", ".woff", ".woff2",
+    ".mp3", ".mp4", ".pdf",
+}
+# Fixed member timestamp so the same manifest always yields the same bytes
+ZIP_EPOCH = (1980, 1, 1, 0, 0, 0)
+
+
+class _ChunkSink(io.RawIOBase):
+    """Unseekable write target; ZipFile then emits data descriptors and we can drain as it goes."""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:
+        self._chunks.append(bytes(b))
+        return len(b)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _member_info(path: str, size: int, compresslevel: int) -> zipfile.ZipInfo:
+    info = zipfile.ZipInfo(path, date_time=ZIP_EPOCH)
+    info.external_attr = 0o644 << 16
+    stored = compresslevel == 0 or size < MIN_DEFLATE_SIZE or os.path.splitext(path)[1].lower() in STORED_SUFFIXES
+    info.compress_type = zipfile.ZIP_STORED if stored else zipfile.ZIP_DEFLATED
+    return info
+
+
+def _write_member(zf: zipfile.ZipFile, sink: _ChunkSink, path: str, data: bytes, compresslevel: int) -> bytes:
+    zf.writestr(_member_info(path, len(data), compresslevel), data, compresslevel=compresslevel or None)
+    return sink.drain()
+
+
+def _finish(zf: zipfile.ZipFile, sink: _ChunkSink) -> bytes:
+    zf.close()
+    return sink.drain()
+
+
+async def stream_zip(manifest: Dict[str, str], compresslevel: int = 6) -> AsyncIterator[bytes]:
+    """Yield a zip archive of ``manifest`` member by member.
+
+    Each member is compressed in a worker thread and sent as soon as it is
+    ready, so the first bytes go out before the archive is complete and only
+    one compressed member is held in memory at a time.
+    """
+    sink = _ChunkSink()
+    zf = zipfile.ZipFile(sink, mode="w")
+    for path, content in manifest.items():
+        chunk = await asyncio.to_thread(_write_member, zf, sink, path, (content or "").encode("utf-8"), compresslevel)
+        if chunk:
+            yield chunk
+    yield await asyncio.to_thread(_finish, zf, sink)
+
+
+def archive_key(manifest: Dict[str, str], project_name: str, compresslevel: int) -> str:
+    """Content hash identifying the archive bytes ``stream_zip`` would produce."""
+    payload = json.dumps([project_name, compresslevel, list(manifest.items())], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ArchiveCache:
+    """Built archives keyed by ``archive_key``.
+
+    Keeps an in-memory LRU bounded by ``max_bytes`` and, when ``disk_dir`` is
+    set, a second tier of ``<key>.zip`` files bounded by ``max_disk_bytes``
+    that survives restarts and catches what memory evicts.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 64 * 1024 * 1024,
+        max_entry_bytes: int = 8 * 1024 * 1024,
+        disk_dir: Optional[str] = None,
+        max_disk_bytes: int = 512 * 1024 * 1024,
+    ):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.disk_dir = disk_dir
+        self.max_disk_bytes = max_disk_bytes
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._size = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        data = self._entries.get(key)
+        if data is not None:
+            self._entries.move_to_end(key)
+            return data
+        if self.disk_dir:
+            data = await asyncio.to_thread(self._disk_get, key)
+            if data is not None:
+                self._remember(key, data)
+        return data
+
+    async def put(self, key: str, data: bytes) -> None:
+        if len(data) > self.max_entry_bytes:
+            return
+        self._remember(key, data)
+        if self.disk_dir:
+            try:
+                await asyncio.to_thread(self._disk_put, key, data)
+            except Exception as e:
+                # The archive is served either way; only the disk copy is lost
+                logger.warning(f"Could not write archive {key} to the disk cache: {e}")
+
+    async def tee(self, key: str, chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+        """Pass ``chunks`` through and cache the archive once it is complete."""
+        parts = []
+        size = 0
+        async for chunk in chunks:
+            if size <= self.max_entry_bytes:
+                parts.append(chunk)
+                size += len(chunk)
+            yield chunk
+        if size <= self.max_entry_bytes:
+            await self.put(key, b"".join(parts))
+
+    def _remember(self, key: str, data: bytes) -> None:
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._size -= len(old)
+        self._entries[key] = data
+        self._size += len(data)
+        while self._size > self.max_bytes and self._entries:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= len(evicted)
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, f"{key}.zip")
+
+    def _disk_get(self, key: str) -> Optional[bytes]:
+        path = self._disk_path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)  # mtime doubles as the disk tier's LRU clock
+            return data
+        except OSError:
+            return None
+
+    def _disk_put(self, key: str, data: bytes) -> None:
+        path = self._disk_path(key)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        entries = []
+        for entry in os.scandir(self.disk_dir):
+            if not entry.name.endswith(".zip"):
+                continue
+            try:
+                st = entry.stat()
+            except FileNotFoundError:
+                continue  # evicted by a concurrent put
+            entries.append((st.st_mtime, st.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, victim in sorted(entries):
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(victim)
+            except FileNotFoundError:
+                pass
+            except OSError:
+                continue
+            total -= size
@@ -1,8 +1,11 @@
 from __future__ import annotations
 
+import asyncio
+import logging
+import math
 import time
 import uuid
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
 from motor.motor_asyncio import AsyncIOMotorClient
 from pydantic import BaseModel
@@ -17,16 +20,68 @@ class MemoryEvent(BaseModel):
     content: Dict[str, Any]
 
 
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindBuffer:
+    """Coalesces event documents from concurrent requests into shared inserts.
+
+    Documents are flushed with one unordered ``insert_many`` once ``max_docs``
+    are pending or ``max_delay`` seconds after the first one was buffered.
+    """
+
+    def __init__(self, col, max_docs: int = 500, max_delay: float = 0.05):
+        self.col = col
+        self.max_docs = max_docs
+        self.max_delay = max_delay
+        self._docs: List[Dict[str, Any]] = []
+        self._lock = asyncio.Lock()
+        self._timer: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    async def put(self, docs: List[Dict[str, Any]]) -> None:
+        self._docs.extend(docs)
+        if len(self._docs) >= self.max_docs:
+            await self.flush()
+        elif self._timer is None:
+            self._timer = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.max_delay)
+        self._timer = None
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f"ForgePilot write-behind flush failed: {e}")
+
+    async def flush(self) -> None:
+        """Write what is buffered; returns once every earlier flush has finished too."""
+        async with self._lock:
+            docs, self._docs = self._docs, []
+            if docs:
+                await self.col.insert_many(docs, ordered=False)
+
+    async def close(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        await self.flush()
+
+
 class MongoMemory:
-    def __init__(self, mongo_url: str, db_name: str):
+    def __init__(self, mongo_url: str, db_name: str, write_behind_ms: float = 0):
         self.client = AsyncIOMotorClient(mongo_url)
         self.db = self.client[db_name]
         self.col = self.db["forgepilot_events"]
+        self.buffer = WriteBehindBuffer(self.col, max_delay=write_behind_ms / 1000) if write_behind_ms > 0 else None
+        self._last_ts = 0.0
 
     async def ensure_indexes(self) -> None:
         try:
-            await self.col.create_index("session_id")
-            await self.col.create_index("timestamp")
+            # One index serves both the per-session filter and the timestamp sort/range
+            await self.col.create_index([("session_id", 1), ("timestamp", 1)])
         except Exception:
             pass
 
@@ -39,18 +94,67 @@ class MongoMemory:
         except Exception:
             return False
 
+    def event(self, session_id: str, role: str, type_: str, content: Dict[str, Any]) -> MemoryEvent:
+        # Strictly increasing timestamps keep events ordered however they are inserted
+        ts = time.time()
+        if ts <= self._last_ts:
+            ts = math.nextafter(self._last_ts, math.inf)
+        self._last_ts = ts
+        return MemoryEvent(session_id=session_id, timestamp=ts, role=role, type=type_, content=content)
+
     async def add(self, session_id: str, role: str, type_: str, content: Dict[str, Any]):
-        ev = MemoryEvent(session_id=session_id, timestamp=time.time(), role=role, type=type_, content=content)
-        await self.col.insert_one(ev.model_dump(by_alias=False))
+        ev = self.event(session_id, role, type_, content)
+        await self.add_many([ev])
         return ev
 
-    async def list(self, session_id: str, limit: int = 100) -> List[Dict[str, Any]]:
-        cursor = self.col.find({"session_id": session_id}).sort("timestamp", 1)
-        docs = []
-        async for d in cursor:
-            d.pop("_id", None)
-            docs.append(d)
-        return docs[-limit:]
+    async def add_many(self, events: List[MemoryEvent]) -> None:
+        """Persist events in one round-trip, or hand them to the write-behind buffer."""
+        if not events:
+            return
+        docs = [ev.model_dump(by_alias=False) for ev in events]
+        if self.buffer is not None:
+            await self.buffer.put(docs)
+        else:
+            await self.col.insert_many(docs, ordered=False)
+
+    async def close(self) -> None:
+        if self.buffer is not None:
+            await self.buffer.close()
+
+    async def list(self, session_id: str, limit: int = 100, before: Optional[float] = None, after: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Return up to ``limit`` events of a session, oldest first.
+
+        Without cursors this is the newest page. ``before``/``after`` are
+        exclusive timestamp cursors (keyset pagination), so each page is a
+        bounded index range scan no matter how long the session is.
+        """
+        if limit <= 0:
+            return []
+        if self.buffer is not None:
+            # Also waits out a batch already taken from the buffer but still being written
+            await self.buffer.flush()
+        query: Dict[str, Any] = {"session_id": session_id}
+        if after is not None:
+            query["timestamp"] = {"$gt": after}
+            direction = 1
+        else:
+            if before is not None:
+                query["timestamp"] = {"$lt": before}
+            direction = -1
+        cursor = self.col.find(query, {"_id": 0}).sort("timestamp", direction).limit(limit)
+        docs = await cursor.to_list(length=limit)
+        if direction < 0:
+            docs.reverse()
+        return docs
+
+    async def latest(self, session_id: str, types: List[str]) -> Optional[Dict[str, Any]]:
+        """Return the newest event of a session whose type is one of ``types``."""
+        if self.buffer is not None:
+            # Also waits out a batch already taken from the buffer but still being written
+            await self.buffer.flush()
+        return await self.col.find_one(
+            {"session_id": session_id, "type": {"$in": types}}, {"_id": 0}, sort=[("timestamp", -1)]
+        )
 
     @staticmethod
     def new_session_id() -> str:
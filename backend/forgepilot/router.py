@@ -1,15 +1,16 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
-from typing import Optional, Dict
+from fastapi import APIRouter, Header, HTTPException, Query, Response
+from pydantic import BaseModel, Field
+from typing import Optional, Dict, List
+import asyncio
 import os
-from io import BytesIO
-import zipfile
+import re
 from fastapi.responses import StreamingResponse
 
 from .agent import ForgePilotAgent, SimulatedTools
 from .memory import MongoMemory
+from .archive import ArchiveCache, archive_key, stream_zip
 
 router = APIRouter(prefix="/api/forgepilot", tags=["forgepilot"])
 
@@ -18,9 +19,18 @@ DB_NAME = os.environ.get("DB_NAME")
 if not MONGO_URL or not DB_NAME:
     raise RuntimeError("MONGO_URL and DB_NAME must be set in environment for ForgePilot module")
 
-memory = MongoMemory(MONGO_URL, DB_NAME)
+memory = MongoMemory(MONGO_URL, DB_NAME, write_behind_ms=float(os.environ.get("FORGEPILOT_WRITE_BEHIND_MS", "0")))
 tools = SimulatedTools(allow_execute=False)
-agent = ForgePilotAgent(tools=tools)
+# Milliseconds to wait for the LLM plan before answering with the heuristic one
+# and refining in the background; unset waits for the LLM as before
+PLAN_DEADLINE_MS = os.environ.get("FORGEPILOT_PLAN_DEADLINE_MS")
+agent = ForgePilotAgent(tools=tools, plan_deadline=float(PLAN_DEADLINE_MS) / 1000 if PLAN_DEADLINE_MS else None)
+# Sessions whose LLM plan is still being refined, set once it is recorded
+plan_refinements: Dict[str, asyncio.Event] = {}
+archive_cache = ArchiveCache(
+    max_bytes=int(os.environ.get("FORGEPILOT_ARCHIVE_CACHE_MB", "64")) * 1024 * 1024,
+    disk_dir=os.environ.get("FORGEPILOT_ARCHIVE_CACHE_DIR") or None,
+)
 
 
 class MessageReq(BaseModel):
@@ -28,6 +38,12 @@ class MessageReq(BaseModel):
     session_id: Optional[str] = None
 
 
+@router.on_event("shutdown")
+async def shutdown_forgepilot():
+    await agent.close()
+    await memory.close()
+
+
 @router.get("/health")
 async def health():
     ok = await memory.ping()
@@ -47,40 +63,116 @@ async def message(req: MessageReq):
     if not text:
         raise HTTPException(400, "input is required")
 
-    await memory.add(session_id, "user", "message", {"text": text})
-    result = await agent.run(text)
-    await memory.add(session_id, "agent", "plan", {"steps": result["plan"]})
-    await memory.add(session_id, "agent", "scaffold", {"files": list(result["manifest"].keys())})
-    await memory.add(session_id, "tool", "simulation", result["summary"]["simulated_actions"]) 
+    refined = asyncio.Event()
+    plan_refinements[session_id] = refined
+    written = asyncio.Event()
+    plan_event = None
+
+    async def record_refined(steps: Optional[List[str]]):
+        try:
+            # The LLM may answer while the tool steps still run; wait so the
+            # refinement is always stored after the plan it replaces
+            await written.wait()
+            if steps and plan_event is not None:
+                content = {"steps": steps, "source": "llm", "plan_timestamp": plan_event.timestamp}
+                await memory.add(session_id, "agent", "plan_refined", content)
+        finally:
+            refined.set()
+            if plan_refinements.get(session_id) is refined:
+                del plan_refinements[session_id]
+
+    # All events of the request are written together in one insert_many
+    events = [memory.event(session_id, "user", "message", {"text": text})]
+    result = None
+    try:
+        result = await agent.run(text, on_refined=record_refined)
+        plan_event = memory.event(session_id, "agent", "plan", {"steps": result["plan"], "source": result["plan_source"], "pending": result["plan_pending"]})
+        events.append(plan_event)
+        events.append(memory.event(session_id, "agent", "scaffold", {"files": list(result["manifest"].keys())}))
+        events.append(memory.event(session_id, "tool", "simulation", result["summary"]["simulated_actions"]))
+    finally:
+        if (result is None or not result["plan_pending"]) and plan_refinements.get(session_id) is refined:
+            del plan_refinements[session_id]
+        try:
+            await memory.add_many(events)
+        finally:
+            written.set()
 
     return {
         "session_id": session_id,
         "plan": result["plan"],
+        "plan_source": result["plan_source"],
+        "plan_pending": result["plan_pending"],
         "scaffold_manifest": result["manifest"],
         "summary": result["summary"],
     }
 
 
 @router.get("/memory/{session_id}")
-async def get_memory(session_id: str, limit: int = 100):
-    events = await memory.list(session_id, limit=limit)
-    return {"session_id": session_id, "events": events}
+async def get_memory(session_id: str, limit: int = 100, before: Optional[float] = None, after: Optional[float] = None):
+    events = await memory.list(session_id, limit=min(limit, 1000), before=before, after=after)
+    cursor = {"before": events[0]["timestamp"], "after": events[-1]["timestamp"]} if events else {"before": before, "after": after}
+    return {"session_id": session_id, "events": events, "cursor": cursor}
+
+
+@router.get("/plan/{session_id}")
+async def get_plan(session_id: str, wait: float = Query(0, ge=0, le=30)):
+    """Latest plan of a session; with ``wait``, long-polls up to that many seconds for a pending refinement."""
+    pending = plan_refinements.get(session_id)
+    if pending is not None and wait > 0:
+        try:
+            await asyncio.wait_for(pending.wait(), wait)
+        except asyncio.TimeoutError:
+            pass
+    event = await memory.latest(session_id, ["plan"])
+    if event is None:
+        raise HTTPException(404, "no plan for this session")
+    # A refinement replaces the plan it was recorded for
+    refined = await memory.latest(session_id, ["plan_refined"])
+    if refined is not None and refined["content"].get("plan_timestamp") == event["timestamp"]:
+        event = refined
+        status = "refined"
+    else:
+        status = "pending" if session_id in plan_refinements else "final"
+    return {
+        "session_id": session_id,
+        "status": status,
+        "plan": event["content"]["steps"],
+        "source": event["content"].get("source", "heuristic"),
+        "timestamp": event["timestamp"],
+    }
 
 
 class DownloadReq(BaseModel):
     manifest: Dict[str, str]
     project_name: Optional[str] = "forgepilot_scaffold"
+    compresslevel: int = Field(6, ge=0, le=9)
+
+
+_ENTITY_TAG = re.compile(r'(?:W/)?("[^"]*")')
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """If-None-Match uses weak comparison (RFC 9110 13.1.2): W/ prefixes are ignored."""
+    if if_none_match.strip() == "*":
+        return True
+    return etag.removeprefix("W/") in _ENTITY_TAG.findall(if_none_match)
 
 
 @router.post("/download")
-async def download_zip(req: DownloadReq):
+async def download_zip(req: DownloadReq, if_none_match: Optional[str] = Header(None)):
     if not req.manifest:
         raise HTTPException(400, "manifest is required")
-    buf = BytesIO()
-    with zipfile.ZipFile(buf, mode="w", compression=zipfile.ZIP_DEFLATED) as zf:
-        for path, content in req.manifest.items():
-            zf.writestr(path, content or "")
-    buf.seek(0)
-    filename = f"{req.project_name or 'forgepilot_scaffold'}.zip"
-    headers = {"Content-Disposition": f"attachment; filename={filename}"}
-    return StreamingResponse(buf, media_type="application/zip", headers=headers)
\ No newline at end of file
+    project_name = req.project_name or "forgepilot_scaffold"
+    key = archive_key(req.manifest, project_name, req.compresslevel)
+    # Archives are deterministic, so the content hash is a strong validator
+    etag = f'"{key}"'
+    if if_none_match and _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+
+    headers = {"Content-Disposition": f"attachment; filename={project_name}.zip", "ETag": etag}
+    data = await archive_cache.get(key)
+    if data is not None:
+        return Response(data, media_type="application/zip", headers=headers)
+    chunks = archive_cache.tee(key, stream_zip(req.manifest, req.compresslevel))
+    return StreamingResponse(chunks, media_type="application/zip", headers=headers)
\ No newline at end of file
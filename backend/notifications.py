@@ -0,0 +1,275 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import random
+import smtplib
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+from typing import Any, Dict, List, Optional
+
+from pymongo import ReturnDocument
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SMTPSettings:
+    """Mail transport settings. Without a host, messages are only logged.
+
+    For local testing point it at an SMTP stand-in, e.g. ``python -m aiosmtpd
+    -n -l localhost:1025`` with SMTP_HOST=localhost SMTP_PORT=1025
+    SMTP_STARTTLS=false.
+    """
+    host: Optional[str] = None
+    port: int = 587
+    username: Optional[str] = None
+    password: Optional[str] = None
+    starttls: bool = True
+    timeout: float = 10.0
+    sender: str = "noreply@windsoronlineservices.com"
+    recipients: List[str] = field(default_factory=lambda: ["windsoronlineservices@gmail.com"])
+
+    @classmethod
+    def from_env(cls) -> "SMTPSettings":
+        return cls(
+            host=os.environ.get('SMTP_HOST') or None,
+            port=int(os.environ.get('SMTP_PORT', '587')),
+            username=os.environ.get('SMTP_USERNAME') or None,
+            password=os.environ.get('SMTP_PASSWORD') or None,
+            starttls=os.environ.get('SMTP_STARTTLS', 'true').lower() == 'true',
+            timeout=float(os.environ.get('SMTP_TIMEOUT', '10')),
+            sender=os.environ.get('LEAD_EMAIL_FROM', cls.sender),
+            recipients=os.environ.get('LEAD_EMAIL_TO', 'windsoronlineservices@gmail.com').split(','),
+        )
+
+
+def render_lead_email(lead: Dict[str, Any]) -> EmailMessage:
+    """Build the notification email for a single lead"""
+    msg = EmailMessage()
+    msg['Subject'] = f"New Lead: {lead['firstName']} {lead['lastName']} from {lead['company']}"
+    msg.set_content(f"""
+New Lead Submission from Windsor AI Landing Page
+
+{_lead_details(lead)}
+
+---
+This lead was generated from the Windsor AI landing page.
+Follow up within 24 hours for best conversion rates.
+""")
+    return msg
+
+
+def render_digest_email(leads: List[Dict[str, Any]]) -> EmailMessage:
+    """Build one email summarizing several leads"""
+    msg = EmailMessage()
+    msg['Subject'] = f"{len(leads)} New Leads from the Windsor AI landing page"
+    sections = "\n\n".join(f"LEAD {i}\n{_lead_details(lead)}" for i, lead in enumerate(leads, 1))
+    msg.set_content(f"""
+{len(leads)} New Lead Submissions from Windsor AI Landing Page
+
+{sections}
+
+---
+Follow up within 24 hours for best conversion rates.
+""")
+    return msg
+
+
+def _lead_details(lead: Dict[str, Any]) -> str:
+    return f"""CONTACT INFORMATION:
+Name: {lead['firstName']} {lead['lastName']}
+Email: {lead['email']}
+Phone: {lead.get('phone') or 'Not provided'}
+Company: {lead['company']}
+Role: {lead['role']}
+
+BUSINESS DETAILS:
+Business Goals: {lead['businessGoals']}
+Current Challenges: {lead['currentChallenges']}
+Budget: {lead['budget']}
+Timeline: {lead['timeline']}
+
+Submitted at: {lead.get('timestamp')}"""
+
+
+class NotificationQueue:
+    """Persistent queue of lead notifications delivered by background workers.
+
+    Jobs live in the ``notifications`` collection, so pending mail survives
+    restarts. ``workers`` tasks claim due jobs atomically and send them over
+    SMTP in a thread; failures are retried with exponential backoff until
+    ``max_attempts``. With ``digest_interval`` set, single-lead jobs are held
+    back and rolled into one digest email per interval instead.
+
+    A claimed job is leased to its worker for ``lease`` seconds (by default
+    five SMTP timeouts); if the worker's process dies mid-send, any worker
+    of any process claims it again once the lease has run out.
+    """
+
+    def __init__(
+        self,
+        db,
+        smtp: Optional[SMTPSettings] = None,
+        workers: int = 4,
+        max_attempts: int = 5,
+        base_delay: float = 2.0,
+        max_delay: float = 600.0,
+        poll_interval: float = 5.0,
+        digest_interval: Optional[float] = None,
+        digest_max_leads: int = 200,
+        lease: Optional[float] = None,
+    ):
+        self.collection = db.notifications
+        self.smtp = smtp or SMTPSettings.from_env()
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.poll_interval = poll_interval
+        self.digest_interval = digest_interval
+        self.digest_max_leads = digest_max_leads
+        # Connect, STARTTLS, login and DATA can each take up to the SMTP timeout
+        self.lease = lease or 5 * self.smtp.timeout
+        self._wakeups: List[asyncio.Event] = []
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self):
+        # One event per worker, so a worker clearing its own cannot swallow another's wakeup
+        self._wakeups = [asyncio.Event() for _ in range(self.workers)]
+        await self.collection.create_index([("status", 1), ("kind", 1), ("next_attempt_at", 1)])
+        await self.collection.create_index([("status", 1), ("claimed_at", 1)])
+        self._tasks = [asyncio.create_task(self._worker(wakeup)) for wakeup in self._wakeups]
+        if self.digest_interval:
+            self._tasks.append(asyncio.create_task(self._digest_loop()))
+
+    async def close(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def enqueue_lead(self, lead: Dict[str, Any]):
+        await self._enqueue("lead", {"lead": _payload(lead)})
+
+    async def enqueue_digest(self, leads: List[Dict[str, Any]]):
+        """Queue a single email covering all of ``leads``"""
+        if leads:
+            await self._enqueue("digest", {"leads": [_payload(lead) for lead in leads]})
+
+    async def _enqueue(self, kind: str, payload: Dict[str, Any]):
+        now = datetime.utcnow()
+        await self.collection.insert_one({
+            "kind": kind,
+            "payload": payload,
+            "status": "pending",
+            "attempts": 0,
+            "created_at": now,
+            "next_attempt_at": now,
+        })
+        for wakeup in self._wakeups:
+            wakeup.set()
+
+    async def _worker(self, wakeup: asyncio.Event):
+        while True:
+            try:
+                job = await self._claim()
+            except Exception as e:
+                logger.error(f"Error claiming notification: {str(e)}")
+                job = None
+            if job is None:
+                try:
+                    await asyncio.wait_for(wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                wakeup.clear()
+                continue
+            try:
+                await self._deliver(job)
+            except Exception as e:
+                logger.error(f"Error delivering notification {job['_id']}: {str(e)}")
+
+    async def _claim(self) -> Optional[Dict[str, Any]]:
+        kinds = ["digest"] if self.digest_interval else ["lead", "digest"]
+        now = datetime.utcnow()
+        return await self.collection.find_one_and_update(
+            {"kind": {"$in": kinds}, "$or": [
+                {"status": "pending", "next_attempt_at": {"$lte": now}},
+                # Lease ran out: the claiming worker died or hung mid-send
+                # (jobs claimed before leases existed have no claimed_at)
+                {"status": "sending", "claimed_at": {"$not": {"$gt": now - timedelta(seconds=self.lease)}}},
+            ]},
+            {"$set": {"status": "sending", "claimed_at": now}, "$inc": {"attempts": 1}},
+            sort=[("next_attempt_at", 1)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def _deliver(self, job: Dict[str, Any]):
+        if job["kind"] == "digest":
+            msg = render_digest_email(job["payload"]["leads"])
+        else:
+            msg = render_lead_email(job["payload"]["lead"])
+        try:
+            await asyncio.to_thread(self._send, msg)
+        except Exception as e:
+            attempts = job["attempts"]
+            if attempts >= self.max_attempts:
+                logger.error(f"Giving up on notification {job['_id']} after {attempts} attempts: {str(e)}")
+                update = {"status": "failed", "last_error": str(e)}
+            else:
+                delay = min(self.max_delay, self.base_delay * 2 ** (attempts - 1))
+                delay *= random.uniform(0.8, 1.2)
+                logger.warning(f"Notification {job['_id']} failed (attempt {attempts}), retrying in {delay:.1f}s: {str(e)}")
+                update = {"status": "pending", "last_error": str(e), "next_attempt_at": datetime.utcnow() + timedelta(seconds=delay)}
+            await self._settle(job, update)
+            return
+        await self._settle(job, {"status": "sent", "sent_at": datetime.utcnow()})
+
+    async def _settle(self, job: Dict[str, Any], update: Dict[str, Any]):
+        # Only while our lease holds; once reclaimed, the job belongs to another worker
+        await self.collection.update_one({"_id": job["_id"], "claimed_at": job["claimed_at"]}, {"$set": update})
+
+    def _send(self, msg: EmailMessage):
+        msg['From'] = self.smtp.sender
+        msg['To'] = ", ".join(self.smtp.recipients)
+        if not self.smtp.host:
+            # No mail server configured: keep the demo behaviour of logging the email
+            logger.info(f"Lead email would be sent to {msg['To']}:")
+            logger.info(msg.get_content())
+            return
+        with smtplib.SMTP(self.smtp.host, self.smtp.port, timeout=self.smtp.timeout) as server:
+            if self.smtp.starttls:
+                server.starttls()
+            if self.smtp.username:
+                server.login(self.smtp.username, self.smtp.password or "")
+            server.send_message(msg)
+
+    async def _digest_loop(self):
+        while True:
+            await asyncio.sleep(self.digest_interval)
+            try:
+                await self._roll_digest()
+            except Exception as e:
+                logger.error(f"Error building lead digest: {str(e)}")
+
+    async def _roll_digest(self):
+        # Each lead is taken with one find_one_and_update, so when several
+        # processes roll at once every lead lands in exactly one digest
+        leads = []
+        while len(leads) < self.digest_max_leads:
+            job = await self.collection.find_one_and_update(
+                {"status": "pending", "kind": "lead"},
+                {"$set": {"status": "digested"}},
+                {"payload": 1},
+                sort=[("created_at", 1)],
+            )
+            if job is None:
+                break
+            leads.append(job["payload"]["lead"])
+        await self.enqueue_digest(leads)
+
+
+def _payload(lead: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: v for k, v in lead.items() if k != "_id"}
@@ -0,0 +1,100 @@
+"""Lead analytics rollups: lead counts per day, budget, timeline and role.
+
+Counters live in the ``lead_rollups`` collection, one document per
+(dimension, bucket). They are bumped with ``$inc`` upserts as leads are
+stored and can be rebuilt from the ``leads`` collection with:
+
+    python -m backend.rollups backfill
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import sys
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo import UpdateOne
+
+logger = logging.getLogger(__name__)
+
+# Aggregation expression producing each dimension's bucket from a lead document
+ROLLUP_DIMENSIONS: Dict[str, Any] = {
+    "day": {"$dateToString": {"format": "%Y-%m-%d", "date": "$timestamp"}},
+    "budget": "$budget",
+    "timeline": "$timeline",
+    "role": "$role",
+}
+
+
+def lead_buckets(lead: Dict[str, Any]) -> List[Tuple[str, str]]:
+    return [
+        ("day", lead["timestamp"].strftime("%Y-%m-%d")),
+        ("budget", lead.get("budget") or ""),
+        ("timeline", lead.get("timeline") or ""),
+        ("role", lead.get("role") or ""),
+    ]
+
+
+async def ensure_indexes(db):
+    await db.lead_rollups.create_index([("dimension", 1), ("bucket", 1)], unique=True)
+
+
+async def record_leads(db, leads: List[Dict[str, Any]]):
+    """Count newly stored leads into their buckets"""
+    counts = Counter(bucket for lead in leads for bucket in lead_buckets(lead))
+    ops = [
+        UpdateOne({"dimension": dimension, "bucket": bucket}, {"$inc": {"count": n}}, upsert=True)
+        for (dimension, bucket), n in counts.items()
+    ]
+    if ops:
+        await db.lead_rollups.bulk_write(ops, ordered=False)
+
+
+async def get_rollups(db, dimension: Optional[str] = None) -> Dict[str, Dict[str, int]]:
+    query = {"dimension": dimension} if dimension else {}
+    rollups: Dict[str, Dict[str, int]] = {}
+    async for doc in db.lead_rollups.find(query, {"_id": 0}).sort([("dimension", 1), ("bucket", 1)]):
+        rollups.setdefault(doc["dimension"], {})[doc["bucket"]] = doc["count"]
+    return rollups
+
+
+async def backfill(db):
+    """Rebuild all rollups from the leads collection.
+
+    Leads stored while this runs may be counted twice or not at all, so run
+    it when lead traffic is quiet.
+    """
+    await ensure_indexes(db)
+    await db.lead_rollups.delete_many({})
+    for dimension, expr in ROLLUP_DIMENSIONS.items():
+        pipeline = [
+            {"$group": {"_id": expr, "count": {"$sum": 1}}},
+            {"$project": {"_id": 0, "dimension": {"$literal": dimension}, "bucket": {"$ifNull": ["$_id", ""]}, "count": 1}},
+            {"$merge": {"into": "lead_rollups", "on": ["dimension", "bucket"], "whenMatched": "replace", "whenNotMatched": "insert"}},
+        ]
+        await db.leads.aggregate(pipeline).to_list(None)
+        logger.info(f"Rebuilt {dimension} lead rollups")
+
+
+async def _main(argv: List[str]) -> int:
+    if argv[1:] != ["backfill"]:
+        print("usage: python -m backend.rollups backfill", file=sys.stderr)
+        return 2
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    load_dotenv(Path(__file__).parent / '.env')
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    try:
+        await backfill(client[os.environ['DB_NAME']])
+    finally:
+        client.close()
+    return 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    sys.exit(asyncio.run(_main(sys.argv)))
@@ -1,17 +1,28 @@
-from fastapi import FastAPI, APIRouter
+from fastapi import FastAPI, APIRouter, Body, HTTPException, Query
+from fastapi.responses import JSONResponse, StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from bson import ObjectId
+from bson.errors import InvalidId
 import os
+import io
+import csv
+import json
+import zlib
+import asyncio
 import logging
 from pathlib import Path
-from pydantic import BaseModel, Field
-from typing import List
+from pydantic import BaseModel, Field, ValidationError
+from typing import Any, Dict, List, Optional
 import uuid
 from datetime import datetime
-import smtplib
-from email.mime.text import MimeText
-from email.mime.multipart import MimeMultipart
+
+from .notifications import NotificationQueue
+from .dedup import LeadDeduplicator
+from . import rollups
 
 
 ROOT_DIR = Path(__file__).parent
@@ -22,6 +33,21 @@ mongo_url = os.environ['MONGO_URL']
 client = AsyncIOMotorClient(mongo_url)
 db = client[os.environ['DB_NAME']]
 
+# Lead notification emails are delivered by background workers
+notifications = NotificationQueue(
+    db,
+    workers=int(os.environ.get('NOTIFY_WORKERS', '4')),
+    max_attempts=int(os.environ.get('NOTIFY_MAX_ATTEMPTS', '5')),
+    digest_interval=float(os.environ['NOTIFY_DIGEST_SECONDS']) if os.environ.get('NOTIFY_DIGEST_SECONDS') else None,
+)
+
+# Repeat lead submissions are detected by normalized email (optionally + company)
+lead_dedup = LeadDeduplicator(
+    with_company=os.environ.get('LEAD_DEDUP_WITH_COMPANY', 'false').lower() == 'true',
+    capacity=int(os.environ.get('LEAD_BLOOM_CAPACITY', '1000000')),
+    error_rate=float(os.environ.get('LEAD_BLOOM_ERROR_RATE', '0.01')),
+)
+
 # Create the main app without a prefix
 app = FastAPI()
 
@@ -38,6 +64,102 @@ class StatusCheck(BaseModel):
 class StatusCheckCreate(BaseModel):
     client_name: str
 
+STATUS_FIELDS = ("id", "client_name", "timestamp")
+STATUS_PAGE_MAX = 1000
+STATUS_STREAM_MAX = 100_000
+
+async def record_latest_status(docs: List[Dict[str, Any]]):
+    """Upsert the newest of ``docs`` per client into the status_latest view."""
+    latest: Dict[str, Dict[str, Any]] = {}
+    for doc in docs:
+        seen = latest.get(doc["client_name"])
+        if seen is None or doc["timestamp"] > seen["timestamp"]:
+            latest[doc["client_name"]] = doc
+    ops = []
+    for doc in latest.values():
+        # Pipeline update so a late, older heartbeat never replaces a newer one
+        newer = {"$gt": [doc["timestamp"], {"$ifNull": ["$timestamp", datetime.min]}]}
+        ops.append(UpdateOne(
+            {"client_name": doc["client_name"]},
+            [{"$set": {
+                "id": {"$cond": [newer, {"$literal": doc["id"]}, "$id"]},
+                "timestamp": {"$cond": [newer, doc["timestamp"], "$timestamp"]},
+            }}],
+            upsert=True,
+        ))
+    if ops:
+        await db.status_latest.bulk_write(ops, ordered=False)
+
+class StatusIngestBuffer:
+    """Write-behind buffer for status heartbeats.
+
+    Documents are acknowledged once queued and written by a background task
+    with one unordered insert_many per ``batch_size`` documents or every
+    ``max_age`` seconds. When ``capacity`` documents are waiting, ``put``
+    blocks until the writer catches up. Reads are eventually consistent.
+    """
+
+    def __init__(self, collection, batch_size: int = 500, max_age: float = 0.1, capacity: int = 10000):
+        self.collection = collection
+        self.batch_size = batch_size
+        self.max_age = max_age
+        self.capacity = capacity
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._queue = asyncio.Queue(maxsize=self.capacity)
+        self._task = asyncio.create_task(self._run())
+
+    async def put(self, doc: Dict[str, Any]):
+        await self._queue.put(doc)
+
+    async def close(self):
+        """Flush everything queued so far and stop the writer."""
+        if self._task is None:
+            return
+        await self._queue.put(None)
+        await self._task
+        self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            batch = []
+            first = await self._queue.get()
+            if first is None:
+                break
+            batch.append(first)
+            deadline = loop.time() + self.max_age
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    doc = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if doc is None:
+                    stopping = True
+                    break
+                batch.append(doc)
+            await self._write(batch)
+
+    async def _write(self, batch: List[Dict[str, Any]]):
+        try:
+            await self.collection.insert_many(batch, ordered=False)
+            await record_latest_status(batch)
+        except Exception as e:
+            logger.error(f"Failed to write {len(batch)} buffered status checks: {str(e)}")
+
+status_buffer = StatusIngestBuffer(
+    db.status_checks,
+    batch_size=int(os.environ.get('STATUS_BUFFER_BATCH_SIZE', '500')),
+    max_age=int(os.environ.get('STATUS_BUFFER_MAX_AGE_MS', '100')) / 1000,
+    capacity=int(os.environ.get('STATUS_BUFFER_CAPACITY', '10000')),
+) if os.environ.get('STATUS_INGEST_MODE', 'direct') == 'buffered' else None
+
 class LeadFunnelSubmission(BaseModel):
     firstName: str
     lastName: str
@@ -51,56 +173,68 @@ class LeadFunnelSubmission(BaseModel):
     timeline: str
     timestamp: datetime = Field(default_factory=datetime.utcnow)
 
-def send_lead_email(lead_data: LeadFunnelSubmission):
-    """Send lead information to Windsor Online Services email"""
+LEAD_FIELDS = tuple(LeadFunnelSubmission.model_fields)
+LEAD_FILTERS = ("company", "budget", "timeline")
+LEAD_PAGE_MAX = 1000
+LEAD_BATCH_MAX = int(os.environ.get('LEAD_BATCH_MAX', '5000'))
+
+async def store_leads(docs: List[Dict[str, Any]]) -> List[str]:
+    """Store leads that are not duplicates of stored ones.
+
+    Returns "stored", "duplicate" or an error message per doc. Leads the
+    Bloom filter has certainly not seen are inserted directly; possible
+    repeats are upserted, so the unique dedup_key index always decides.
+    Leads without an email have no dedup key and are always inserted.
+    """
+    outcome = ["stored"] * len(docs)
+    hits = []
+    fresh: List[int] = []
+    repeat: List[int] = []
+    for i, doc in enumerate(docs):
+        key = lead_dedup.key(doc)
+        if key is not None:
+            doc["dedup_key"] = key
+        hit = key is not None and lead_dedup.maybe_seen(key)
+        hits.append(hit)
+        (repeat if hit else fresh).append(i)
+
+    if fresh:
+        try:
+            await db.leads.insert_many([docs[i] for i in fresh], ordered=False)
+        except BulkWriteError as e:
+            for err in e.details.get("writeErrors", []):
+                outcome[fresh[err["index"]]] = "duplicate" if err.get("code") == 11000 else err.get("errmsg", "write error")
+    if repeat:
+        ops = [UpdateOne({"dedup_key": docs[i]["dedup_key"]}, {"$setOnInsert": docs[i]}, upsert=True) for i in repeat]
+        errors: Dict[int, Dict[str, Any]] = {}
+        try:
+            upserted = (await db.leads.bulk_write(ops, ordered=False)).upserted_ids
+        except BulkWriteError as e:
+            upserted = {u["index"]: u["_id"] for u in e.details.get("upserted", [])}
+            errors = {err["index"]: err for err in e.details.get("writeErrors", [])}
+        for j, i in enumerate(repeat):
+            if j in upserted:
+                docs[i]["_id"] = upserted[j]
+            elif j in errors and errors[j].get("code") != 11000:
+                outcome[i] = errors[j].get("errmsg", "write error")
+            else:
+                outcome[i] = "duplicate"
+
+    for i, doc in enumerate(docs):
+        if "dedup_key" in doc and outcome[i] in ("stored", "duplicate"):
+            lead_dedup.record(doc["dedup_key"], hits[i], duplicate=outcome[i] == "duplicate")
+
     try:
-        # Email configuration (using Gmail SMTP as example)
-        # In production, you would use proper email service credentials
-        smtp_server = "smtp.gmail.com"
-        smtp_port = 587
-        
-        # Create message
-        msg = MimeMultipart()
-        msg['From'] = "noreply@windsoronlineservices.com"
-        msg['To'] = "windsoronlineservices@gmail.com"
-        msg['Subject'] = f"New Lead: {lead_data.firstName} {lead_data.lastName} from {lead_data.company}"
-        
-        # Create email body
-        body = f"""
-New Lead Submission from Windsor AI Landing Page
-
-CONTACT INFORMATION:
-Name: {lead_data.firstName} {lead_data.lastName}
-Email: {lead_data.email}
-Phone: {lead_data.phone if lead_data.phone else 'Not provided'}
-Company: {lead_data.company}
-Role: {lead_data.role}
-
-BUSINESS DETAILS:
-Business Goals: {lead_data.businessGoals}
-Current Challenges: {lead_data.currentChallenges}
-Budget: {lead_data.budget}
-Timeline: {lead_data.timeline}
-
-Submitted at: {lead_data.timestamp}
-
----
-This lead was generated from the Windsor AI landing page.
-Follow up within 24 hours for best conversion rates.
-        """
-        
-        msg.attach(MimeText(body, 'plain'))
-        
-        # For demo purposes, we'll just log the email content
-        # In production, you would configure actual SMTP credentials
-        logger.info(f"Lead email would be sent to windsoronlineservices@gmail.com:")
-        logger.info(body)
-        
-        return True
-        
+        await rollups.record_leads(db, [doc for doc, result in zip(docs, outcome) if result == "stored"])
     except Exception as e:
-        logger.error(f"Error sending lead email: {str(e)}")
-        return False
+        logger.error(f"Error updating lead rollups: {str(e)}")
+    return outcome
+
+def _encode_lead(doc: Dict[str, Any]) -> Dict[str, Any]:
+    lead = _encode_doc(doc)
+    lead["id"] = str(lead.pop("_id"))
+    lead.pop("dedup_key", None)
+    return lead
 
 # Add your routes to the router instead of directly to app
 @api_router.get("/")
@@ -111,13 +245,84 @@ async def root():
 async def create_status_check(input: StatusCheckCreate):
     status_dict = input.dict()
     status_obj = StatusCheck(**status_dict)
-    _ = await db.status_checks.insert_one(status_obj.dict())
+    if status_buffer is not None:
+        await status_buffer.put(status_obj.dict())
+    else:
+        _ = await db.status_checks.insert_one(status_obj.dict())
+        await record_latest_status([status_obj.dict()])
     return status_obj
 
-@api_router.get("/status", response_model=List[StatusCheck])
-async def get_status_checks():
-    status_checks = await db.status_checks.find().to_list(1000)
-    return [StatusCheck(**status_check) for status_check in status_checks]
+@api_router.get("/status/latest")
+async def get_latest_status_checks(client_name: Optional[str] = None):
+    """Latest status check per client, read from the status_latest view"""
+    query = {"client_name": client_name} if client_name else {}
+    docs = await db.status_latest.find(query, {"_id": 0}).sort("client_name", 1).to_list(None)
+    return JSONResponse([_encode_doc(doc) for doc in docs])
+
+def _encode_doc(doc: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: v.isoformat() if isinstance(v, datetime) else v for k, v in doc.items()}
+
+def _status_cursor(doc: Dict[str, Any]) -> str:
+    return f"{doc['timestamp'].isoformat()}|{doc['id']}"
+
+@api_router.get("/status")
+async def get_status_checks(
+    limit: Optional[int] = Query(None, ge=1, le=STATUS_STREAM_MAX),
+    cursor: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    fields: Optional[str] = None,
+    format: str = "json",
+):
+    """List status checks in (timestamp, id) order.
+
+    Pages are keyset-paginated: pass the ``X-Next-Cursor`` response header
+    back as ``cursor``. ``format=ndjson`` streams every matching document
+    (or the first ``limit``) as the cursor yields it instead of returning
+    one page; JSON pages are capped at ``STATUS_PAGE_MAX``.
+    """
+    clauses: List[Dict[str, Any]] = []
+    if since or until:
+        time_range: Dict[str, Any] = {}
+        if since:
+            time_range["$gte"] = since
+        if until:
+            time_range["$lt"] = until
+        clauses.append({"timestamp": time_range})
+    if cursor:
+        try:
+            ts_raw, last_id = cursor.split("|", 1)
+            last_ts = datetime.fromisoformat(ts_raw)
+        except ValueError:
+            raise HTTPException(400, "Invalid cursor")
+        clauses.append({"$or": [{"timestamp": {"$gt": last_ts}}, {"timestamp": last_ts, "id": {"$gt": last_id}}]})
+    query = {"$and": clauses} if clauses else {}
+
+    # The keyset fields are always returned so the next cursor can be built
+    wanted = set(fields.split(",")) & set(STATUS_FIELDS) if fields else set(STATUS_FIELDS)
+    projection = {"_id": 0, "id": 1, "timestamp": 1, **{f: 1 for f in wanted}}
+    docs = db.status_checks.find(query, projection).sort([("timestamp", 1), ("id", 1)])
+
+    if format == "ndjson":
+        if limit:
+            docs = docs.limit(limit)
+
+        async def stream():
+            lines: List[str] = []
+            async for doc in docs:
+                lines.append(json.dumps(_encode_doc(doc)))
+                if len(lines) >= 100:
+                    yield "\n".join(lines) + "\n"
+                    lines = []
+            if lines:
+                yield "\n".join(lines) + "\n"
+
+        return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+    limit = min(limit or STATUS_PAGE_MAX, STATUS_PAGE_MAX)
+    page = await docs.limit(limit).to_list(limit)
+    headers = {"X-Next-Cursor": _status_cursor(page[-1])} if len(page) == limit else {}
+    return JSONResponse([_encode_doc(doc) for doc in page], headers=headers)
 
 @api_router.post("/lead-funnel")
 async def submit_lead_funnel(lead_data: LeadFunnelSubmission):
@@ -125,32 +330,198 @@ async def submit_lead_funnel(lead_data: LeadFunnelSubmission):
     try:
         # Store lead in database
         lead_dict = lead_data.dict()
-        await db.leads.insert_one(lead_dict)
-        
-        # Send email notification
-        email_sent = send_lead_email(lead_data)
+        outcome = (await store_leads([lead_dict]))[0]
+        if outcome == "duplicate":
+            logger.info(f"Duplicate lead submission from {lead_data.email} ignored")
+            return {"success": True, "message": "Lead submission already received", "duplicate": True}
+        if outcome != "stored":
+            raise RuntimeError(outcome)
         
-        if email_sent:
-            logger.info(f"New lead received from {lead_data.firstName} {lead_data.lastName} ({lead_data.email})")
-            return {"success": True, "message": "Lead submission received successfully"}
-        else:
-            logger.warning(f"Lead stored but email notification failed for {lead_data.email}")
+        # Queue email notification; delivery happens off the request path
+        try:
+            await notifications.enqueue_lead(lead_dict)
+        except Exception as e:
+            logger.warning(f"Lead stored but email notification could not be queued for {lead_data.email}: {str(e)}")
             return {"success": True, "message": "Lead submission received, email notification pending"}
+
+        logger.info(f"New lead received from {lead_data.firstName} {lead_data.lastName} ({lead_data.email})")
+        return {"success": True, "message": "Lead submission received successfully"}
             
     except Exception as e:
         logger.error(f"Error processing lead submission: {str(e)}")
         return {"success": False, "message": "Error processing submission"}
 
+@api_router.post("/lead-funnel/batch")
+async def submit_lead_funnel_batch(submissions: List[Any] = Body(...)):
+    """Handle a batch of lead submissions from partner integrations.
+
+    Every item is validated on its own; valid leads are stored with a single
+    unordered insert_many and announced in one digest email. ``results``
+    reports success or errors per item, in request order.
+    """
+    if len(submissions) > LEAD_BATCH_MAX:
+        raise HTTPException(413, f"At most {LEAD_BATCH_MAX} leads per batch")
+
+    results: List[Dict[str, Any]] = [{}] * len(submissions)
+    docs: List[Dict[str, Any]] = []
+    positions: List[int] = []
+    for i, raw in enumerate(submissions):
+        try:
+            lead = LeadFunnelSubmission.model_validate(raw)
+        except ValidationError as e:
+            errors = e.errors(include_url=False, include_context=False, include_input=False)
+            results[i] = {"index": i, "success": False, "errors": errors}
+            continue
+        docs.append(lead.dict())
+        positions.append(i)
+
+    try:
+        outcomes = await store_leads(docs)
+    except Exception as e:
+        logger.error(f"Error processing lead batch: {str(e)}")
+        return {"success": False, "message": "Error processing submission"}
+
+    stored = []
+    for i, doc, outcome in zip(positions, docs, outcomes):
+        if outcome == "stored":
+            results[i] = {"index": i, "success": True, "id": str(doc["_id"])}
+            stored.append(doc)
+        elif outcome == "duplicate":
+            results[i] = {"index": i, "success": True, "duplicate": True}
+        else:
+            results[i] = {"index": i, "success": False, "errors": [outcome]}
+
+    # One digest email for the whole batch instead of one per lead
+    try:
+        await notifications.enqueue_digest(stored)
+    except Exception as e:
+        logger.warning(f"{len(stored)} leads stored but email notification could not be queued: {str(e)}")
+
+    logger.info(f"Lead batch received: {len(stored)} of {len(submissions)} stored")
+    return {"success": True, "received": len(submissions), "stored": len(stored), "results": results}
+
 @api_router.get("/leads")
-async def get_leads():
-    """Get all leads for admin purposes"""
+async def get_leads(
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    company: Optional[str] = None,
+    budget: Optional[str] = None,
+    timeline: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+):
+    """Get leads for admin purposes, newest first.
+
+    Pass ``next_cursor`` from a response back as ``cursor`` for the next page.
+    ``fields`` is a comma-separated projection; every lead always has ``id``.
+    """
+    query: Dict[str, Any] = {}
+    filters = {"company": company, "budget": budget, "timeline": timeline}
+    query.update({key: value for key, value in filters.items() if value})
+    if since or until:
+        query["timestamp"] = {}
+        if since:
+            query["timestamp"]["$gte"] = since
+        if until:
+            query["timestamp"]["$lt"] = until
+    if cursor:
+        try:
+            query["_id"] = {"$lt": ObjectId(cursor)}
+        except InvalidId:
+            raise HTTPException(400, "Invalid cursor")
+    projection = {f: 1 for f in fields.split(",") if f in LEAD_FIELDS} if fields else None
+    limit = max(1, min(limit, LEAD_PAGE_MAX))
     try:
-        leads = await db.leads.find().to_list(1000)
-        return {"success": True, "leads": leads}
+        docs = await db.leads.find(query, projection or None).sort("_id", -1).limit(limit).to_list(limit)
+        next_cursor = str(docs[-1]["_id"]) if len(docs) == limit else None
+        return JSONResponse({"success": True, "leads": [_encode_lead(doc) for doc in docs], "next_cursor": next_cursor})
     except Exception as e:
         logger.error(f"Error fetching leads: {str(e)}")
         return {"success": False, "message": "Error fetching leads"}
 
+@api_router.get("/leads/analytics")
+async def get_lead_analytics(dimension: Optional[str] = None):
+    """Lead counts per day, budget, timeline and role from the rollup counters"""
+    if dimension and dimension not in rollups.ROLLUP_DIMENSIONS:
+        raise HTTPException(400, f"dimension must be one of {', '.join(rollups.ROLLUP_DIMENSIONS)}")
+    try:
+        return {"success": True, "rollups": await rollups.get_rollups(db, dimension)}
+    except Exception as e:
+        logger.error(f"Error fetching lead analytics: {str(e)}")
+        return {"success": False, "message": "Error fetching lead analytics"}
+
+@api_router.get("/leads/dedup-stats")
+async def get_lead_dedup_stats():
+    """Bloom filter hit and false-positive rates of lead deduplication"""
+    return lead_dedup.stats()
+
+@api_router.get("/leads/export")
+async def export_leads(
+    format: str = "csv",
+    since: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    compress: bool = True,
+    batch_size: int = 1000,
+):
+    """Stream every lead (or those from ``since`` on) as CSV or NDJSON.
+
+    Rows are read from the cursor and encoded ``batch_size`` at a time, and
+    optionally gzipped on the fly, so memory stays flat however many leads
+    there are. Rows come in (timestamp, id) order; to resume an interrupted
+    export, pass ``<timestamp>|<id>`` of the last exported row as ``cursor``.
+    """
+    if format not in ("csv", "ndjson"):
+        raise HTTPException(400, "format must be csv or ndjson")
+    batch_size = max(1, min(batch_size, 10000))
+    clauses: List[Dict[str, Any]] = []
+    if since:
+        clauses.append({"timestamp": {"$gte": since}})
+    if cursor:
+        try:
+            ts_raw, last_id = cursor.split("|", 1)
+            last_ts, last_oid = datetime.fromisoformat(ts_raw), ObjectId(last_id)
+        except (ValueError, InvalidId):
+            raise HTTPException(400, "Invalid cursor")
+        # Batches share timestamps, so ties are broken on _id like the sort
+        clauses.append({"$or": [{"timestamp": {"$gt": last_ts}}, {"timestamp": last_ts, "_id": {"$gt": last_oid}}]})
+    query = {"$and": clauses} if clauses else {}
+    docs = db.leads.find(query).sort([("timestamp", 1), ("_id", 1)]).batch_size(batch_size)
+    columns = ("id",) + LEAD_FIELDS
+
+    def encode(rows: List[Dict[str, Any]]) -> str:
+        if format == "ndjson":
+            return "".join(json.dumps(row) + "\n" for row in rows)
+        out = io.StringIO()
+        csv.DictWriter(out, fieldnames=columns, extrasaction="ignore").writerows(rows)
+        return out.getvalue()
+
+    async def stream():
+        gzip = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+
+        def emit(text: str) -> bytes:
+            data = text.encode("utf-8")
+            return gzip.compress(data) if gzip else data
+
+        if format == "csv":
+            yield emit(",".join(columns) + "\r\n")
+        rows: List[Dict[str, Any]] = []
+        async for doc in docs:
+            rows.append(_encode_lead(doc))
+            if len(rows) >= batch_size:
+                chunk = emit(encode(rows))
+                rows = []
+                if chunk:
+                    yield chunk
+        if rows:
+            yield emit(encode(rows))
+        if gzip:
+            yield gzip.flush()
+
+    filename = f"leads.{format}" + (".gz" if compress else "")
+    media_type = "application/gzip" if compress else ("text/csv" if format == "csv" else "application/x-ndjson")
+    return StreamingResponse(stream(), media_type=media_type, headers={"Content-Disposition": f"attachment; filename={filename}"})
+
 # Include the router in the main app
 # Mount ForgePilot router
 try:
@@ -168,6 +539,7 @@ app.add_middleware(
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Configure logging
@@ -177,6 +549,50 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@app.on_event("startup")
+async def start_status_buffer():
+    if status_buffer is not None:
+        status_buffer.start()
+
+@app.on_event("startup")
+async def start_notifications():
+    try:
+        await notifications.start()
+    except Exception as e:
+        logger.error(f"Notification workers failed to start: {str(e)}")
+
+async def warm_lead_dedup():
+    try:
+        loaded = await lead_dedup.warm(db.leads)
+        logger.info(f"Lead dedup filter warmed with {loaded} leads")
+    except Exception as e:
+        logger.error(f"Lead dedup filter warm-up failed: {str(e)}")
+
+@app.on_event("startup")
+async def start_lead_dedup():
+    # Until warm-up finishes, repeats still hit the unique index; they just cost a failed insert
+    app.state.lead_dedup_warmup = asyncio.create_task(warm_lead_dedup())
+
+@app.on_event("startup")
+async def ensure_indexes():
+    try:
+        # Serves time-range filters and the keyset sort of GET /api/status
+        await db.status_checks.create_index([("timestamp", 1), ("id", 1)])
+        await db.status_latest.create_index("client_name", unique=True)
+        # Equality filters of GET /api/leads, each paired with its _id sort
+        for key in LEAD_FILTERS:
+            await db.leads.create_index([(key, 1), ("_id", -1)])
+        # Time-range filters and the (timestamp, _id) order of the lead export
+        await db.leads.create_index([("timestamp", 1), ("_id", 1)])
+        await rollups.ensure_indexes(db)
+        # Partial, so leads stored before deduplication existed never conflict
+        await db.leads.create_index("dedup_key", unique=True, partialFilterExpression={"dedup_key": {"$exists": True}})
+    except Exception as e:
+        logger.warning(f"Could not create indexes: {e}")
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    if status_buffer is not None:
+        await status_buffer.close()
+    await notifications.close()
     client.close()
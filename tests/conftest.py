@@ -0,0 +1,35 @@
+import asyncio
+import os
+
+import motor.motor_asyncio
+import pytest
+from fastapi.testclient import TestClient
+from mongomock_motor import AsyncMongoMockClient
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "test_database")
+# The app connects at import time; give it an in-memory Mongo instead
+motor.motor_asyncio.AsyncIOMotorClient = lambda *args, **kwargs: AsyncMongoMockClient()
+
+from backend import server  # noqa: E402
+from backend.dedup import LeadDeduplicator  # noqa: E402
+from backend.forgepilot import router as forgepilot_router  # noqa: E402
+
+
+@pytest.fixture
+def db(monkeypatch, tmp_path):
+    """A fresh database wired into the app, with the indexes startup would create."""
+    db = AsyncMongoMockClient()["test_database"]
+    monkeypatch.setattr(server, "db", db)
+    monkeypatch.setattr(server, "lead_dedup", LeadDeduplicator())
+    monkeypatch.setattr(server.notifications, "collection", db.notifications)
+    monkeypatch.setattr(forgepilot_router.memory, "col", db["forgepilot_events"])
+    monkeypatch.setattr(forgepilot_router.tools, "sandbox_dir", str(tmp_path / "sandbox"))
+    os.makedirs(tmp_path / "sandbox")
+    asyncio.run(server.ensure_indexes())
+    return db
+
+
+@pytest.fixture
+def client(db):
+    return TestClient(server.app)
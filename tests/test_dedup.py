@@ -0,0 +1,74 @@
+import asyncio
+
+from backend import server
+from backend.dedup import BloomFilter, LeadDeduplicator
+from tests.test_leads import _lead, _submission
+
+
+def test_dedup_key_normalization():
+    dedup = LeadDeduplicator()
+    assert dedup.key({"email": "  Ada@Example.COM "}) == "ada@example.com"
+    assert dedup.key({}) is None and dedup.key({"email": "  "}) is None
+    with_company = LeadDeduplicator(with_company=True)
+    assert with_company.key({"email": "", "company": "Engines"}) is None
+    assert with_company.key({"email": "ada@example.com", "company": " Engines "}) == "ada@example.com|engines"
+    assert with_company.key({"email": "ada@example.com", "company": "Other"}) != with_company.key({"email": "ada@example.com", "company": "Engines"})
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    keys = [f"lead{i}@example.com" for i in range(1000)]
+    for key in keys:
+        bloom.add(key)
+    assert all(key in bloom for key in keys)
+    false_positives = sum(f"other{i}@example.com" in bloom for i in range(10000))
+    assert false_positives < 300  # ~1% expected
+
+
+def test_dedup_hit_and_false_positive_accounting():
+    dedup = LeadDeduplicator()
+    assert not dedup.maybe_seen("a")
+    dedup.record("a", bloom_hit=False, duplicate=False)
+    assert dedup.maybe_seen("a")
+    dedup.record("a", bloom_hit=True, duplicate=True)
+    # A hit for a key that turned out to be new is a false positive
+    assert dedup.maybe_seen("a")
+    dedup.record("a", bloom_hit=True, duplicate=False)
+    assert dedup.stats() == {
+        "checks": 3, "bloom_hits": 2, "duplicates": 1, "false_positives": 1,
+        "hit_rate": 2 / 3, "false_positive_rate": 0.5, "keys": 1,
+    }
+
+
+def test_identical_leads_in_one_insert_race_on_the_unique_index(db):
+    docs = [_lead(1), _lead(1, email=" LEAD1@example.com"), _lead(2)]
+    assert asyncio.run(server.store_leads(docs)) == ["stored", "duplicate", "stored"]
+    assert asyncio.run(db.leads.count_documents({})) == 2
+    # Known keys go through the upsert path; the index still decides
+    assert asyncio.run(server.store_leads([_lead(2), _lead(3)])) == ["duplicate", "stored"]
+    assert server.lead_dedup.stats()["duplicates"] == 2
+
+
+def test_duplicate_submission_is_acknowledged_once(client, db):
+    first = client.post("/api/lead-funnel", json=_submission(1)).json()
+    again = client.post("/api/lead-funnel", json=_submission(1, email="Lead1@Example.com")).json()
+    assert first["success"] and "duplicate" not in first
+    assert again == {"success": True, "message": "Lead submission already received", "duplicate": True}
+    leads = client.get("/api/leads").json()["leads"]
+    assert len(leads) == 1 and "dedup_key" not in leads[0]
+
+
+def test_leads_without_email_are_never_deduplicated(db):
+    docs = [_lead(1, email=""), _lead(2, email=None), _lead(3, email="  ")]
+    assert asyncio.run(server.store_leads(docs)) == ["stored"] * 3
+    assert asyncio.run(server.store_leads([_lead(4, email="")])) == ["stored"]
+    assert asyncio.run(db.leads.count_documents({"dedup_key": {"$exists": False}})) == 4
+    assert server.lead_dedup.stats()["checks"] == 0
+
+
+def test_warm_skips_leads_without_a_dedup_key(db):
+    asyncio.run(db.leads.insert_one(_lead(1)))  # stored before deduplication existed
+    asyncio.run(server.store_leads([_lead(2)]))
+    dedup = LeadDeduplicator()
+    assert asyncio.run(dedup.warm(db.leads)) == 1
+    assert dedup.maybe_seen(dedup.key(_lead(2))) and not dedup.maybe_seen(dedup.key(_lead(1)))
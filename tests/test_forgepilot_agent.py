@@ -0,0 +1,204 @@
+import asyncio
+import threading
+import time
+
+from fastapi.testclient import TestClient
+
+from backend import server
+from backend.forgepilot import router as forgepilot_router
+from backend.forgepilot.agent import ForgePilotAgent, LLMPlanner, SimulatedTools
+
+
+class FakeLLM:
+    """Blocking stand-in for UniversalLLM that counts completions."""
+
+    def __init__(self, delay=0.0, reply="1. Sketch it\n2. Build it\n3. Ship it"):
+        self.delay = delay
+        self.reply = reply
+        self.prompts = []
+        self.running = 0
+        self.max_running = 0
+        self._lock = threading.Lock()
+
+    def complete(self, prompt, model=None):
+        with self._lock:
+            self.prompts.append(prompt)
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        try:
+            time.sleep(self.delay)
+            return self.reply
+        finally:
+            with self._lock:
+                self.running -= 1
+
+
+def _run(planner, scenario):
+    async def main():
+        try:
+            return await scenario()
+        finally:
+            planner.close()
+
+    return asyncio.run(main())
+
+
+def test_identical_concurrent_plans_share_one_completion():
+    llm = FakeLLM(delay=0.1)
+    planner = LLMPlanner(llm=llm)
+
+    async def scenario():
+        return await asyncio.gather(*(planner.plan(text) for text in ["Build a CLI"] * 8 + ["  build A   cli "] * 2))
+
+    plans = _run(planner, scenario)
+    assert len(llm.prompts) == 1
+    assert plans == [["Sketch it", "Build it", "Ship it"]] * 10
+    assert planner.cached("BUILD a cli") == ["Sketch it", "Build it", "Ship it"]
+
+
+def test_cancelled_caller_leaves_the_shared_completion_running():
+    llm = FakeLLM(delay=0.1)
+    planner = LLMPlanner(llm=llm)
+
+    async def scenario():
+        first = asyncio.ensure_future(planner.plan("x"))
+        second = asyncio.ensure_future(planner.plan("x"))
+        await asyncio.sleep(0.02)
+        first.cancel()
+        return await second
+
+    assert _run(planner, scenario) == ["Sketch it", "Build it", "Ship it"]
+    assert len(llm.prompts) == 1
+
+
+def test_plan_cache_expires_and_evicts_least_recently_used():
+    llm = FakeLLM()
+    planner = LLMPlanner(llm=llm, cache_size=2, cache_ttl=0.2)
+
+    async def scenario():
+        for text in ["a", "b", "a", "c"]:  # "b" is least recently used when "c" arrives
+            await planner.plan(text)
+        assert len(llm.prompts) == 3
+        assert (planner.cached("a"), planner.cached("b")) == (["Sketch it", "Build it", "Ship it"], None)
+        await asyncio.sleep(0.25)
+        assert planner.cached("c") is None
+        await planner.plan("c")
+        assert len(llm.prompts) == 4
+
+    _run(planner, scenario)
+
+
+def test_slow_completions_time_out_and_respect_the_concurrency_cap():
+    llm = FakeLLM(delay=0.3)
+    planner = LLMPlanner(llm=llm, max_concurrency=2, timeout=0.05)
+
+    async def scenario():
+        started = time.monotonic()
+        assert await planner.plan("slow") is None
+        assert time.monotonic() - started < 0.25
+        return await asyncio.gather(*(planner.plan(f"p{i}") for i in range(4)))
+
+    assert _run(planner, scenario) == [None] * 4
+    assert planner.cached("slow") is None
+    assert llm.max_running <= 2
+
+
+def test_timed_out_completion_keeps_its_slot_until_the_thread_finishes():
+    llm = FakeLLM(delay=0.3)
+    planner = LLMPlanner(llm=llm, max_concurrency=1, timeout=0.05)
+
+    async def scenario():
+        assert await planner.plan("slow") is None  # its thread runs for another 0.25s
+        # The next call waits for the slot, not inside the executor queue where
+        # that wait would count against its own timeout
+        planner.timeout = 0.4
+        started = time.monotonic()
+        steps = await planner.plan("next")
+        return steps, time.monotonic() - started
+
+    steps, waited = _run(planner, scenario)
+    assert steps == ["Sketch it", "Build it", "Ship it"]
+    assert llm.max_running == 1
+    assert waited >= 0.5
+
+
+def test_planner_without_llm_is_disabled(monkeypatch):
+    monkeypatch.delenv("EMERGENT_LLM_KEY", raising=False)
+    planner = LLMPlanner()
+    assert not planner.enabled
+    assert _run(planner, lambda: planner.plan("anything")) is None
+
+
+def test_hedged_plan_falls_back_and_refines_in_background(tmp_path):
+    llm = FakeLLM(delay=0.2)
+    agent = ForgePilotAgent(tools=SimulatedTools(sandbox_dir=str(tmp_path)), planner=LLMPlanner(llm=llm), plan_deadline=0.02)
+    refined = []
+
+    async def on_refined(steps):
+        refined.append(steps)
+
+    async def scenario():
+        try:
+            result = await agent.run("Python CLI with an API", on_refined=on_refined)
+            assert (result["plan_source"], result["plan_pending"]) == ("heuristic", True)
+            assert result["plan"] == list(agent.registry.plan("Python CLI with an API"))
+            await asyncio.sleep(0.3)
+            assert refined == [["Sketch it", "Build it", "Ship it"]]
+            # The refined plan landed in the cache, so the next run uses it at once
+            again = await agent.run("python cli with an api", on_refined=on_refined)
+            assert (again["plan"], again["plan_source"], again["plan_pending"]) == (refined[0], "llm", False)
+        finally:
+            await agent.close()
+
+    asyncio.run(scenario())
+    assert len(llm.prompts) == 1
+
+
+def test_hedged_plan_uses_a_fast_llm(tmp_path):
+    agent = ForgePilotAgent(tools=SimulatedTools(sandbox_dir=str(tmp_path)), planner=LLMPlanner(llm=FakeLLM()), plan_deadline=1)
+
+    async def scenario():
+        try:
+            return await agent.run("anything")
+        finally:
+            await agent.close()
+
+    result = asyncio.run(scenario())
+    assert (result["plan"], result["plan_source"], result["plan_pending"]) == (["Sketch it", "Build it", "Ship it"], "llm", False)
+
+
+def test_plan_endpoint_long_polls_for_the_refinement(db, monkeypatch, tmp_path):
+    agent = ForgePilotAgent(tools=SimulatedTools(sandbox_dir=str(tmp_path)), planner=LLMPlanner(llm=FakeLLM(delay=0.3)), plan_deadline=0.02)
+    monkeypatch.setattr(forgepilot_router, "agent", agent)
+    with TestClient(server.app) as client:
+        sid = client.post("/api/forgepilot/message", json={"input": "Python CLI"}).json()["session_id"]
+        assert client.get(f"/api/forgepilot/plan/{sid}").json()["status"] == "pending"
+        plan = client.get(f"/api/forgepilot/plan/{sid}", params={"wait": 5}).json()
+        assert (plan["status"], plan["source"], plan["plan"]) == ("refined", "llm", ["Sketch it", "Build it", "Ship it"])
+        assert client.get("/api/forgepilot/plan/unknown").status_code == 404
+
+
+def test_refinement_during_slow_tools_is_stored_after_its_plan(db, monkeypatch, tmp_path):
+    # The LLM misses the deadline but answers while git_commit is still running
+    tools = SimulatedTools(sandbox_dir=str(tmp_path))
+    git_commit = tools.git_commit
+
+    async def slow_git_commit(*args, **kwargs):
+        await asyncio.sleep(0.3)
+        return await git_commit(*args, **kwargs)
+
+    monkeypatch.setattr(tools, "git_commit", slow_git_commit)
+    agent = ForgePilotAgent(tools=tools, planner=LLMPlanner(llm=FakeLLM(delay=0.05)), plan_deadline=0.01)
+    monkeypatch.setattr(forgepilot_router, "agent", agent)
+    with TestClient(server.app) as client:
+        res = client.post("/api/forgepilot/message", json={"input": "Python CLI"}).json()
+        assert res["plan_pending"]
+        sid = res["session_id"]
+        plan = client.get(f"/api/forgepilot/plan/{sid}", params={"wait": 5}).json()
+        assert (plan["status"], plan["source"], plan["plan"]) == ("refined", "llm", ["Sketch it", "Build it", "Ship it"])
+        events = client.get(f"/api/forgepilot/memory/{sid}").json()["events"]
+        assert [e["type"] for e in events] == ["message", "plan", "scaffold", "simulation", "plan_refined"]
+        # A later message in the session starts from its own heuristic plan again
+        forgepilot_router.agent = ForgePilotAgent(tools=SimulatedTools(sandbox_dir=str(tmp_path)), planner=LLMPlanner(llm=None))
+        client.post("/api/forgepilot/message", json={"input": "Python CLI", "session_id": sid})
+        assert client.get(f"/api/forgepilot/plan/{sid}").json()["status"] == "final"
@@ -0,0 +1,125 @@
+import asyncio
+import io
+import os
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+from backend.forgepilot import router as forgepilot_router
+from backend.forgepilot.archive import ArchiveCache, archive_key, stream_zip
+
+MANIFEST = {
+    "README.md": "# Demo\n" * 200,
+    "src/cli.py": "print('hi')\n",
+    "assets/logo.png": "not really a png",
+    "empty.txt": "",
+}
+
+
+async def _collect(chunks):
+    return [chunk async for chunk in chunks]
+
+
+def test_stream_zip_round_trips_member_by_member():
+    chunks = asyncio.run(_collect(stream_zip(MANIFEST)))
+    assert len(chunks) > len(MANIFEST)  # one chunk per member, then the directory
+    with zipfile.ZipFile(io.BytesIO(b"".join(chunks))) as zf:
+        assert zf.testzip() is None
+        assert zf.namelist() == list(MANIFEST)
+        assert {name: zf.read(name).decode("utf-8") for name in zf.namelist()} == MANIFEST
+        types = {info.filename: info.compress_type for info in zf.infolist()}
+    assert types == {
+        "README.md": zipfile.ZIP_DEFLATED,
+        "src/cli.py": zipfile.ZIP_STORED,  # too small to be worth deflating
+        "assets/logo.png": zipfile.ZIP_STORED,
+        "empty.txt": zipfile.ZIP_STORED,
+    }
+
+
+def test_stream_zip_is_deterministic():
+    first = b"".join(asyncio.run(_collect(stream_zip(MANIFEST))))
+    assert b"".join(asyncio.run(_collect(stream_zip(dict(MANIFEST))))) == first
+    assert b"".join(asyncio.run(_collect(stream_zip(MANIFEST, compresslevel=0)))) != first
+
+
+def test_download_streams_the_archive(client):
+    res = client.post("/api/forgepilot/download", json={"manifest": MANIFEST, "project_name": "demo"})
+    assert res.status_code == 200
+    assert res.headers["content-disposition"] == "attachment; filename=demo.zip"
+    with zipfile.ZipFile(io.BytesIO(res.content)) as zf:
+        assert zf.read("src/cli.py") == b"print('hi')\n"
+    assert client.post("/api/forgepilot/download", json={"manifest": {}}).status_code == 400
+
+
+def test_download_etag_revalidates_with_304(client, monkeypatch):
+    monkeypatch.setattr(forgepilot_router, "archive_cache", ArchiveCache())
+    body = {"manifest": MANIFEST, "project_name": "demo"}
+    first = client.post("/api/forgepilot/download", json=body)
+    etag = first.headers["etag"]
+    assert etag == f'"{archive_key(MANIFEST, "demo", 6)}"'
+
+    cached = client.post("/api/forgepilot/download", json=body)
+    assert (cached.content, cached.headers["etag"]) == (first.content, etag)
+    revalidated = client.post("/api/forgepilot/download", json=body, headers={"If-None-Match": f'"other", {etag}'})
+    assert (revalidated.status_code, revalidated.content, revalidated.headers["etag"]) == (304, b"", etag)
+    changed = client.post("/api/forgepilot/download", json={**body, "compresslevel": 9}, headers={"If-None-Match": etag})
+    assert changed.status_code == 200 and changed.headers["etag"] != etag
+
+
+def test_if_none_match_uses_weak_comparison():
+    etag = '"abc"'
+    for header in ('"abc"', 'W/"abc"', ' W/"x" ,W/"abc"', '"x", "abc"', "*", " * "):
+        assert forgepilot_router._etag_matches(header, etag), header
+    for header in ('"abcd"', 'W/"ab"', '"x", W/"y"', "abc", ""):
+        assert not forgepilot_router._etag_matches(header, etag), header
+
+
+def test_archive_cache_evicts_least_recently_used():
+    cache = ArchiveCache(max_bytes=10, max_entry_bytes=6)
+
+    async def scenario():
+        await cache.put("a", b"aaaa")
+        await cache.put("b", b"bbbb")
+        assert await cache.get("a") == b"aaaa"  # now the most recently used
+        await cache.put("c", b"cccc")
+        await cache.put("huge", b"x" * 7)  # over max_entry_bytes, never cached
+        return [await cache.get(k) for k in ("a", "b", "c", "huge")]
+
+    assert asyncio.run(scenario()) == [b"aaaa", None, b"cccc", None]
+
+
+def test_archive_disk_tier_survives_restart_and_evicts(tmp_path):
+    async def scenario():
+        cache = ArchiveCache(max_bytes=4, disk_dir=str(tmp_path), max_disk_bytes=8)
+        await cache.put("a", b"aaaa")
+        os.utime(tmp_path / "a.zip", (1, 1))
+        await cache.put("b", b"bbbb")
+        await cache.put("c", b"cccc")
+        restarted = ArchiveCache(disk_dir=str(tmp_path))
+        return [await restarted.get(k) for k in ("a", "b", "c")]
+
+    assert asyncio.run(scenario()) == [None, b"bbbb", b"cccc"]
+    assert sorted(os.listdir(tmp_path)) == ["b.zip", "c.zip"]
+
+
+def test_disk_cache_failure_does_not_abort_the_download(client, monkeypatch, tmp_path):
+    cache = ArchiveCache(disk_dir=str(tmp_path))
+
+    def broken_disk_put(key, data):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(cache, "_disk_put", broken_disk_put)
+    monkeypatch.setattr(forgepilot_router, "archive_cache", cache)
+    res = client.post("/api/forgepilot/download", json={"manifest": MANIFEST})
+    assert res.status_code == 200
+    with zipfile.ZipFile(io.BytesIO(res.content)) as zf:
+        assert zf.namelist() == list(MANIFEST)
+    assert asyncio.run(cache.get(archive_key(MANIFEST, "forgepilot_scaffold", 6))) == res.content
+
+
+def test_concurrent_disk_writes_of_one_key(tmp_path):
+    cache = ArchiveCache(disk_dir=str(tmp_path))
+    data = b"z" * 1024 * 1024
+    with ThreadPoolExecutor(8) as pool:
+        list(pool.map(lambda _: cache._disk_put("k", data), range(32)))
+    assert os.listdir(tmp_path) == ["k.zip"]
+    assert (tmp_path / "k.zip").read_bytes() == data
@@ -0,0 +1,99 @@
+import asyncio
+
+from backend.forgepilot import router as forgepilot_router
+from backend.forgepilot.memory import WriteBehindBuffer
+
+
+def _store_events(n):
+    memory = forgepilot_router.memory
+    events = [memory.event("s1", "user", "message", {"i": i}) for i in range(n)]
+    events.insert(3, memory.event("s2", "user", "message", {"i": -1}))
+    asyncio.run(memory.add_many(events))
+
+
+def test_memory_pages_backwards_without_gaps(client):
+    _store_events(25)
+    seen = []
+    page = client.get("/api/forgepilot/memory/s1", params={"limit": 10}).json()
+    while page["events"]:
+        seen = [e["content"]["i"] for e in page["events"]] + seen
+        page = client.get("/api/forgepilot/memory/s1", params={"limit": 10, "before": page["cursor"]["before"]}).json()
+    assert seen == list(range(25))
+
+
+def test_memory_pages_forwards_without_gaps(client):
+    _store_events(25)
+    seen = []
+    page = client.get("/api/forgepilot/memory/s1", params={"limit": 7, "after": 0}).json()
+    while page["events"]:
+        seen += [e["content"]["i"] for e in page["events"]]
+        page = client.get("/api/forgepilot/memory/s1", params={"limit": 7, "after": page["cursor"]["after"]}).json()
+    assert seen == list(range(25))
+    assert [e["content"] for e in client.get("/api/forgepilot/memory/s2").json()["events"]] == [{"i": -1}]
+
+
+def test_message_writes_its_events_in_one_insert(client, monkeypatch):
+    col = forgepilot_router.memory.col
+    calls = []
+    insert_many = col.insert_many
+
+    async def counting_insert_many(docs, **kwargs):
+        calls.append(len(docs))
+        return await insert_many(docs, **kwargs)
+
+    monkeypatch.setattr(col, "insert_many", counting_insert_many)
+    res = client.post("/api/forgepilot/message", json={"input": "Python CLI with an API"}).json()
+    assert calls == [4]
+    events = client.get(f"/api/forgepilot/memory/{res['session_id']}").json()["events"]
+    assert [e["type"] for e in events] == ["message", "plan", "scaffold", "simulation"]
+
+
+def test_write_behind_buffer_coalesces_requests(db):
+    col = db["forgepilot_events"]
+    calls = []
+    insert_many = col.insert_many
+
+    async def counting_insert_many(docs, **kwargs):
+        calls.append(len(docs))
+        return await insert_many(docs, **kwargs)
+
+    col.insert_many = counting_insert_many
+    buffer = WriteBehindBuffer(col, max_docs=100, max_delay=0.05)
+
+    async def scenario():
+        await buffer.put([{"session_id": "a", "timestamp": 1.0}, {"session_id": "a", "timestamp": 2.0}])
+        await buffer.put([{"session_id": "b", "timestamp": 3.0}])
+        assert calls == []
+        await asyncio.sleep(0.1)
+        await buffer.put([{"session_id": "a", "timestamp": 4.0}])
+        await buffer.close()
+
+    asyncio.run(scenario())
+    assert calls == [3, 1]
+
+
+def test_reads_wait_for_a_flush_in_progress(db):
+    memory = forgepilot_router.memory
+    col = db["forgepilot_events"]
+    insert_many = col.insert_many
+
+    async def slow_insert_many(docs, **kwargs):
+        await asyncio.sleep(0.1)
+        return await insert_many(docs, **kwargs)
+
+    col.insert_many = slow_insert_many
+    buffer = WriteBehindBuffer(col, max_docs=2, max_delay=10)
+
+    async def scenario():
+        memory.buffer = buffer
+        try:
+            flushing = asyncio.ensure_future(memory.add_many([memory.event("s1", "user", "message", {"i": i}) for i in range(2)]))
+            await asyncio.sleep(0.01)
+            assert len(buffer) == 0 and not flushing.done()  # taken out, not yet written
+            assert [e["content"]["i"] for e in await memory.list("s1")] == [0, 1]
+            assert (await memory.latest("s1", ["message"]))["content"] == {"i": 1}
+            await flushing
+        finally:
+            memory.buffer = None
+
+    asyncio.run(scenario())
@@ -0,0 +1,109 @@
+import asyncio
+import csv
+import gzip
+import io
+import json
+from datetime import datetime, timedelta
+
+from backend import server
+
+T0 = datetime(2024, 1, 1)
+
+
+def _lead(i, **overrides):
+    return {
+        "firstName": f"First{i}", "lastName": f"Last{i}", "email": f"lead{i}@example.com", "phone": "",
+        "company": f"Co{i % 3}", "role": "CTO", "businessGoals": "grow", "currentChallenges": "scale",
+        "budget": "10k" if i % 2 else "50k", "timeline": "Q1", "timestamp": T0 + timedelta(minutes=i),
+        **overrides,
+    }
+
+
+def _store_leads(db, n):
+    asyncio.run(db.leads.insert_many([_lead(i) for i in range(n)]))
+
+
+def test_leads_page_newest_first_without_gaps(client, db):
+    _store_leads(db, 23)
+    seen = []
+    params = {"limit": 5}
+    while True:
+        body = client.get("/api/leads", params=params).json()
+        seen += [lead["email"] for lead in body["leads"]]
+        if not body["next_cursor"]:
+            break
+        params["cursor"] = body["next_cursor"]
+    assert seen == [f"lead{i}@example.com" for i in reversed(range(23))]
+    assert client.get("/api/leads", params={"cursor": "nope"}).status_code == 400
+
+
+def test_leads_filters_and_projection(client, db):
+    _store_leads(db, 12)
+    body = client.get("/api/leads", params={"company": "Co1", "budget": "10k", "fields": "email,timestamp,_id,nope"}).json()
+    assert [lead["email"] for lead in body["leads"]] == ["lead7@example.com", "lead1@example.com"]
+    assert {frozenset(lead) for lead in body["leads"]} == {frozenset({"id", "email", "timestamp"})}
+
+    body = client.get("/api/leads", params={"company": "Co1", "since": (T0 + timedelta(minutes=2)).isoformat(), "until": (T0 + timedelta(minutes=10)).isoformat()}).json()
+    assert [lead["email"] for lead in body["leads"]] == ["lead7@example.com", "lead4@example.com"]
+    assert body["leads"][0]["timestamp"] == (T0 + timedelta(minutes=7)).isoformat()
+
+
+def _export(client, **params):
+    res = client.get("/api/leads/export", params={"compress": False, **params})
+    assert res.status_code == 200, res.text
+    return res
+
+
+def test_export_resumes_within_a_shared_timestamp(client, db):
+    # One batch stores all its leads with the same timestamp
+    asyncio.run(db.leads.insert_many([_lead(i, timestamp=T0) for i in range(6)]))
+    rows = [json.loads(line) for line in _export(client, format="ndjson").text.splitlines()]
+    assert [row["email"] for row in rows] == [f"lead{i}@example.com" for i in range(6)]
+    assert "_id" not in rows[0]
+
+    cursor = f"{rows[2]['timestamp']}|{rows[2]['id']}"
+    resumed = [json.loads(line) for line in _export(client, format="ndjson", cursor=cursor).text.splitlines()]
+    assert resumed == rows[3:]
+    assert _export(client, format="ndjson", since=T0.isoformat()).text.count("\n") == 6
+    assert client.get("/api/leads/export", params={"cursor": "2024-01-01T00:00:00|nope"}).status_code == 400
+
+
+def test_export_csv_in_gzipped_batches(client, db):
+    _store_leads(db, 25)
+    res = client.get("/api/leads/export", params={"batch_size": 10})
+    assert res.headers["content-type"] == "application/gzip"
+    rows = list(csv.DictReader(io.StringIO(gzip.decompress(res.content).decode("utf-8"))))
+    assert [row["email"] for row in rows] == [f"lead{i}@example.com" for i in range(25)]
+    assert list(rows[0]) == ["id", *server.LEAD_FIELDS]
+
+
+def _submission(i, **overrides):
+    lead = _lead(i, **overrides)
+    lead["timestamp"] = lead["timestamp"].isoformat()
+    return lead
+
+
+def test_batch_reports_results_per_item(client, db, monkeypatch):
+    digests = []
+
+    async def enqueue_digest(leads):
+        digests.append([lead["email"] for lead in leads])
+
+    monkeypatch.setattr(server.notifications, "enqueue_digest", enqueue_digest)
+    invalid = _submission(1)
+    del invalid["company"]
+    body = client.post("/api/lead-funnel/batch", json=[_submission(0), invalid, "not a lead", _submission(3)]).json()
+
+    assert (body["success"], body["received"], body["stored"]) == (True, 4, 2)
+    results = body["results"]
+    assert [r["index"] for r in results] == [0, 1, 2, 3]
+    assert [r["success"] for r in results] == [True, False, False, True]
+    assert results[1]["errors"][0]["loc"] == ["company"]
+    stored = asyncio.run(db.leads.find({}, {"email": 1}).sort("_id", 1).to_list(None))
+    assert [str(doc["_id"]) for doc in stored] == [results[0]["id"], results[3]["id"]]
+    assert digests == [["lead0@example.com", "lead3@example.com"]]
+
+
+def test_batch_size_is_capped(client, monkeypatch):
+    monkeypatch.setattr(server, "LEAD_BATCH_MAX", 2)
+    assert client.post("/api/lead-funnel/batch", json=[_submission(i) for i in range(3)]).status_code == 413
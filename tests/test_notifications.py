@@ -0,0 +1,173 @@
+import asyncio
+import socket
+from datetime import datetime, timedelta
+
+import pytest
+from aiosmtpd.controller import Controller
+
+from backend.notifications import NotificationQueue, SMTPSettings
+
+LEAD = {
+    "firstName": "Ada", "lastName": "Lovelace", "email": "ada@example.com", "phone": "",
+    "company": "Engines", "role": "CTO", "businessGoals": "grow", "currentChallenges": "scale",
+    "budget": "10k", "timeline": "Q1", "timestamp": datetime(2024, 1, 1),
+}
+
+
+class Mailbox:
+    """aiosmtpd handler keeping delivered messages; fails the first ``failures`` deliveries."""
+
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.messages = []
+
+    async def handle_DATA(self, server, session, envelope):
+        if self.failures:
+            self.failures -= 1
+            return "451 Try again later"
+        self.messages.append(envelope.content.decode("utf-8"))
+        return "250 OK"
+
+
+@pytest.fixture
+def smtp_server():
+    servers = []
+
+    def start(mailbox):
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            port = s.getsockname()[1]
+        controller = Controller(mailbox, hostname="127.0.0.1", port=port)
+        controller.start()
+        servers.append(controller)
+        return SMTPSettings(host="127.0.0.1", port=port, starttls=False, timeout=5)
+
+    yield start
+    for controller in servers:
+        controller.stop()
+
+
+async def _wait_for(predicate, timeout=5.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not await predicate():
+        assert asyncio.get_running_loop().time() < deadline, "timed out"
+        await asyncio.sleep(0.02)
+
+
+def _run(queue, scenario):
+    async def main():
+        await queue.start()
+        try:
+            await scenario()
+        finally:
+            await queue.close()
+
+    asyncio.run(main())
+
+
+def test_lead_email_is_delivered(db, smtp_server):
+    mailbox = Mailbox()
+    queue = NotificationQueue(db, smtp=smtp_server(mailbox), workers=2, poll_interval=0.05)
+
+    async def scenario():
+        await queue.enqueue_lead(LEAD)
+        await _wait_for(lambda: db.notifications.find_one({"status": "sent"}))
+
+    _run(queue, scenario)
+    assert len(mailbox.messages) == 1
+    assert "Subject: New Lead: Ada Lovelace from Engines" in mailbox.messages[0]
+
+
+def test_failed_delivery_is_retried_with_backoff(db, smtp_server):
+    mailbox = Mailbox(failures=2)
+    queue = NotificationQueue(db, smtp=smtp_server(mailbox), workers=1, base_delay=0.1, poll_interval=0.02)
+    retries = []
+
+    async def scenario():
+        await queue.enqueue_lead(LEAD)
+
+        async def retried():
+            job = await db.notifications.find_one({})
+            if job["status"] == "pending" and job["attempts"] > len(retries):
+                retries.append(job["next_attempt_at"] - job["claimed_at"])
+            return job["status"] == "sent"
+
+        await _wait_for(retried)
+
+    _run(queue, scenario)
+    job = asyncio.run(db.notifications.find_one({}))
+    assert (job["status"], job["attempts"], len(mailbox.messages)) == ("sent", 3, 1)
+    # Exponential backoff: base 0.1s doubled per attempt, with +-20% jitter
+    assert timedelta(seconds=0.08) <= retries[0] <= timedelta(seconds=0.15)
+    assert timedelta(seconds=0.16) <= retries[1] <= timedelta(seconds=0.3)
+
+
+def test_digest_mode_sends_one_email_per_interval(db, smtp_server):
+    mailbox = Mailbox()
+    queue = NotificationQueue(db, smtp=smtp_server(mailbox), workers=1, poll_interval=0.02, digest_interval=0.1)
+
+    async def scenario():
+        for name in ("Ada", "Grace", "Alan"):
+            await queue.enqueue_lead({**LEAD, "firstName": name})
+        await _wait_for(lambda: db.notifications.find_one({"kind": "digest", "status": "sent"}))
+
+    _run(queue, scenario)
+    assert len(mailbox.messages) == 1
+    assert "Subject: 3 New Leads" in mailbox.messages[0]
+    assert all(f"Name: {name} Lovelace" in mailbox.messages[0] for name in ("Ada", "Grace", "Alan"))
+    assert asyncio.run(db.notifications.count_documents({"kind": "lead", "status": "digested"})) == 3
+
+
+def test_only_expired_leases_are_reclaimed(db, smtp_server):
+    mailbox = Mailbox()
+    queue = NotificationQueue(db, smtp=smtp_server(mailbox), workers=1, poll_interval=0.02, lease=60)
+    now = datetime.utcnow()
+    base = {"kind": "lead", "payload": {"lead": LEAD}, "status": "sending", "attempts": 1, "created_at": now, "next_attempt_at": now}
+    asyncio.run(db.notifications.insert_many([
+        {**base, "_id": "live", "claimed_at": now},  # another worker is still sending it
+        {**base, "_id": "dead", "claimed_at": now - timedelta(seconds=120)},
+        {**base, "_id": "legacy"},
+    ]))
+
+    async def scenario():
+        await _wait_for(lambda: _count(db, {"status": "sent"}, 2))
+        await asyncio.sleep(0.1)
+
+    _run(queue, scenario)
+    statuses = {d["_id"]: d["status"] for d in asyncio.run(db.notifications.find({}).to_list(None))}
+    assert statuses == {"live": "sending", "dead": "sent", "legacy": "sent"}
+    assert len(mailbox.messages) == 2
+
+
+async def _count(db, query, n):
+    return await db.notifications.count_documents(query) >= n
+
+
+def test_concurrent_digest_rolls_take_each_lead_once(db):
+    # Two processes' queues sharing one collection, rolling at the same moment
+    queues = [NotificationQueue(db, smtp=SMTPSettings(), digest_interval=60) for _ in range(2)]
+
+    async def scenario():
+        for i in range(10):
+            await queues[0].enqueue_lead({**LEAD, "firstName": f"Lead{i}"})
+        await asyncio.gather(*(queue._roll_digest() for queue in queues))
+        return await db.notifications.find({"kind": "digest"}).to_list(None)
+
+    digests = asyncio.run(scenario())
+    names = [lead["firstName"] for digest in digests for lead in digest["payload"]["leads"]]
+    assert sorted(names) == sorted(f"Lead{i}" for i in range(10))
+    assert asyncio.run(db.notifications.count_documents({"kind": "lead", "status": "digested"})) == 10
+
+
+def test_enqueue_wakes_idle_workers_without_polling(db):
+    queue = NotificationQueue(db, smtp=SMTPSettings(), workers=3, poll_interval=60)
+
+    async def scenario():
+        await asyncio.sleep(0.05)  # every worker idle, waiting on its own event
+        for i in range(5):
+            await queue.enqueue_lead(LEAD)
+            await asyncio.sleep(0.01)
+        await _wait_for(lambda: _count(db, {"status": "sent"}, 5), timeout=2)
+
+    _run(queue, scenario)
+    assert len(queue._wakeups) == 3
@@ -0,0 +1,27 @@
+import asyncio
+from datetime import timedelta
+
+from backend import rollups, server
+from tests.test_leads import T0, _lead, _submission
+
+
+def test_stored_leads_are_counted_with_inc(client, db):
+    asyncio.run(server.store_leads([_lead(1), _lead(2), _lead(3, timestamp=T0 + timedelta(days=1))]))
+    # Duplicates are not counted again
+    asyncio.run(server.store_leads([_lead(1), _lead(4, budget="", role="CEO")]))
+
+    body = client.get("/api/leads/analytics").json()
+    assert body == {"success": True, "rollups": {
+        "budget": {"": 1, "10k": 2, "50k": 1},
+        "day": {"2024-01-01": 3, "2024-01-02": 1},
+        "role": {"CEO": 1, "CTO": 3},
+        "timeline": {"Q1": 4},
+    }}
+    assert client.get("/api/leads/analytics", params={"dimension": "role"}).json()["rollups"] == {"role": {"CEO": 1, "CTO": 3}}
+    assert client.get("/api/leads/analytics", params={"dimension": "nope"}).status_code == 400
+
+
+def test_rollups_follow_the_submission_endpoints(client, db):
+    client.post("/api/lead-funnel", json=_submission(1))
+    client.post("/api/lead-funnel/batch", json=[_submission(1), _submission(2)])
+    assert asyncio.run(rollups.get_rollups(db, "budget")) == {"budget": {"10k": 1, "50k": 1}}
@@ -0,0 +1,111 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
+
+from backend import server
+
+T0 = datetime(2024, 1, 1)
+
+
+def _store_checks(db, n):
+    # Groups of three share a timestamp, so paging must break ties on id
+    docs = [{"id": f"{i:04d}", "client_name": f"c{i % 3}", "timestamp": T0 + timedelta(seconds=i // 3)} for i in range(n)]
+    asyncio.run(db.status_checks.insert_many([dict(d) for d in reversed(docs)]))
+    return [d["id"] for d in docs]
+
+
+def test_status_pages_by_cursor_without_gaps(client, db):
+    ids = _store_checks(db, 20)
+    seen = []
+    params = {"limit": 4}
+    while True:
+        res = client.get("/api/status", params=params)
+        seen += [doc["id"] for doc in res.json()]
+        if "X-Next-Cursor" not in res.headers:
+            break
+        params["cursor"] = res.headers["X-Next-Cursor"]
+    assert seen == ids
+
+
+def test_status_projection_and_time_range(client, db):
+    _store_checks(db, 9)
+    res = client.get("/api/status", params={"fields": "timestamp", "since": (T0 + timedelta(seconds=1)).isoformat(), "until": (T0 + timedelta(seconds=2)).isoformat()})
+    assert res.json() == [{"id": f"{i:04d}", "timestamp": (T0 + timedelta(seconds=1)).isoformat()} for i in (3, 4, 5)]
+    assert client.get("/api/status", params={"cursor": "garbage"}).status_code == 400
+
+
+def test_status_ndjson_streams_every_match(client, db):
+    ids = _store_checks(db, 250)
+    res = client.get("/api/status", params={"format": "ndjson"})
+    assert res.headers["content-type"].startswith("application/x-ndjson")
+    assert [json.loads(line)["id"] for line in res.text.splitlines()] == ids
+
+
+def test_status_limit_is_validated(client, db):
+    ids = _store_checks(db, 9)
+    res = client.get("/api/status", params={"format": "ndjson", "limit": 4})
+    assert [json.loads(line)["id"] for line in res.text.splitlines()] == ids[:4]
+    for bad in (0, -1, server.STATUS_STREAM_MAX + 1):
+        assert client.get("/api/status", params={"format": "ndjson", "limit": bad}).status_code == 422
+        assert client.get("/api/status", params={"limit": bad}).status_code == 422
+
+
+def _check(i):
+    return {"id": f"{i:04d}", "client_name": f"c{i % 2}", "timestamp": T0 + timedelta(seconds=i)}
+
+
+def test_status_buffer_flushes_by_size_age_and_close(db):
+    batches = []
+    col = db.status_checks
+    insert_many = col.insert_many
+
+    async def counting_insert_many(docs, **kwargs):
+        batches.append(len(docs))
+        return await insert_many(docs, **kwargs)
+
+    col.insert_many = counting_insert_many
+    buffer = server.StatusIngestBuffer(col, batch_size=5, max_age=0.05, capacity=100)
+
+    async def scenario():
+        buffer.start()
+        for i in range(7):
+            await buffer.put(_check(i))
+        await asyncio.sleep(0.15)  # 5 by size, then 2 once they are max_age old
+        for i in range(7, 10):
+            await buffer.put(_check(i))
+        await buffer.close()
+
+    asyncio.run(scenario())
+    assert batches == [5, 2, 3]
+    assert asyncio.run(db.status_checks.count_documents({})) == 10
+    latest = asyncio.run(db.status_latest.find({}, {"_id": 0}).sort("client_name", 1).to_list(None))
+    assert [(d["client_name"], d["id"]) for d in latest] == [("c0", "0008"), ("c1", "0009")]
+
+
+def test_status_buffer_applies_backpressure(db):
+    buffer = server.StatusIngestBuffer(db.status_checks, batch_size=10, max_age=10, capacity=3)
+
+    async def scenario():
+        buffer._queue = asyncio.Queue(maxsize=buffer.capacity)  # no writer draining it
+        for i in range(3):
+            await buffer.put(_check(i))
+        blocked = asyncio.ensure_future(buffer.put(_check(3)))
+        await asyncio.sleep(0.05)
+        assert not blocked.done()
+        buffer._queue.get_nowait()
+        await asyncio.wait_for(blocked, 1)
+
+    asyncio.run(scenario())
+
+
+def test_status_latest_keeps_the_newest_check(client, db):
+    client.post("/api/status", json={"client_name": "web"})
+    client.post("/api/status", json={"client_name": "api"})
+    newest = client.post("/api/status", json={"client_name": "web"}).json()
+
+    # A heartbeat that arrives late with an older timestamp changes nothing
+    asyncio.run(server.record_latest_status([{"id": "late", "client_name": "web", "timestamp": T0}]))
+    latest = client.get("/api/status/latest").json()
+    assert [d["client_name"] for d in latest] == ["api", "web"]
+    assert latest[1]["id"] == newest["id"]
+    assert client.get("/api/status/latest", params={"client_name": "web"}).json() == [latest[1]]